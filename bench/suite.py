@@ -0,0 +1,370 @@
+'''
+Offline benchmarks of SlyAPI's hot paths, against in-process stub servers.
+
+    python bench/suite.py                  # run, and compare to bench/baseline.json
+    python bench/suite.py --save-baseline  # run, and store the results as the baseline
+    python bench/suite.py -k oauth --quick
+
+Exits with status 1 if any benchmark is slower than its baseline by more than its threshold.
+Baselines depend on the machine, so compare only results from the same one. The fastest
+round of each benchmark is compared, after scaling the baseline by how fast a calibration
+loop runs now, compared to when the baseline was saved.
+'''
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import urllib.parse
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, Awaitable, Callable, TypedDict
+
+import aiohttp
+from aiohttp import web
+
+from SlyAPI import OAuth1App, OAuth2, OAuth2App, OAuth2User, WebAPI
+from SlyAPI.auth import Auth
+from SlyAPI.bench import StubOptions, stub_app
+from SlyAPI.fields import fields_mask
+from SlyAPI.jsonview import json_view
+from SlyAPI.oauth1 import OAuth1User
+from SlyAPI.web import Method, Request
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_THRESHOLD = 0.25 # slower than the baseline by more than this fraction is a regression
+NETWORK_THRESHOLD = 0.5 # for benchmarks which make requests, which vary more
+
+@dataclass
+class Benchmark:
+    name: str
+    operation: Callable[[], Any] # sync, or async
+    threshold: float = DEFAULT_THRESHOLD
+
+@dataclass
+class Comparison:
+    name: str
+    baseline_us: float | None
+    current_us: float
+    threshold: float
+    speed: float = 1.0 # the calibration loop's time now, relative to the baseline's
+
+    @property
+    def ratio(self) -> float | None:
+        return None if self.baseline_us is None else self.current_us / (self.baseline_us * self.speed)
+
+    @property
+    def status(self) -> str:
+        ratio = self.ratio
+        if ratio is None:
+            return 'new'
+        if ratio > 1 + self.threshold:
+            return 'regression'
+        if ratio < 1 / (1 + self.threshold):
+            return 'improvement'
+        return 'ok'
+
+class Part(Enum):
+    SNIPPET = 'snippet'
+    STATISTICS = 'statistics'
+    CONTENT_DETAILS = 'contentDetails'
+
+class Statistics(TypedDict):
+    viewCount: str
+
+class Snippet(TypedDict):
+    title: str
+    tags: list[str]
+
+class Video(TypedDict):
+    id: str
+    snippet: Snippet
+    statistics: Statistics
+
+class VideoList(TypedDict):
+    items: list[Video]
+
+def project(obj: Any, mask: str) -> Any:
+    'Apply a fields mask, as a Google API would.'
+    selected: dict[str, str | None] = {}
+    depth, name, start = 0, '', 0
+    for i, c in enumerate(mask + ','):
+        if c == '(':
+            if depth == 0:
+                name, start = mask[start:i], i + 1
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                selected[name], start = mask[start:i], i + 2
+        elif c == ',' and depth == 0 and start <= i:
+            selected[mask[start:i]], start = None, i + 1
+    if isinstance(obj, list):
+        return [project(o, mask) for o in obj] # type: ignore
+    return {k: obj[k] if sub is None else project(obj[k], sub) for k, sub in selected.items() if k in obj}
+
+def stub_servers() -> web.Application:
+    'The API, an OAuth2 token endpoint and an OAuth1 request token endpoint.'
+    app = stub_app(StubOptions(latency=0, items_per_page=100, pages=10))
+    refreshes = 0
+
+    async def ping(_request: web.Request):
+        return web.json_response({'ok': True})
+
+    async def oauth2_token(request: web.Request):
+        nonlocal refreshes
+        form = await request.post()
+        assert form['grant_type'] == 'refresh_token'
+        refreshes += 1
+        return web.json_response({'access_token': F'token{refreshes}', 'expires_in': 3600, 'token_type': 'Bearer'})
+
+    async def oauth1_request_token(request: web.Request):
+        assert request.headers['Authorization'].startswith('OAuth ')
+        return web.Response(text='oauth_token=request&oauth_token_secret=secret&oauth_callback_confirmed=true',
+            content_type='application/x-www-form-urlencoded')
+
+    app.router.add_get('/ping', ping)
+    app.router.add_post('/oauth2/token', oauth2_token)
+    app.router.add_post('/oauth1/request_token', oauth1_request_token)
+    return app
+
+def benchmarks(url: str, api: WebAPI, session: aiohttp.ClientSession) -> list[Benchmark]:
+    params: dict[str, Any] = {
+        'part': [Part.SNIPPET, Part.STATISTICS, Part.CONTENT_DETAILS],
+        'id': [F'video{i}' for i in range(50)],
+        'maxResults': 50, 'q': 'search terms', 'fields': None, 'chart': {Part.SNIPPET},
+    }
+    def convert_parameters():
+        api._convert_parameters(params) # type: ignore ## reportPrivateUsage
+
+    async def request_send():
+        async with Request(Method.GET, F'{url}/ping', {'q': 'x'}, {}).send(session) as resp:
+            await resp.read()
+
+    async def aiohttp_get(): # reference for request_send
+        async with session.get(F'{url}/ping', params={'q': 'x'}) as resp:
+            await resp.read()
+
+    oauth1_app = OAuth1App('app_key', 'app_secret', F'{url}/oauth1/request_token',
+        F'{url}/oauth1/authorize', F'{url}/oauth1/access_token')
+    oauth1_user = OAuth1User('user_key', 'user_secret')
+    def oauth1_sign():
+        oauth1_app.sign(Request(Method.POST, 'https://api.example.com/1.1/statuses/update.json',
+            {'status': 'Hello, world! ~*', 'include_entities': 'true'}, {}), oauth1_user)
+
+    async def oauth1_request_token():
+        request = oauth1_app.sign(Request(Method.POST, oauth1_app.request_uri, {'oauth_callback': 'oob'}, {}))
+        async with request.send(session) as resp:
+            assert 'oauth_token' in urllib.parse.parse_qs(await resp.text())
+
+    oauth2 = OAuth2(OAuth2App('client', 'secret', F'{url}/oauth2/auth', F'{url}/oauth2/token'),
+        OAuth2User('expired', 'refresh', datetime.now(timezone.utc), 'Bearer'))
+    async def oauth2_sign_contention():
+        # one refresh, and 63 signs waiting for it
+        oauth2.user.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+        await asyncio.gather(*(oauth2.sign(session, Request(Method.GET, F'{url}/ping', {}, {})) for _ in range(64)))
+
+    async def paginated():
+        items = await api.paginated('/items', {}, None)
+        assert len(items) == 1000
+
+    page = json.dumps({'kind': 'stub#itemList', 'nextPageToken': 'next',
+        'items': [{'id': F'video{i}', 'snippet': {'title': F'Video {i}', 'description': 'lorem ipsum ' * 40,
+            'tags': ['a', 'b', 'c']}, 'statistics': {'viewCount': str(i)}} for i in range(200)]}).encode()
+    def json_decode():
+        json.loads(page.decode())
+
+    def json_view_decode():
+        view = json_view(page)
+        for item in view['items']:
+            item['id']
+
+    # a videos.list response, and the same with only the fields of VideoList
+    videos = {'kind': 'youtube#videoListResponse', 'items': [{
+        'kind': 'youtube#video', 'etag': F'etag{i}' * 4, 'id': F'video{i}',
+        'snippet': {'title': F'Video {i}', 'description': 'lorem ipsum dolor sit amet ' * 40, 'tags': ['a', 'b'],
+            'localized': {'title': F'Video {i}', 'description': 'lorem ipsum dolor sit amet ' * 40}},
+        'statistics': {'viewCount': str(i * 1000), 'likeCount': str(i), 'commentCount': str(i)},
+        'contentDetails': {'duration': 'PT4M13S', 'definition': 'hd', 'regionRestriction': {'blocked': ['XX'] * 30}},
+    } for i in range(50)]}
+    full_body = json.dumps(videos).encode()
+    projected_body = json.dumps(project(videos, fields_mask(VideoList) or '')).encode()
+    def fields_projection_full(): # reference for fields_projection
+        api._from_json(VideoList, json.loads(full_body)) # type: ignore ## reportPrivateUsage
+
+    def fields_projection():
+        api._from_json(VideoList, json.loads(projected_body)) # type: ignore ## reportPrivateUsage
+
+    async def session_creation():
+        async with WebAPI(Auth.none()) as fresh:
+            fresh._client # type: ignore ## reportPrivateUsage
+
+    return [
+        Benchmark('convert_parameters', convert_parameters),
+        Benchmark('request_send', request_send, NETWORK_THRESHOLD),
+        Benchmark('aiohttp_get', aiohttp_get, NETWORK_THRESHOLD),
+        Benchmark('oauth1_sign', oauth1_sign),
+        Benchmark('oauth1_request_token', oauth1_request_token, NETWORK_THRESHOLD),
+        Benchmark('oauth2_sign_contention', oauth2_sign_contention, NETWORK_THRESHOLD),
+        Benchmark('paginated', paginated, NETWORK_THRESHOLD),
+        Benchmark('json_decode', json_decode),
+        Benchmark('json_view_decode', json_view_decode),
+        Benchmark('fields_projection_full', fields_projection_full),
+        Benchmark('fields_projection', fields_projection),
+        Benchmark('session_creation', session_creation, NETWORK_THRESHOLD),
+    ]
+
+def calibration_loop() -> int:
+    'Fixed pure Python work, to tell a slower machine, or a busier one, from a slower library.'
+    total = 0
+    for i in range(1000):
+        total += i * i % 7
+    return total
+
+async def _time(operation: Callable[[], Any], iterations: int) -> float:
+    'Seconds for some iterations of an operation.'
+    if inspect.iscoroutinefunction(operation):
+        async_operation: Callable[[], Awaitable[Any]] = operation
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await async_operation()
+    else:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            operation()
+    return time.perf_counter() - start
+
+async def measure(benchmark: Benchmark, rounds: int, round_seconds: float) -> dict[str, Any]:
+    'Microseconds per operation in each of several rounds, each about `round_seconds` long.'
+    # warm up, and find how many iterations fill a round
+    iterations = 1
+    while (elapsed := await _time(benchmark.operation, iterations)) < round_seconds / 4:
+        iterations *= 2
+    iterations = max(1, round(iterations * round_seconds / elapsed))
+    per_operation = [await _time(benchmark.operation, iterations) / iterations * 1e6 for _ in range(rounds)]
+    return {
+        'median_us': statistics.median(per_operation),
+        'min_us': min(per_operation),
+        'max_us': max(per_operation),
+        'iterations': iterations,
+        'rounds_us': per_operation,
+        'threshold': benchmark.threshold,
+    }
+
+def environment() -> dict[str, str]:
+    from importlib.metadata import version
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'slyapi': version('SlyAPI'),
+        'aiohttp': aiohttp.__version__,
+        'date': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    }
+
+async def run(names: list[str] | None = None, rounds: int = 7, round_seconds: float = 0.1) -> dict[str, Any]:
+    '''
+    Run the benchmarks whose names contain any of `names`, or all of them.
+    Returns the environment, and the results of each benchmark.
+    '''
+    runner = web.AppRunner(stub_servers(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    url = F"http://127.0.0.1:{runner.addresses[0][1]}"
+    results: dict[str, Any] = {}
+    calibration = await measure(Benchmark('calibration', calibration_loop), rounds, round_seconds)
+    try:
+        async with aiohttp.ClientSession() as session:
+            api = type('StubAPI', (WebAPI,), {'base_url': url})(Auth.none())
+            api.use_session(session)
+            for benchmark in benchmarks(url, api, session):
+                if names and not any(name in benchmark.name for name in names):
+                    continue
+                results[benchmark.name] = await measure(benchmark, rounds, round_seconds)
+                # saved with each benchmark, since a baseline can merge results of several runs
+                results[benchmark.name]['calibration_us'] = calibration['min_us']
+    finally:
+        await runner.cleanup()
+    return {'environment': environment(), 'benchmarks': results}
+
+def compare(results: dict[str, Any], baseline: dict[str, Any], threshold: float | None = None) -> list[Comparison]:
+    '''
+    Compare the fastest round of each benchmark to its baseline, which is scaled by
+    the calibration loop's time in each run, if both have one. The fastest round is
+    the one least slowed down by anything else running on the machine.
+    `threshold` overrides the allowed slowdown of every benchmark.
+    '''
+    comparisons: list[Comparison] = []
+    for name, result in results['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name)
+        speed = 1.0
+        if base is not None and 'calibration_us' in base and 'calibration_us' in result:
+            speed = result['calibration_us'] / base['calibration_us']
+        comparisons.append(Comparison(name, None if base is None else base['min_us'], result['min_us'],
+            result['threshold'] if threshold is None else threshold, speed))
+    return comparisons
+
+def report(results: dict[str, Any], comparisons: list[Comparison]) -> str:
+    lines = [F"{'benchmark':<24} {'min':>12} {'median':>12} {'ops/s':>10} {'baseline':>12} {'speed':>6} {'change':>8}  status"]
+    for c in comparisons:
+        result = results['benchmarks'][c.name]
+        baseline = '' if c.baseline_us is None else F"{c.baseline_us:.1f} us"
+        speed = '' if c.baseline_us is None else F"x{c.speed:.2f}"
+        change = '' if c.ratio is None else F"{(c.ratio - 1) * 100:+.0f}%"
+        lines.append(F"{c.name:<24} {result['min_us']:>9.1f} us {result['median_us']:>9.1f} us "
+            F"{1e6 / result['min_us']:>10.0f} {baseline:>12} {speed:>6} {change:>8}  {c.status}")
+    return '\n'.join(lines)
+
+def main(args: list[str]) -> int:
+    p = argparse.ArgumentParser(description="Offline benchmarks of SlyAPI's hot paths.")
+    p.add_argument('-k', dest='names', action='append', help="run only benchmarks whose names contain this (repeatable)")
+    p.add_argument('--quick', action='store_true', help="fewer and shorter rounds, for a rough check, without comparing")
+    p.add_argument('--json', metavar='FILE', help="write the results to a JSON file")
+    p.add_argument('--baseline', metavar='FILE', default=DEFAULT_BASELINE, help="baseline to compare to, or to save")
+    p.add_argument('--save-baseline', action='store_true', help="store the results as the baseline, merged with others")
+    p.add_argument('--threshold', type=float, default=None,
+        help=F"allowed slowdown, as a fraction, for every benchmark (default {DEFAULT_THRESHOLD}, or {NETWORK_THRESHOLD} with requests)")
+    options = p.parse_args(args)
+    if options.quick and options.save_baseline:
+        p.error("--quick results are too noisy to save as a baseline")
+
+    rounds, round_seconds = (3, 0.02) if options.quick else (7, 0.1)
+    results = asyncio.run(run(options.names, rounds, round_seconds))
+
+    baseline: dict[str, Any] = {}
+    if os.path.exists(options.baseline):
+        with open(options.baseline, encoding='utf8') as f:
+            baseline = json.load(f)
+    comparisons = compare(results, {} if options.save_baseline or options.quick else baseline, options.threshold)
+    print(F"Python {results['environment']['python']} on {results['environment']['platform']}")
+    print(report(results, comparisons))
+    if options.quick:
+        print("Not compared to the baseline: --quick results are too noisy")
+
+    if options.json:
+        with open(options.json, 'w', encoding='utf8') as f:
+            json.dump(results, f, indent=2)
+    if options.save_baseline:
+        # keep the baselines of benchmarks which were not run
+        merged = {'environment': results['environment'],
+            'benchmarks': baseline.get('benchmarks', {}) | results['benchmarks']}
+        with open(options.baseline, 'w', encoding='utf8') as f:
+            json.dump(merged, f, indent=2)
+        print(F"Saved baseline to {options.baseline}")
+        return 0
+
+    regressions = [c.name for c in comparisons if c.status == 'regression']
+    if regressions:
+        print(F"Regressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,9 +1,42 @@
 '''
 Foundational library for implementing client libraries for web APIs.
 '''
-from .webapi import WebAPI as WebAPI
-from .oauth2 import OAuth2 as OAuth2, OAuth2User as OAuth2User, OAuth2App as OAuth2App, requires_scopes as requires_scopes
-from .oauth1 import OAuth1 as OAuth1, OAuth1User as OAuth1User, OAuth1App as OAuth1App
-from .auth import UrlApiKey as UrlApiKey, HeaderApiKey as HeaderApiKey
-from .asyncy import AsyncTrans as AsyncTrans, AsyncLazy as AsyncLazy
-from .service_account import OAuth2ServiceAccount as OAuth2ServiceAccount
\ No newline at end of file
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .webapi import WebAPI as WebAPI, WebAPIGroup as WebAPIGroup
+    from .oauth2 import OAuth2 as OAuth2, OAuth2User as OAuth2User, OAuth2App as OAuth2App, requires_scopes as requires_scopes
+    from .oauth1 import OAuth1 as OAuth1, OAuth1User as OAuth1User, OAuth1App as OAuth1App
+    from .auth import UrlApiKey as UrlApiKey, HeaderApiKey as HeaderApiKey, ApiKeyPool as ApiKeyPool
+    from .asyncy import AsyncTrans as AsyncTrans, AsyncLazy as AsyncLazy
+    from .service_account import OAuth2ServiceAccount as OAuth2ServiceAccount
+    from .quota import quota_cost as quota_cost, QuotaBudget as QuotaBudget
+    from .web import Priority as Priority, with_priority as with_priority
+    from .web import Timeouts as Timeouts, DeadlineExceeded as DeadlineExceeded, with_deadline as with_deadline, with_timeouts as with_timeouts
+
+# public names, and the submodule each one is imported from on first use
+# so that e.g. the service account and its crypto dependencies are only loaded when used
+_lazy_names = {
+    'WebAPI': '.webapi', 'WebAPIGroup': '.webapi',
+    'OAuth2': '.oauth2', 'OAuth2User': '.oauth2', 'OAuth2App': '.oauth2', 'requires_scopes': '.oauth2',
+    'OAuth1': '.oauth1', 'OAuth1User': '.oauth1', 'OAuth1App': '.oauth1',
+    'UrlApiKey': '.auth', 'HeaderApiKey': '.auth', 'ApiKeyPool': '.auth',
+    'AsyncTrans': '.asyncy', 'AsyncLazy': '.asyncy',
+    'OAuth2ServiceAccount': '.service_account',
+    'quota_cost': '.quota', 'QuotaBudget': '.quota',
+    'Priority': '.web', 'with_priority': '.web',
+    'Timeouts': '.web', 'DeadlineExceeded': '.web', 'with_deadline': '.web', 'with_timeouts': '.web',
+}
+
+__all__ = list(_lazy_names)
+
+def __getattr__(name: str) -> Any:
+    if name not in _lazy_names:
+        raise AttributeError(F"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_lazy_names[name], __name__), name)
+    globals()[name] = value # later lookups skip __getattr__
+    return value
+
+def __dir__() -> list[str]:
+    return sorted(list(globals()) + __all__)
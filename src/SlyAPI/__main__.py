@@ -22,6 +22,10 @@ async def main(args: list[str]):
            | ['oauth2-flow', app, user, *scopes]:
             
             await grant_oauth2(app, user, scopes)
+
+        case ['bench', *options]:
+            from .bench import bench_command
+            await bench_command(options)
         
         case _: # help
             print(inspect.cleandoc("""
@@ -41,6 +45,11 @@ async def main(args: list[str]):
                     Grant a single OAuth1/2 user token with the local flow.
                     Scopes only apply to OAuth2.
                     Scopes are space-separated, and may be required!
+
+                --- Benchmarking ---
+                SlyAPI bench [options]
+                    Load test a WebAPI against a local stub API.
+                    See `SlyAPI bench --help` for options.
             """))
 
 if __name__ == '__main__':
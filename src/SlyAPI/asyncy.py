@@ -1,8 +1,13 @@
 '''Useful classes and functions for asynchronous programming.'''
 import asyncio
+import collections
+import collections.abc
 import functools
-from typing import Generic, ParamSpec, TypeAlias, TypeVar, Callable, Generator, AsyncGenerator, Any
-from contextlib import AbstractAsyncContextManager
+import os
+from typing import TYPE_CHECKING, Awaitable, Generic, Iterable, AsyncIterable, ParamSpec, Sequence, TypeAlias, TypeVar, Callable, Generator, AsyncGenerator, Any, cast
+from contextlib import AbstractAsyncContextManager, aclosing
+if TYPE_CHECKING:
+    from .sinks import SinkProgress
 
 T = TypeVar('T')
 U = TypeVar('U')
@@ -59,9 +64,85 @@ class AsyncLazy(Generic[T]):
         '''Yield the aggregate results of the generator as a list.'''
         return self._items().__await__()
 
+    # The following operators stream: they hold at most a bounded number of items,
+    # and closing or cancelling the result also closes this iterator.
+
     def map(self, f: Callable[[T], U]) -> 'AsyncLazy[U]':
         '''Apply a function to each item that is yielded.'''
-        return AsyncLazy(f(x) async for x in self)
+        return AsyncLazy(_map(self.gen, f))
+
+    def map_async(self, f: Callable[[T], Awaitable[U]], concurrency: int = 1, ordered: bool = True) -> 'AsyncLazy[U]':
+        '''
+        Apply an async function to each item, running up to `concurrency` calls at once.
+        If not `ordered`, results are yielded as soon as each call finishes.
+        '''
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+        return AsyncLazy(_map_async(self.gen, f, concurrency, ordered))
+
+    def filter(self, predicate: Callable[[T], bool]) -> 'AsyncLazy[T]':
+        '''Yield only the items for which the predicate is true.'''
+        return AsyncLazy(_filter(self.gen, predicate))
+
+    def take(self, n: int) -> 'AsyncLazy[T]':
+        '''Yield at most the first n items.'''
+        return AsyncLazy(_take(self.gen, n))
+
+    def flat_map(self, f: Callable[[T], Iterable[U] | AsyncIterable[U]]) -> 'AsyncLazy[U]':
+        '''Apply a function returning many items to each item, and yield all of those.'''
+        return AsyncLazy(_flat_map(self.gen, f))
+
+    def chunked(self, n: int) -> 'AsyncLazy[list[T]]':
+        '''Yield lists of n items, and the remaining items last.'''
+        if n < 1:
+            raise ValueError("chunk size must be at least 1")
+        return AsyncLazy(_chunked(self.gen, n))
+
+    def buffer(self, n: int) -> 'AsyncLazy[T]':
+        '''
+        Read up to n items ahead in the background,
+        so that a slow consumer does not also slow down the producer.
+        '''
+        if n < 1:
+            raise ValueError("buffer size must be at least 1")
+        return AsyncLazy(_buffer(self.gen, n))
+
+    async def to_ndjson(self, path: 'str | os.PathLike[str]', compress: bool = False,
+            on_progress: 'Callable[[SinkProgress], None] | None' = None) -> 'SinkProgress':
+        '''
+        Write each item as a line of JSON, optionally gzip-compressed.
+        See `SlyAPI.sinks.write_ndjson` for more options.
+        '''
+        from .sinks import write_ndjson
+        return await write_ndjson(self.gen, path, compress, on_progress=on_progress)
+
+    async def to_csv(self, path: 'str | os.PathLike[str]', columns: Sequence[str], compress: bool = False,
+            on_progress: 'Callable[[SinkProgress], None] | None' = None) -> 'SinkProgress':
+        '''
+        Write some columns of each item as CSV rows. Columns may be dotted paths, like `snippet.title`.
+        See `SlyAPI.sinks.write_csv` for more options.
+        '''
+        from .sinks import write_csv
+        return await write_csv(self.gen, path, columns, compress, on_progress=on_progress)
+
+    def tee(self, n: int, buffer: int = 64) -> 'tuple[AsyncLazy[T], ...]':
+        '''
+        Split into n iterators which each yield every item, while reading this one only once.
+        At most `buffer` items are held: the fastest iterator waits for the slowest
+        to catch up, so each must be iterated concurrently or closed.
+        '''
+        if n < 1 or buffer < 1:
+            raise ValueError("tee needs at least one iterator and buffered item")
+        broadcast = _Broadcast(self.gen, n, buffer)
+        return tuple(AsyncLazy(broadcast.consume(i)) for i in range(n))
+
+    @classmethod
+    def from_iterable(cls, items: Iterable[T]) -> 'AsyncLazy[T]':
+        '''Yield the items of a regular iterable.'''
+        async def gen():
+            for x in items:
+                yield x
+        return cls(gen())
 
     @classmethod
     def wrap(cls, fn: Callable[T_Params, AsyncGenerator[T, None]]):
@@ -70,5 +151,236 @@ class AsyncLazy(Generic[T]):
         def wrapped(*args: T_Params.args, **kwargs: T_Params.kwargs) -> AsyncLazy[T]:
             return AsyncLazy(fn(*args, **kwargs))
         return wrapped
-    
-AsyncTrans: TypeAlias = AsyncLazy[T]
\ No newline at end of file
+
+# wait for the next results of _map_async, raising as soon as any call fails
+async def _completed(pending: collections.deque[asyncio.Future[U]], ordered: bool) -> list[U]:
+    while True:
+        done = [fut for fut in pending if fut.done()]
+        for fut in done:
+            if (error := fut.exception()) is not None:
+                raise error
+        if ordered and pending[0].done():
+            return [pending.popleft().result()]
+        elif not ordered and done:
+            for fut in done:
+                pending.remove(fut)
+            return [fut.result() for fut in done]
+        await asyncio.wait([fut for fut in pending if not fut.done()], return_when=asyncio.FIRST_COMPLETED)
+
+async def _map_async(gen: AsyncGenerator[T, None], f: Callable[[T], Awaitable[U]], concurrency: int, ordered: bool) -> AsyncGenerator[U, None]:
+    pending: collections.deque[asyncio.Future[U]] = collections.deque()
+    try:
+        async with aclosing(gen):
+            async for x in gen:
+                pending.append(asyncio.ensure_future(f(x)))
+                if len(pending) >= concurrency:
+                    for result in await _completed(pending, ordered):
+                        yield result
+        while pending:
+            for result in await _completed(pending, ordered):
+                yield result
+    finally:
+        for fut in pending:
+            fut.cancel()
+        if pending:
+            await asyncio.wait(pending)
+
+async def _map(gen: AsyncGenerator[T, None], f: Callable[[T], U]) -> AsyncGenerator[U, None]:
+    async with aclosing(gen):
+        async for x in gen:
+            yield f(x)
+
+async def _filter(gen: AsyncGenerator[T, None], predicate: Callable[[T], bool]) -> AsyncGenerator[T, None]:
+    async with aclosing(gen):
+        async for x in gen:
+            if predicate(x):
+                yield x
+
+async def _take(gen: AsyncGenerator[T, None], n: int) -> AsyncGenerator[T, None]:
+    if n <= 0:
+        await gen.aclose()
+        return
+    async with aclosing(gen):
+        count = 0
+        async for x in gen:
+            yield x
+            count += 1
+            if count >= n:
+                return
+
+async def _flat_map(gen: AsyncGenerator[T, None], f: Callable[[T], Iterable[U] | AsyncIterable[U]]) -> AsyncGenerator[U, None]:
+    async with aclosing(gen):
+        async for x in gen:
+            many = f(x)
+            if isinstance(many, AsyncIterable):
+                async for y in many:
+                    yield y
+            else:
+                for y in many:
+                    yield y
+
+async def _chunked(gen: AsyncGenerator[T, None], n: int) -> AsyncGenerator[list[T], None]:
+    chunk: list[T] = []
+    async with aclosing(gen):
+        async for x in gen:
+            chunk.append(x)
+            if len(chunk) >= n:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+class _EndOfBuffer:
+    error: BaseException | None
+    def __init__(self, error: BaseException | None = None):
+        self.error = error
+
+async def _buffer(gen: AsyncGenerator[T, None], n: int) -> AsyncGenerator[T, None]:
+    queue: asyncio.Queue[T | _EndOfBuffer] = asyncio.Queue(n)
+
+    async def produce():
+        try:
+            async with aclosing(gen):
+                async for x in gen:
+                    await queue.put(x)
+        except Exception as e:
+            await queue.put(_EndOfBuffer(e))
+        else:
+            await queue.put(_EndOfBuffer())
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            x = await queue.get()
+            if isinstance(x, _EndOfBuffer):
+                if x.error is not None:
+                    raise x.error
+                return
+            yield x
+    finally:
+        producer.cancel()
+        await asyncio.wait([producer])
+
+_END = object()
+
+class _Broadcast(Generic[T]):
+    '''
+    Items read from one generator, shared by several consumers.
+    Items are dropped once every consumer has passed them.
+    '''
+    gen: AsyncGenerator[T, None]
+    size: int
+    items: collections.deque[T]
+    start: int # index of items[0] in the whole sequence
+    positions: list[int | None] # of each consumer, None once closed
+    done: bool
+    error: Exception | None
+
+    _changed: asyncio.Condition
+    _fetch: 'asyncio.Task[None] | None'
+
+    def __init__(self, gen: AsyncGenerator[T, None], n: int, size: int):
+        self.gen = gen
+        self.size = size
+        self.items = collections.deque()
+        self.start = 0
+        self.positions = [0] * n
+        self.done = False
+        self.error = None
+        self._changed = asyncio.Condition()
+        self._fetch = None
+
+    def _trim(self):
+        active = [p for p in self.positions if p is not None]
+        lowest = min(active, default=self.start + len(self.items))
+        while self.start < lowest:
+            self.items.popleft()
+            self.start += 1
+
+    async def _pull(self):
+        try:
+            self.items.append(await anext(self.gen))
+        except StopAsyncIteration:
+            self.done = True
+        except Exception as e:
+            self.error = e
+            self.done = True
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _next(self, i: int) -> Any:
+        while True:
+            async with self._changed:
+                while True:
+                    position = cast(int, self.positions[i])
+                    if position < self.start + len(self.items):
+                        item = self.items[position - self.start]
+                        self.positions[i] = position + 1
+                        self._trim()
+                        self._changed.notify_all()
+                        return item
+                    elif self.done:
+                        if self.error is not None:
+                            raise self.error
+                        return _END
+                    elif self._fetch is not None and not self._fetch.done():
+                        break # wait for the item being read
+                    elif len(self.items) < self.size:
+                        self._fetch = asyncio.create_task(self._pull())
+                        break
+                    await self._changed.wait() # for the slowest consumer
+                fetch = self._fetch
+            # cancelling one consumer does not interrupt reading for the others
+            await asyncio.shield(fetch)
+
+    async def _leave(self, i: int):
+        if self.positions[i] is None:
+            return
+        self.positions[i] = None
+        self._trim()
+        async with self._changed:
+            self._changed.notify_all()
+        if all(p is None for p in self.positions):
+            if self._fetch is not None:
+                self._fetch.cancel()
+                await asyncio.wait([self._fetch])
+            await self.gen.aclose()
+
+    async def _consume(self, i: int) -> AsyncGenerator[T, None]:
+        try:
+            while (item := await self._next(i)) is not _END:
+                yield item
+        finally:
+            await self._leave(i)
+
+    def consume(self, i: int) -> AsyncGenerator[T, None]:
+        return _Consumer(self, i)
+
+class _Consumer(collections.abc.AsyncGenerator[T, None]):
+    '''
+    Consumer of a `_Broadcast`, which stops holding back the others when closed,
+    even if it was never started.
+    '''
+    _broadcast: _Broadcast[T]
+    _i: int
+    _gen: AsyncGenerator[T, None]
+
+    def __init__(self, broadcast: _Broadcast[T], i: int):
+        self._broadcast = broadcast
+        self._i = i
+        self._gen = broadcast._consume(i) # type: ignore ## reportPrivateUsage
+
+    def __anext__(self):
+        return self._gen.__anext__()
+
+    def asend(self, value: None):
+        return self._gen.asend(value)
+
+    def athrow(self, *args: Any):
+        return self._gen.athrow(*args)
+
+    async def aclose(self):
+        await self._gen.aclose()
+        await self._broadcast._leave(self._i) # type: ignore ## reportPrivateUsage
+
+AsyncTrans: TypeAlias = AsyncLazy[T]
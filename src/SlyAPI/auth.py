@@ -1,14 +1,26 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+import random
+import time
+from typing import Sequence
 
 from aiohttp import ClientSession as Client
 
-from .web import Request
+from .web import ApiError, Request
 
 class Auth(ABC):
     'Implement for any authentication scheme.'
     @abstractmethod
     async def sign(self, client: Client, request: Request) -> Request: pass
 
+    def should_retry(self, request: Request, error: ApiError) -> bool:
+        'Called when a request signed by this auth fails. Return True to sign and send it again.'
+        return False
+
+    def max_attempts(self) -> int:
+        'Most times one request is signed and sent, however often `should_retry` returns True.'
+        return 1
+
     @staticmethod
     def none() -> 'NoAuth': return NoAuth()
 
@@ -40,5 +52,115 @@ class NoAuth(Auth):
 
     async def sign(self, client: Client, request: Request) -> Request: return request
 
+# YouTube and other Google APIs answer 403 with one of these reasons when a key is spent
+_QUOTA_REASONS = ('quotaExceeded', 'dailyLimitExceeded', 'rateLimitExceeded')
+
+def _is_quota_error(error: ApiError) -> bool:
+    match error.status:
+        case 429: return True
+        case 403: return any(r in (error.reason or '') for r in _QUOTA_REASONS)
+        case _: return False
+
+@dataclass
+class PooledKey:
+    'One key of an `ApiKeyPool`, with its usage counters.'
+    key: UrlApiKey | HeaderApiKey
+    quota: int | None = None # requests allowed until `ApiKeyPool.reset_usage`
+    uses: int = 0
+    rejections: int = 0
+    benched_until: float = 0.0 # time.monotonic()
+
+    @property
+    def remaining(self) -> int | None:
+        return None if self.quota is None else max(self.quota - self.uses, 0)
+
+    @property
+    def benched(self) -> bool:
+        return time.monotonic() < self.benched_until
+
+    def _signed(self, request: Request) -> bool:
+        if isinstance(self.key, UrlApiKey):
+            secrets, used = self.key.params, request.query_params
+        else:
+            secrets, used = self.key.headers, request.headers
+        return all(used.get(k) == v for k, v in secrets.items())
+
+class ApiKeyPool(Auth):
+    '''
+    Several keys for the same API, used in turn to spread requests across their quotas.
+    Keys are chosen round-robin, or at random weighted by remaining quota.
+    When the server rejects a key for quota or rate limiting, it is benched for a
+    while and the request is retried with another key.
+    '''
+    keys: list[PooledKey]
+    weighted: bool
+    bench_seconds: float
+
+    _next: int
+
+    def __init__(self, keys: Sequence[UrlApiKey | HeaderApiKey | PooledKey],
+        weighted: bool = False, bench_seconds: float = 3600.0):
+        if not keys:
+            raise ValueError("ApiKeyPool needs at least one key")
+        self.keys = [k if isinstance(k, PooledKey) else PooledKey(k) for k in keys]
+        self.weighted = weighted
+        self.bench_seconds = bench_seconds
+        self._next = 0
+
+    @classmethod
+    def url(cls, param_name: str, secrets: Sequence[str], weighted: bool = False, bench_seconds: float = 3600.0) -> 'ApiKeyPool':
+        'Pool of `UrlApiKey`s for the same URL parameter.'
+        return cls([UrlApiKey(param_name, s) for s in secrets], weighted, bench_seconds)
+
+    @classmethod
+    def header(cls, param_name: str, secrets: Sequence[str], weighted: bool = False, bench_seconds: float = 3600.0) -> 'ApiKeyPool':
+        'Pool of `HeaderApiKey`s for the same header.'
+        return cls([HeaderApiKey(param_name, s) for s in secrets], weighted, bench_seconds)
+
+    def available(self) -> list[PooledKey]:
+        'Keys which are not currently benched.'
+        return [k for k in self.keys if not k.benched]
+
+    def reset_usage(self):
+        'Clear usage counters, such as when quotas are replenished.'
+        for k in self.keys:
+            k.uses = 0
+            k.rejections = 0
+
+    def _choose(self) -> PooledKey:
+        available = self.available()
+        if self.weighted:
+            weights = [1 if k.remaining is None else k.remaining for k in available]
+            if sum(weights) > 0:
+                return random.choices(available, weights)[0]
+        for i in range(len(self.keys)):
+            k = self.keys[(self._next + i) % len(self.keys)]
+            if not k.benched:
+                self._next = (self._next + i + 1) % len(self.keys)
+                return k
+        raise ApiError(429, "All keys in the pool are benched", None)
 
-
+    async def sign(self, client: Client, request: Request) -> Request:
+        pooled = self._choose()
+        pooled.uses += 1
+        return await pooled.key.sign(client, request)
+
+    def should_retry(self, request: Request, error: ApiError) -> bool:
+        if not _is_quota_error(error):
+            return False
+        pooled = next((k for k in self.keys if k._signed(request)), None) # type: ignore ## reportPrivateUsage
+        if pooled is None:
+            return False
+        pooled.rejections += 1
+        bench_seconds = self.bench_seconds
+        if error.status == 429 and error.response is not None:
+            retry_after = error.response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                # at least a second, since a key benched for 0 would be retried immediately
+                bench_seconds = max(float(retry_after), 1.0)
+        pooled.benched_until = time.monotonic() + bench_seconds
+        return bool(self.available())
+
+    def max_attempts(self) -> int:
+        'One attempt with each key.'
+        return len(self.keys)
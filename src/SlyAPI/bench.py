@@ -0,0 +1,365 @@
+'''
+Load testing a `WebAPI` against a local stub API, for `python -m SlyAPI bench`.
+'''
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import platform
+import random
+import sys
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from multiprocessing.connection import Connection
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+import aiohttp
+from aiohttp import web
+
+from .auth import Auth
+from .web import ApiError
+
+if TYPE_CHECKING:
+    from .webapi import WebAPI
+
+PERCENTILES = {'p50': 0.5, 'p90': 0.9, 'p99': 0.99, 'p999': 0.999}
+
+# features of WebAPI which can be enabled for a run, by name
+FEATURES = ['adaptive', 'breaker', 'hedging', 'scheduler', 'lazy']
+
+@dataclass
+class StubOptions:
+    'How the stub API responds.'
+    latency: float = 0.005 # seconds, before each response
+    jitter: float = 0.0 # fraction the latency varies by, uniformly
+    items_per_page: int = 10
+    item_bytes: int = 200 # approximate JSON size of each item
+    pages: int = 1 # how many pages each listing has
+    statuses: dict[int, float] = field(default_factory=dict) # chance of each error status
+    seed: int | None = None
+
+def stub_app(options: StubOptions) -> web.Application:
+    '''
+    A paginated `GET /items` endpoint in the style of Google APIs, with `pageToken`
+    and `nextPageToken`, and `GET /_stats` with the count of responses by status.
+    '''
+    rng = random.Random(options.seed)
+    statuses: Counter[int] = Counter()
+    pages: dict[int, bytes] = {}
+
+    def page(number: int) -> bytes:
+        if number not in pages:
+            filler = 'x' * max(0, options.item_bytes - 40)
+            items = [{'id': F'{number}-{i}', 'data': filler} for i in range(options.items_per_page)]
+            body: dict[str, Any] = {'kind': 'stub#itemList', 'items': items}
+            if number + 1 < options.pages:
+                body['nextPageToken'] = str(number + 1)
+            pages[number] = json.dumps(body).encode()
+        return pages[number]
+
+    async def items(request: web.Request):
+        if options.latency > 0:
+            await asyncio.sleep(options.latency * rng.uniform(1 - options.jitter, 1 + options.jitter))
+        roll = rng.random()
+        for status, chance in options.statuses.items():
+            if roll < chance:
+                statuses[status] += 1
+                return web.json_response({'error': {'code': status}}, status=status)
+            roll -= chance
+        statuses[200] += 1
+        number = int(request.query.get('pageToken', 0))
+        return web.Response(body=page(number), content_type='application/json')
+
+    async def stats(_request: web.Request):
+        return web.json_response({str(status): count for status, count in statuses.items()})
+
+    app = web.Application()
+    app.router.add_get('/items', items)
+    app.router.add_get('/_stats', stats)
+    return app
+
+async def _serve(options: StubOptions, conn: Connection):
+    runner = web.AppRunner(stub_app(options), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    conn.send(runner.addresses[0][1])
+    try:
+        # until told to stop, or the parent is gone
+        await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+    except EOFError:
+        pass
+    finally:
+        await runner.cleanup()
+
+def _serve_process(options: StubOptions, conn: Connection):
+    asyncio.run(_serve(options, conn))
+
+class StubServer:
+    '''
+    Runs the stub API in another process, so that its CPU time and memory
+    are not counted with those of the client.
+    '''
+    options: StubOptions
+    url: str
+
+    _process: Any
+    _conn: Connection | None
+
+    def __init__(self, options: StubOptions):
+        self.options = options
+        self.url = ''
+        self._process = None
+        self._conn = None
+
+    def __enter__(self) -> 'StubServer':
+        context = multiprocessing.get_context('spawn')
+        self._conn, child = context.Pipe()
+        self._process = context.Process(target=_serve_process, args=(self.options, child), daemon=True)
+        self._process.start()
+        child.close()
+        self.url = F"http://127.0.0.1:{self._conn.recv()}"
+        return self
+
+    def __exit__(self, *_exc: Any):
+        if self._conn is not None:
+            self._conn.send(None)
+            self._conn.close()
+        if self._process is not None:
+            self._process.join(5)
+            if self._process.is_alive():
+                self._process.kill()
+
+@dataclass
+class LoadOptions:
+    'How the client is driven.'
+    concurrency: int = 16 # requests in flight, or the most allowed in flight with a rate
+    rate: float | None = None # operations started per second, regardless of how long they take
+    duration: float = 10.0 # seconds
+    operations: int | None = None # stop after this many, if sooner
+    warmup: float = 1.0 # seconds of load before measuring
+    paginate: bool = False # each operation lists every page, instead of getting one
+    features: list[str] = field(default_factory=list)
+
+@dataclass
+class BenchResult:
+    stub: StubOptions
+    load: LoadOptions
+    slyapi_version: str
+    python_version: str
+    operations: int
+    errors: dict[str, int] # by status, or exception type
+    responses: dict[str, int] # by status, as counted by the stub
+    seconds: float
+    throughput: float # operations per second
+    latency_ms: dict[str, float] # percentiles, mean and max
+    histogram_ms: list[tuple[float, int]] # upper bound of each bucket, and its count
+    cpu_ms_per_operation: float
+    peak_rss_bytes: int | None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    'Nearest-rank percentile of an already sorted list.'
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(q * len(sorted_values) - 1e-9) # e.g. 0.999 * 1000 is slightly over 999
+    return sorted_values[min(len(sorted_values), max(1, rank)) - 1]
+
+def histogram(values_ms: list[float]) -> list[tuple[float, int]]:
+    'Counts in buckets which double in size, from 0.125 ms.'
+    counts: Counter[float] = Counter()
+    for value in values_ms:
+        bound = 0.125
+        while value > bound:
+            bound *= 2
+        counts[bound] += 1
+    return sorted(counts.items())
+
+def _peak_rss() -> int | None:
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def _version() -> str:
+    try:
+        from importlib.metadata import version
+        return version('SlyAPI')
+    except Exception:
+        return 'unknown'
+
+def bench_api(url: str, features: list[str]) -> 'WebAPI':
+    'A `WebAPI` for the stub API, with some features enabled.'
+    from .webapi import WebAPI
+    attributes: dict[str, Any] = {'base_url': url}
+    for feature in features:
+        match feature:
+            case 'adaptive':
+                from .concurrency import AdaptiveConcurrency
+                attributes['concurrency'] = AdaptiveConcurrency()
+            case 'breaker':
+                from .breaker import CircuitBreaker
+                attributes['breaker'] = CircuitBreaker()
+            case 'hedging':
+                from .hedging import HedgePolicy
+                attributes['hedging'] = HedgePolicy()
+            case 'scheduler':
+                from .scheduler import PriorityScheduler
+                attributes['scheduler'] = PriorityScheduler()
+            case 'lazy':
+                pass # used by the operation
+            case _:
+                raise ValueError(F"Unknown feature {feature!r}, expected one of {', '.join(FEATURES)}")
+    return type('BenchAPI', (WebAPI,), attributes)(Auth.none())
+
+async def _drive(operation: Callable[[], Awaitable[Any]], load: LoadOptions, seconds: float,
+        latencies: list[float], errors: Counter[str]) -> int:
+    'Run operations for some seconds, and return how many.'
+    start = time.perf_counter()
+    end = start + seconds
+    started = 0
+
+    async def measure(due: float):
+        try:
+            await operation()
+        except ApiError as e:
+            errors[str(e.status)] += 1
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            errors[type(e).__name__] += 1
+        latencies.append(time.perf_counter() - due)
+
+    def more() -> bool:
+        return time.perf_counter() < end and (load.operations is None or started < load.operations)
+
+    if load.rate is None:
+        async def worker():
+            nonlocal started
+            while more():
+                started += 1
+                await measure(time.perf_counter())
+        await asyncio.gather(*(worker() for _ in range(load.concurrency)))
+    else:
+        # latency is measured from when each operation was due, so that queueing
+        # behind slow ones is counted instead of hidden
+        slots = asyncio.Semaphore(load.concurrency)
+        async def limited(due: float):
+            async with slots:
+                await measure(due)
+        running: set[asyncio.Task[None]] = set()
+        while more():
+            due = start + started / load.rate
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            started += 1
+            task = asyncio.ensure_future(limited(due))
+            running.add(task)
+            task.add_done_callback(running.discard)
+        if running:
+            await asyncio.wait(running)
+    return started
+
+async def run_bench(url: str, stub: StubOptions, load: LoadOptions) -> BenchResult:
+    'Drive a `WebAPI` at the stub API served from `url`.'
+    async with bench_api(url, load.features) as api:
+        lazy = 'lazy' in load.features
+        if load.paginate:
+            async def operation() -> Any:
+                return await api.paginated('/items', {}, None, lazy=lazy) # type: ignore ## overload on lazy
+        elif lazy:
+            from .jsonview import JsonObjectView
+            async def operation() -> Any:
+                return await api._get(JsonObjectView, '/items') # type: ignore ## reportPrivateUsage
+        else:
+            async def operation() -> Any:
+                return await api.get_json('/items')
+
+        if load.warmup > 0:
+            await _drive(operation, load, load.warmup, [], Counter())
+        async with api._client.get(F'{url}/_stats') as resp: # type: ignore ## reportPrivateUsage
+            before: dict[str, int] = await resp.json()
+
+        latencies: list[float] = []
+        errors: Counter[str] = Counter()
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        operations = await _drive(operation, load, load.duration, latencies, errors)
+        cpu, seconds = time.process_time() - cpu_start, time.perf_counter() - wall_start
+
+        async with api._client.get(F'{url}/_stats') as resp: # type: ignore ## reportPrivateUsage
+            after: dict[str, int] = await resp.json()
+
+    latencies_ms = sorted(latency * 1000 for latency in latencies)
+    summary = {name: percentile(latencies_ms, q) for name, q in PERCENTILES.items()}
+    summary['mean'] = sum(latencies_ms) / len(latencies_ms) if latencies_ms else 0.0
+    summary['max'] = latencies_ms[-1] if latencies_ms else 0.0
+    return BenchResult(
+        stub, load, _version(), platform.python_version(),
+        operations, dict(errors),
+        {status: count - before.get(status, 0) for status, count in after.items() if count > before.get(status, 0)},
+        seconds, operations / seconds if seconds > 0 else 0.0,
+        summary, histogram(latencies_ms),
+        cpu * 1000 / operations if operations else 0.0,
+        _peak_rss())
+
+def format_result(result: BenchResult) -> str:
+    lines = [
+        F"{result.operations} operations in {result.seconds:.2f} s: {result.throughput:.1f}/s",
+        F"responses: {', '.join(F'{s}: {n}' for s, n in sorted(result.responses.items())) or 'none'}",
+    ]
+    if result.errors:
+        lines.append(F"errors: {', '.join(F'{e}: {n}' for e, n in sorted(result.errors.items()))}")
+    lines.append('latency (ms): ' + ', '.join(F'{name} {value:.2f}' for name, value in result.latency_ms.items()))
+    most = max((count for _, count in result.histogram_ms), default=0)
+    for bound, count in result.histogram_ms:
+        bar = '#' * max(1, round(40 * count / most))
+        lines.append(F"  <= {bound:>9.3f} ms {count:>8} {bar}")
+    lines.append(F"CPU per operation: {result.cpu_ms_per_operation:.3f} ms")
+    if result.peak_rss_bytes is not None:
+        lines.append(F"peak memory: {result.peak_rss_bytes / (1 << 20):.1f} MiB")
+    return '\n'.join(lines)
+
+def _status_chance(arg: str) -> tuple[int, float]:
+    status, _, chance = arg.partition('=')
+    return int(status), float(chance)
+
+def parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog='SlyAPI bench',
+        description="Drive a WebAPI at a local stub API, and report throughput, latency, CPU and memory.")
+    stub = p.add_argument_group('stub API')
+    stub.add_argument('--latency', type=float, default=5.0, help="ms before each response (default 5)")
+    stub.add_argument('--jitter', type=float, default=0.0, help="fraction the latency varies by (default 0)")
+    stub.add_argument('--items', type=int, default=10, help="items per page (default 10)")
+    stub.add_argument('--item-bytes', type=int, default=200, help="JSON size of each item (default 200)")
+    stub.add_argument('--pages', type=int, default=1, help="pages of each listing (default 1)")
+    stub.add_argument('--status', type=_status_chance, action='append', default=[], metavar='CODE=CHANCE',
+        help="respond with an error status by chance, e.g. 503=0.01 (repeatable)")
+    stub.add_argument('--seed', type=int, default=None)
+    load = p.add_argument_group('load')
+    load.add_argument('--concurrency', type=int, default=16, help="operations in flight (default 16)")
+    load.add_argument('--rate', type=float, default=None,
+        help="operations started per second, with --concurrency as the most in flight")
+    load.add_argument('--duration', type=float, default=10.0, help="seconds (default 10)")
+    load.add_argument('--operations', type=int, default=None, help="stop after this many operations")
+    load.add_argument('--warmup', type=float, default=1.0, help="seconds before measuring (default 1)")
+    load.add_argument('--paginate', action='store_true', help="list every page, instead of getting one")
+    load.add_argument('--feature', choices=FEATURES, action='append', default=[],
+        help="enable a WebAPI feature (repeatable)")
+    p.add_argument('--json', metavar='FILE', help="also write the results to a JSON file")
+    return p
+
+async def bench_command(args: list[str]):
+    options = parser().parse_args(args)
+    stub = StubOptions(options.latency / 1000, options.jitter, options.items, options.item_bytes,
+        options.pages, dict(options.status), options.seed)
+    load = LoadOptions(options.concurrency, options.rate, options.duration, options.operations,
+        options.warmup, options.paginate, options.feature)
+    with StubServer(stub) as server:
+        result = await run_bench(server.url, stub, load)
+    print(format_result(result))
+    if options.json:
+        with open(options.json, 'w', encoding='utf8') as f:
+            json.dump(result.to_dict(), f, indent=2)
@@ -0,0 +1,156 @@
+'''
+Circuit breakers, to fail fast while an upstream API is failing or slow.
+'''
+import collections
+import time
+from enum import Enum
+from typing import Callable
+
+from .web import ApiError
+
+class CircuitState(Enum):
+    CLOSED = 'closed' # requests are sent
+    OPEN = 'open' # requests fail immediately
+    HALF_OPEN = 'half-open' # a few probe requests are sent to test for recovery
+
+class CircuitOpen(ApiError):
+    'A request was refused locally because the circuit breaker for its group is open.'
+    group: str
+    retry_after: float
+
+    def __init__(self, group: str, retry_after: float):
+        super().__init__(503, F"Circuit open for {group}, retry in {retry_after:.1f}s", None)
+        self.group = group
+        self.retry_after = retry_after
+
+class Circuit:
+    '''
+    State of one group of endpoints within a `CircuitBreaker`.
+    Opens when too many of its recent calls failed or were slow.
+    '''
+    group: str
+    breaker: 'CircuitBreaker'
+    state: CircuitState
+
+    _calls: collections.deque[tuple[bool, bool]] # (failed, slow)
+    _opened_at: float
+    _generation: int # of the half-open state, so that probes from an earlier one are ignored
+    _probing: int
+    _probe_successes: int
+
+    def __init__(self, group: str, breaker: 'CircuitBreaker'):
+        self.group = group
+        self.breaker = breaker
+        self.state = CircuitState.CLOSED
+        self._calls = collections.deque(maxlen=breaker.window)
+        self._opened_at = 0.0
+        self._generation = 0
+        self._probing = 0
+        self._probe_successes = 0
+
+    def before_call(self) -> int | None:
+        '''
+        Raises CircuitOpen if a call may not be made now.
+        If the call is a half-open probe, returns its generation, to pass back to `record` or `cancel`.
+        '''
+        if self.state == CircuitState.OPEN:
+            retry_after = self._opened_at + self.breaker.open_seconds - time.monotonic()
+            if retry_after > 0:
+                raise CircuitOpen(self.group, retry_after)
+            self._transition(CircuitState.HALF_OPEN)
+        if self.state == CircuitState.HALF_OPEN:
+            if self._probing + self._probe_successes >= self.breaker.half_open_probes:
+                raise CircuitOpen(self.group, 0.0)
+            self._probing += 1
+            return self._generation
+        return None
+
+    def _is_current(self, probe: int) -> bool:
+        return self.state == CircuitState.HALF_OPEN and probe == self._generation
+
+    def record(self, latency: float | None, failed: bool, probe: int | None):
+        'Outcome of a call, with the time until its response arrived, or None if none did.'
+        slow = latency is None or latency >= self.breaker.slow_call_seconds
+        if probe is not None:
+            if not self._is_current(probe):
+                return # sent before the circuit last changed state
+            self._probing -= 1
+            if failed or slow:
+                self._open()
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.breaker.half_open_probes:
+                    self._calls.clear()
+                    self._transition(CircuitState.CLOSED)
+            return
+        if self.state != CircuitState.CLOSED:
+            return # started before the circuit opened
+        self._calls.append((failed, slow))
+        if len(self._calls) < self.breaker.min_calls:
+            return
+        failures = sum(f for f, _ in self._calls) / len(self._calls)
+        slow_calls = sum(s for _, s in self._calls) / len(self._calls)
+        if failures >= self.breaker.failure_rate or slow_calls >= self.breaker.slow_call_rate:
+            self._open()
+
+    def cancel(self, probe: int | None):
+        'A call was cancelled before its outcome was known.'
+        if probe is not None and self._is_current(probe):
+            self._probing -= 1
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._transition(CircuitState.OPEN)
+
+    def _transition(self, state: CircuitState):
+        old, self.state = self.state, state
+        self._generation += 1
+        self._probing = 0
+        self._probe_successes = 0
+        if self.breaker.on_transition is not None:
+            self.breaker.on_transition(self.group, old, state)
+
+class CircuitBreaker:
+    '''
+    A `Circuit` for each group of endpoints, such as each host.
+    See `WebAPI._endpoint_group`.
+
+    A circuit opens when, of its last `window` calls (and at least `min_calls`),
+    the fraction that failed reaches `failure_rate`, or the fraction slower than
+    `slow_call_seconds` reaches `slow_call_rate`. Calls fail if no response
+    arrived or its status was 5xx.
+    After `open_seconds`, up to `half_open_probes` calls are let through:
+    if all of them succeed the circuit closes, otherwise it opens again.
+    '''
+    failure_rate: float
+    slow_call_rate: float
+    slow_call_seconds: float
+    window: int
+    min_calls: int
+    open_seconds: float
+    half_open_probes: int
+    on_transition: Callable[[str, CircuitState, CircuitState], None] | None
+    circuits: dict[str, Circuit]
+
+    def __init__(self, failure_rate: float = 0.5, slow_call_rate: float = 1.0,
+            slow_call_seconds: float = 10.0, window: int = 20, min_calls: int = 10,
+            open_seconds: float = 30.0, half_open_probes: int = 1,
+            on_transition: Callable[[str, CircuitState, CircuitState], None] | None = None):
+        '`on_transition` is called with the group, old state and new state of a circuit.'
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.window = window
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.on_transition = on_transition
+        self.circuits = {}
+
+    def circuit(self, group: str) -> Circuit:
+        if (circuit := self.circuits.get(group)) is None:
+            circuit = self.circuits[group] = Circuit(group, self)
+        return circuit
+
+    def state(self) -> dict[str, CircuitState]:
+        return {group: circuit.state for group, circuit in self.circuits.items()}
@@ -0,0 +1,259 @@
+'''
+Persistent cache of GET responses, shared across runs and processes.
+'''
+import asyncio
+import json
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Mapping
+
+from multidict import CIMultiDict, CIMultiDictProxy
+
+from .web import Request
+
+if TYPE_CHECKING:
+    from aiohttp import ClientResponse
+
+_MAX_AGE = re.compile(r'max-age=(\d+)')
+
+# describe the response as sent, not the decoded body that is stored
+_UNSTORED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+
+@dataclass
+class CacheStats:
+    'Counts of cache lookups by this process.'
+    hits: int = 0 # fresh, served without a request
+    revalidated: int = 0 # stale, but the server answered 304 Not Modified
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+
+class CachedResponse:
+    'Stands in for `aiohttp.ClientResponse` when a response is served from the cache.'
+    status: int
+    headers: CIMultiDictProxy[str]
+    _body: bytes
+
+    def __init__(self, status: int, headers: Mapping[str, str], body: bytes):
+        self.status = status
+        self.headers = CIMultiDictProxy(CIMultiDict(headers))
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def text(self, encoding: str | None = None) -> str:
+        return self._body.decode(encoding or 'utf8')
+
+    async def json(self, **_kwargs: Any) -> Any:
+        return json.loads(self._body)
+
+@dataclass
+class CacheEntry:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+    expires: float # time.time()
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires
+
+    def validators(self) -> dict[str, str]:
+        'Headers to ask the server whether this entry is still current.'
+        headers: dict[str, str] = {}
+        if self.etag is not None:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified is not None:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def response(self) -> CachedResponse:
+        return CachedResponse(self.status, self.headers, self.body)
+
+class DiskCache:
+    '''
+    GET responses stored in a SQLite database, with compressed bodies.
+    Several processes may use the same file at once.
+    When the total size of stored bodies exceeds `max_bytes`, the least recently used are evicted.
+
+    Responses are stored by URL and parameters, before being signed. If different
+    credentials see different responses for the same URL, use a separate `namespace` for each.
+    '''
+    path: str
+    max_bytes: int
+    default_ttl: float
+    respect_cache_control: bool
+    namespace: str
+    stats: CacheStats
+
+    _db: sqlite3.Connection
+    _lock: threading.Lock
+
+    def __init__(self, path: str, max_bytes: int = 256 << 20, default_ttl: float = 300.0,
+            respect_cache_control: bool = True, namespace: str = ''):
+        '''
+        Responses are fresh for `default_ttl` seconds, unless the server sends a max-age.
+        Many APIs send `private, max-age=0` for every response: to cache those
+        for `default_ttl` anyway, disable `respect_cache_control`.
+        '''
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.respect_cache_control = respect_cache_control
+        self.namespace = namespace
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        # so that rows replaced by INSERT OR REPLACE are subtracted from the total
+        self._db.execute('PRAGMA recursive_triggers=ON')
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            self._db.execute('''
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires REAL NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    accessed REAL NOT NULL
+                )''')
+            self._db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+            # running total of stored sizes, kept by triggers so that every process sees it
+            if self._db.execute("SELECT 1 FROM sqlite_master WHERE name = 'total_size'").fetchone() is None:
+                self._db.execute('CREATE TABLE total_size (size INTEGER NOT NULL)')
+                self._db.execute('INSERT INTO total_size SELECT COALESCE(SUM(size), 0) FROM responses')
+            self._db.execute('''
+                CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses
+                BEGIN UPDATE total_size SET size = size + NEW.size; END''')
+            self._db.execute('''
+                CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses
+                BEGIN UPDATE total_size SET size = size - OLD.size; END''')
+            self._db.execute('COMMIT')
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+
+    def key(self, request: Request) -> str:
+        params = '&'.join(F'{k}={v}' for k, v in sorted(request.query_params.items()))
+        return F"{self.namespace} {request.method.value} {request.url}?{params}"
+
+    def _get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._db.execute(
+                'SELECT status, headers, body, expires, etag, last_modified FROM responses WHERE key = ?',
+                (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+        status, headers, body, expires, etag, last_modified = row
+        return CacheEntry(status, json.loads(headers), zlib.decompress(body), expires, etag, last_modified)
+
+    def _ttl(self, headers: Mapping[str, str]) -> float | None:
+        'Seconds a response is fresh for, or None if it may not be stored.'
+        cache_control = headers.get('Cache-Control', '').lower()
+        if 'no-store' in cache_control:
+            return None
+        if not self.respect_cache_control:
+            return self.default_ttl
+        if 'private' in cache_control and not self.namespace:
+            return None
+        if 'no-cache' in cache_control:
+            return 0.0
+        if (max_age := _MAX_AGE.search(cache_control)) is not None:
+            return float(max_age.group(1))
+        return self.default_ttl
+
+    def _put(self, key: str, status: int, headers: Mapping[str, str], body: bytes) -> bool:
+        ttl = self._ttl(headers)
+        if ttl is None:
+            return False
+        compressed = zlib.compress(body)
+        stored_headers = {k: v for k, v in headers.items() if k.lower() not in _UNSTORED_HEADERS}
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                self._db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                    key, status, json.dumps(stored_headers), compressed, len(compressed),
+                    now + ttl, headers.get('ETag'), headers.get('Last-Modified'), now))
+                self.stats.evictions += self._evict()
+                self._db.execute('COMMIT')
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+        return True
+
+    def _evict(self) -> int:
+        (total,) = self._db.execute('SELECT size FROM total_size').fetchone()
+        evicted = 0
+        while total > self.max_bytes:
+            oldest = self._db.execute('SELECT key, size FROM responses ORDER BY accessed LIMIT 16').fetchall()
+            if not oldest:
+                break
+            for key, size in oldest:
+                self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+                evicted += 1
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        return evicted
+
+    def _refresh(self, key: str, headers: Mapping[str, str]):
+        ttl = self._ttl(headers)
+        with self._lock:
+            if ttl is None:
+                self._db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            else:
+                self._db.execute('UPDATE responses SET expires = ? WHERE key = ?', (time.time() + ttl, key))
+
+    async def get(self, key: str) -> CacheEntry | None:
+        'Look up a stored response, fresh or not.'
+        entry = await asyncio.to_thread(self._get, key)
+        if entry is not None and entry.fresh:
+            self.stats.hits += 1
+        return entry
+
+    async def put(self, key: str, status: int, headers: Mapping[str, str], body: bytes):
+        'Store a response, unless its headers forbid it.'
+        self.stats.misses += 1
+        if await asyncio.to_thread(self._put, key, status, headers, body):
+            self.stats.stores += 1
+
+    async def put_response(self, key: str, response: 'ClientResponse'):
+        '''
+        Store a response as it is received. Its body is only read
+        if its headers allow it to be stored, so others can still be streamed.
+        '''
+        if self._ttl(response.headers) is None:
+            self.stats.misses += 1
+            return
+        await self.put(key, response.status, response.headers, await response.read())
+
+    async def revalidated(self, key: str, headers: Mapping[str, str]):
+        'The server confirmed a stale response is still current.'
+        self.stats.revalidated += 1
+        await asyncio.to_thread(self._refresh, key, headers)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM responses')
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._db.execute('SELECT COUNT(*) FROM responses').fetchone()
+        return count
@@ -0,0 +1,138 @@
+'''
+Concurrency limits which adapt to how much load an upstream API can take.
+'''
+import asyncio
+import collections
+import time
+from dataclasses import dataclass
+
+@dataclass
+class LimitState:
+    'Snapshot of an `AdaptiveLimit`.'
+    limit: int
+    in_flight: int
+    queued: int
+    latency: float | None # smoothed, in seconds
+    baseline_latency: float | None
+
+class AdaptiveLimit:
+    '''
+    Limit on requests in flight, adjusted by additive increase and multiplicative decrease.
+    The limit grows by about one per round of requests while latency stays near its baseline,
+    shrinks a little when latency rises, and is cut when requests are throttled or fail.
+    '''
+    limit: float
+    min_limit: int
+    max_limit: int
+    tolerance: float
+    backoff: float
+    in_flight: int
+
+    _waiters: collections.deque['asyncio.Future[None]']
+    _latency: float | None
+    _baseline: float | None
+    _last_decrease: float
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 256,
+            tolerance: float = 2.0, backoff: float = 0.5):
+        '''
+        Latency above `tolerance` times the baseline counts as congestion.
+        Throttling multiplies the limit by `backoff`.
+        '''
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters = collections.deque()
+        self._latency = None
+        self._baseline = None
+        self._last_decrease = 0.0
+
+    def state(self) -> LimitState:
+        return LimitState(int(self.limit), self.in_flight, len(self._waiters), self._latency, self._baseline)
+
+    async def acquire(self):
+        'Wait for a slot to send a request.'
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled(): # slot was already handed over
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, latency: float | None, throttled: bool = False):
+        '''
+        Give back a slot, with the time until the response arrived,
+        or None if no response arrived.
+        '''
+        self.in_flight -= 1
+        now = time.monotonic()
+        if latency is None or throttled:
+            self._decrease(now, self.backoff)
+        else:
+            self._observe(latency)
+            if latency > self.tolerance * (self._baseline or latency):
+                self._decrease(now, 0.9)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+        self._wake()
+
+    def cancel(self):
+        'Give back a slot from a request cancelled before its response arrived.'
+        self.in_flight -= 1
+        self._wake()
+
+    def _observe(self, latency: float):
+        if self._latency is None or self._baseline is None:
+            self._latency = self._baseline = latency
+            return
+        self._latency += (latency - self._latency) * 0.1
+        # the lowest latency seen, drifting up slowly in case the upstream's normal latency changed
+        self._baseline = min(latency, self._baseline + (latency - self._baseline) * 0.01)
+
+    def _decrease(self, now: float, factor: float):
+        # requests already in flight report the same congestion, so only react once per round trip
+        if now - self._last_decrease < (self._latency or 0.0):
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * factor)
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+class AdaptiveConcurrency:
+    '''
+    An `AdaptiveLimit` for each group of endpoints, such as each host.
+    See `WebAPI._endpoint_group`.
+    '''
+    limits: dict[str, AdaptiveLimit]
+
+    _settings: tuple[int, int, int, float, float]
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 256,
+            tolerance: float = 2.0, backoff: float = 0.5):
+        self.limits = {}
+        self._settings = (initial, min_limit, max_limit, tolerance, backoff)
+
+    def limit(self, group: str) -> AdaptiveLimit:
+        if (limit := self.limits.get(group)) is None:
+            limit = self.limits[group] = AdaptiveLimit(*self._settings)
+        return limit
+
+    def state(self) -> dict[str, LimitState]:
+        'Current limit, requests in flight, and queue depth of each group.'
+        return {group: limit.state() for group, limit in self.limits.items()}
@@ -0,0 +1,188 @@
+'''
+Downloads of large resources to files, in byte ranges fetched concurrently.
+'''
+import asyncio
+import os
+import re
+import threading
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from typing import IO, TYPE_CHECKING, Callable, cast
+
+import aiohttp
+
+from .asyncy import AsyncLazy
+from .web import ApiError, DeadlineExceeded, Method, Request, current_timeouts, with_timeouts
+
+if TYPE_CHECKING:
+    from .webapi import WebAPI
+
+_CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+class IncompleteDownload(Exception):
+    'A download ended with a different size than the server reported.'
+    expected: int
+    received: int
+
+    def __init__(self, expected: int, received: int):
+        super().__init__(F"Expected {expected} bytes, but received {received}")
+        self.expected = expected
+        self.received = received
+
+@dataclass
+class DownloadProgress:
+    received: int = 0
+    total: int | None = None
+    ranges: int = 0 # 0 if downloaded in one request
+    retries: int = 0
+
+@dataclass
+class _Probe:
+    size: int | None
+    ranged: bool
+    etag: str | None
+
+def _should_retry(error: Exception) -> bool:
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, ApiError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, IncompleteDownload))
+
+def _write_at(file: IO[bytes], lock: threading.Lock, offset: int, data: bytes):
+    with lock:
+        file.seek(offset)
+        file.write(data)
+
+class RangedDownload:
+    '''
+    Downloads a resource to a file. If the server accepts byte ranges, parts of
+    `part_size` bytes are fetched over up to `concurrency` requests at once, and
+    written into place in a preallocated file. A failed part is retried from the
+    last byte it received, up to `max_retries` times.
+
+    Each request is signed and sent like any other request of the API, but
+    skips its cache, asks for no compression, and has no total time limit:
+    only connecting and stalls are limited.
+    The file is written next to its destination, and moved there once complete.
+    '''
+    api: 'WebAPI'
+    url: str
+    params: dict[str, str | int]
+    part_size: int
+    concurrency: int
+    max_retries: int
+    progress: DownloadProgress
+    on_progress: Callable[[DownloadProgress], None] | None
+
+    def __init__(self, api: 'WebAPI', url: str, params: dict[str, str | int] | None = None,
+            part_size: int = 8 << 20, concurrency: int = 4, max_retries: int = 3,
+            on_progress: Callable[[DownloadProgress], None] | None = None):
+        self.api = api
+        self.url = url
+        self.params = params or {}
+        self.part_size = part_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.progress = DownloadProgress()
+        self.on_progress = on_progress
+
+    def _request(self, method: Method, headers: dict[str, str] | None = None) -> Request:
+        # sizes and ranges are of the bytes sent, so they must not be compressed
+        return Request(method, self.url, dict(self.params), {'Accept-Encoding': 'identity'} | (headers or {}))
+
+    def _send(self, request: Request) -> AbstractAsyncContextManager[aiohttp.ClientResponse]:
+        # the body is streamed to the file, so it cannot be read from or stored in the cache
+        return cast(AbstractAsyncContextManager[aiohttp.ClientResponse],
+            self.api._send(request, use_cache=False)) # type: ignore ## reportPrivateUsage
+
+    async def probe(self) -> _Probe:
+        'Find the size of the resource, and whether the server accepts ranges.'
+        try:
+            async with self._send(self._request(Method.HEAD)) as resp:
+                length = resp.headers.get('Content-Length')
+                return _Probe(int(length) if length is not None else None,
+                    resp.headers.get('Accept-Ranges', '').lower() == 'bytes',
+                    resp.headers.get('ETag'))
+        except ApiError as e:
+            if e.status not in (403, 405, 501): # HEAD not allowed, e.g. on presigned GET URLs
+                raise
+        async with self._send(self._request(Method.GET, {'Range': 'bytes=0-0'})) as resp:
+            content_range = _CONTENT_RANGE.fullmatch(resp.headers.get('Content-Range', ''))
+            if resp.status == 206 and content_range and content_range.group(3) != '*':
+                return _Probe(int(content_range.group(3)), True, resp.headers.get('ETag'))
+            length = resp.headers.get('Content-Length')
+            return _Probe(int(length) if length is not None else None, False, None)
+
+    def _received(self, count: int):
+        self.progress.received += count
+        if self.on_progress is not None:
+            self.on_progress(self.progress)
+
+    async def _fetch(self, file: IO[bytes], lock: threading.Lock, start: int, end: int, etag: str | None):
+        'Write the bytes from start to end, inclusive, retrying from where a failed attempt stopped.'
+        offset = start
+        failures = 0
+        while offset <= end:
+            headers = {'Range': F"bytes={offset}-{end}"}
+            if etag is not None:
+                headers['If-Range'] = etag # a changed resource is sent whole, instead of mixing versions
+            try:
+                async with self._send(self._request(Method.GET, headers)) as resp:
+                    if resp.status != 206:
+                        raise ApiError(resp.status, "Resource changed or ranges not supported during download", None)
+                    async for data in resp.content.iter_chunked(1 << 16):
+                        data = data[:end + 1 - offset]
+                        await asyncio.to_thread(_write_at, file, lock, offset, data)
+                        offset += len(data)
+                        self._received(len(data))
+                if offset <= end:
+                    raise IncompleteDownload(end - start + 1, offset - start)
+            except Exception as e:
+                if not _should_retry(e):
+                    raise
+                failures += 1
+                self.progress.retries += 1
+                if failures > self.max_retries:
+                    raise
+                await asyncio.sleep(min(2.0 ** failures / 4, 30.0))
+
+    async def _fetch_whole(self, file: IO[bytes]):
+        async with self._send(self._request(Method.GET)) as resp:
+            async for data in resp.content.iter_chunked(1 << 16):
+                await asyncio.to_thread(file.write, data)
+                self._received(len(data))
+
+    async def run(self, path: str | os.PathLike[str]) -> DownloadProgress:
+        'Download to a file path.'
+        with with_timeouts(current_timeouts(self.api.timeouts).for_transfer()):
+            return await self._run(path)
+
+    async def _run(self, path: str | os.PathLike[str]) -> DownloadProgress:
+        probe = await self.probe()
+        self.progress.total = probe.size
+        partial = F"{os.fspath(path)}.part"
+        file = await asyncio.to_thread(open, partial, 'wb')
+        try:
+            if probe.ranged and probe.size is not None and probe.size > self.part_size:
+                await asyncio.to_thread(file.truncate, probe.size)
+                lock = threading.Lock()
+                parts = [(start, min(start + self.part_size, probe.size) - 1)
+                    for start in range(0, probe.size, self.part_size)]
+                self.progress.ranges = len(parts)
+                async def fetch(part: tuple[int, int]):
+                    await self._fetch(file, lock, *part, probe.etag)
+                await AsyncLazy.from_iterable(parts).map_async(fetch, self.concurrency, ordered=False)
+            else:
+                await self._fetch_whole(file)
+            await asyncio.to_thread(file.close)
+            size = os.path.getsize(partial)
+            if probe.size is not None and size != probe.size:
+                raise IncompleteDownload(probe.size, size)
+            os.replace(partial, path)
+        except BaseException:
+            await asyncio.to_thread(file.close)
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return self.progress
@@ -0,0 +1,55 @@
+'''
+Partial response masks for Google APIs, derived from the types responses are parsed into.
+'''
+import dataclasses
+import functools
+import types
+from collections.abc import Sequence
+from typing import Annotated, Any, Union, get_args, get_origin, get_type_hints, is_typeddict
+
+def _is_structured(t: Any) -> bool:
+    return isinstance(t, type) and (dataclasses.is_dataclass(t) or is_typeddict(t))
+
+def _field_types(t: type) -> dict[str, Any]:
+    try:
+        hints = get_type_hints(t)
+    except Exception: # e.g. forward references which cannot be resolved
+        hints = {}
+    if dataclasses.is_dataclass(t):
+        return {f.name: hints.get(f.name, Any) for f in dataclasses.fields(t)}
+    return {name: hints.get(name, Any) for name in getattr(t, '__annotations__', {})}
+
+def _element(t: Any) -> Any:
+    'The type that fields of a value of type `t` are selected from.'
+    origin = get_origin(t)
+    if origin is Annotated:
+        return _element(get_args(t)[0])
+    if origin in (Union, types.UnionType):
+        options = [a for a in get_args(t) if a is not type(None)]
+        return _element(options[0]) if len(options) == 1 else Any
+    if isinstance(origin, type) and issubclass(origin, Sequence) and not issubclass(origin, str):
+        args = get_args(t)
+        return _element(args[0]) if args else Any
+    return t
+
+def _mask(t: type, seen: tuple[type, ...]) -> str:
+    parts: list[str] = []
+    for name, field_type in _field_types(t).items():
+        element = _element(field_type)
+        # a type which contains itself is requested whole from that point
+        if _is_structured(element) and element not in seen:
+            parts.append(F"{name}({_mask(element, seen + (element,))})")
+        else:
+            parts.append(name)
+    return ','.join(parts)
+
+@functools.lru_cache(maxsize=None)
+def fields_mask(t: Any) -> str | None:
+    '''
+    The `fields` parameter that selects only what a dataclass or TypedDict declares,
+    such as `id,snippet(title,tags)`, or None for other types.
+    Field names must be the names used in the JSON.
+    '''
+    if not _is_structured(t):
+        return None
+    return _mask(t, (t,)) or None
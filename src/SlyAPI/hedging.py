@@ -0,0 +1,96 @@
+'''
+Hedged requests: duplicates of slow idempotent requests, to cut tail latency.
+'''
+import collections
+from dataclasses import dataclass
+
+from .web import Request
+
+class LatencyTracker:
+    'Recent response latencies of each endpoint.'
+    window: int
+    samples: dict[str, collections.deque[float]]
+
+    def __init__(self, window: int = 256):
+        self.window = window
+        self.samples = {}
+
+    def record(self, endpoint: str, latency: float):
+        if (samples := self.samples.get(endpoint)) is None:
+            samples = self.samples[endpoint] = collections.deque(maxlen=self.window)
+        samples.append(latency)
+
+    def percentile(self, endpoint: str, q: float, min_samples: int = 1) -> float | None:
+        'Latency `q` (0 to 1) of recent responses are faster than, or None if too few were seen.'
+        samples = self.samples.get(endpoint)
+        if samples is None or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+@dataclass
+class HedgeStats:
+    requests: int = 0
+    hedges: int = 0 # duplicates sent
+    hedge_wins: int = 0 # duplicates which responded first
+
+class HedgePolicy:
+    '''
+    Sends a duplicate of a GET request which has had no response after the
+    `percentile` latency of its endpoint. The first successful response is used,
+    and the other request is cancelled.
+
+    Each request earns `budget` of a hedge, up to `burst` saved, so that
+    hedges add at most about `budget` more requests.
+    '''
+    percentile: float
+    budget: float
+    burst: float
+    min_samples: int
+    min_delay: float
+    latency: LatencyTracker
+    stats: HedgeStats
+
+    _tokens: float
+
+    def __init__(self, percentile: float = 0.95, budget: float = 0.05, burst: float = 10.0,
+            min_samples: int = 20, min_delay: float = 0.0, window: int = 256):
+        '''
+        Endpoints with fewer than `min_samples` recent responses are not hedged.
+        Duplicates are never sent sooner than `min_delay` seconds.
+        '''
+        self.percentile = percentile
+        self.budget = budget
+        self.burst = burst
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latency = LatencyTracker(window)
+        self.stats = HedgeStats()
+        self._tokens = 0.0
+
+    @staticmethod
+    def endpoint(request: Request) -> str:
+        return F"{request.method.value} {request.url}"
+
+    def observe(self, request: Request, latency: float):
+        self.latency.record(self.endpoint(request), latency)
+
+    def delay(self, request: Request) -> float | None:
+        '''
+        Counts a request, and returns how long to wait for it before sending
+        a duplicate, or None if it may not be hedged.
+        '''
+        self.stats.requests += 1
+        self._tokens = min(self.burst, self._tokens + self.budget)
+        delay = self.latency.percentile(self.endpoint(request), self.percentile, self.min_samples)
+        if delay is None:
+            return None
+        return max(delay, self.min_delay)
+
+    def try_hedge(self) -> bool:
+        'Spends from the budget for one duplicate request, if there is enough.'
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        self.stats.hedges += 1
+        return True
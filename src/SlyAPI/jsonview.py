@@ -0,0 +1,269 @@
+'''
+Read-only views of JSON response bodies, which decode only the parts that are used.
+'''
+import json
+import re
+from collections.abc import Mapping, Sequence
+from typing import Any, Iterator, overload
+
+# everything up to the next bracket which is not within a string, in one regex call
+# `[^"]*` is much faster than `[^"\\]*`, so this stops before any string with a backslash before its closing quote
+_UNTIL_BRACKET = re.compile(rb'[^"\[\]{}]*(?:"[^"]*(?<!\\)"[^"\[\]{}]*)*')
+_STRING = re.compile(rb'"[^"]*(?<!\\)"|"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCALAR = re.compile(rb'[^,\]}\s]+')
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+
+_OPEN_OBJECT, _CLOSE_OBJECT = ord('{'), ord('}')
+_OPEN_ARRAY, _CLOSE_ARRAY = ord('['), ord(']')
+_COMMA, _COLON, _QUOTE = ord(','), ord(':'), ord('"')
+
+def _skip_whitespace(data: bytes, pos: int) -> int:
+    return _WHITESPACE.match(data, pos).end() # type: ignore ## always matches
+
+def _container_end(data: bytes, pos: int) -> int:
+    depth = 0
+    while pos < len(data):
+        c = data[pos]
+        if c == _OPEN_OBJECT or c == _OPEN_ARRAY:
+            depth += 1
+        elif c == _CLOSE_OBJECT or c == _CLOSE_ARRAY:
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        elif c == _QUOTE: # one which _UNTIL_BRACKET stopped before
+            m = _STRING.match(data, pos)
+            if m is None:
+                break
+            pos = _UNTIL_BRACKET.match(data, m.end()).end() # type: ignore ## always matches
+            continue
+        pos = _UNTIL_BRACKET.match(data, pos + 1).end() # type: ignore ## always matches
+    raise ValueError("Unterminated JSON object or array")
+
+def _value_end(data: bytes, pos: int, ends: dict[int, int]) -> int:
+    '''
+    The end of the JSON value starting at `pos`, without decoding it.
+    `ends` has the end of each object or array of the document found so far.
+    '''
+    match data[pos]:
+        case 0x7b | 0x5b: # { [
+            if (end := ends.get(pos)) is None:
+                end = ends[pos] = _container_end(data, pos)
+            return end
+        case 0x22: # "
+            m = _STRING.match(data, pos)
+        case _:
+            m = _SCALAR.match(data, pos)
+    if m is None:
+        raise ValueError(F"Invalid JSON value at {pos}")
+    return m.end()
+
+def _decode(data: bytes, start: int, ends: dict[int, int]) -> Any:
+    match data[start]:
+        case 0x7b:
+            return JsonObjectView(data, start, ends)
+        case 0x5b:
+            return JsonArrayView(data, start, ends)
+        case _:
+            return json.loads(data[start:_value_end(data, start, ends)])
+
+def _members(data: bytes, start: int, close: int, ends: dict[int, int]) -> Iterator[int]:
+    '''
+    The start of each value of an array, or of each key and value of an object.
+    Each is only skipped over when the next one is needed,
+    and the position of the closing bracket is returned at the end.
+    '''
+    pos = _skip_whitespace(data, start + 1)
+    if data[pos] == close:
+        return pos
+    while True:
+        yield pos
+        pos = _skip_whitespace(data, _value_end(data, pos, ends))
+        if close == _CLOSE_OBJECT and data[pos] == _COLON:
+            pos = _skip_whitespace(data, pos + 1)
+            continue
+        if data[pos] == _COMMA:
+            pos = _skip_whitespace(data, pos + 1)
+        elif data[pos] == close:
+            return pos
+        else:
+            raise ValueError(F"Invalid JSON at {pos}")
+
+def json_view(data: bytes) -> Any:
+    '''
+    A view of a JSON document: `JsonObjectView` or `JsonArrayView` for objects and arrays,
+    or the decoded value of a scalar. Parts which are never reached are not checked to be valid.
+    '''
+    return _decode(data, _skip_whitespace(data, 0), {})
+
+class _ContainerView:
+    'Finds the members of an object or array one at a time, as they are needed.'
+    __slots__ = ('_data', '_start', '_ends', '_scanner')
+
+    _data: bytes
+    _start: int
+    _ends: dict[int, int] # shared by every view of the document
+    _scanner: Iterator[int] | None
+
+    def __init__(self, data: bytes, start: int, close: int, ends: dict[int, int] | None):
+        self._data = data
+        self._start = start
+        self._ends = {} if ends is None else ends
+        self._scanner = _members(data, start, close, self._ends)
+
+    def _next_member(self) -> int | None:
+        'Start of the next value, or None once all were found.'
+        if self._scanner is None:
+            return None
+        try:
+            return next(self._scanner)
+        except StopIteration as e:
+            self._scanner = None
+            self._ends[self._start] = e.value + 1
+            return None
+        except IndexError:
+            raise ValueError("Truncated JSON") from None
+
+    def _raw(self) -> bytes:
+        return self._data[self._start:_value_end(self._data, self._start, self._ends)]
+
+    def to_python(self) -> Any:
+        'Decode all of it.'
+        return json.loads(self._raw())
+
+    def __repr__(self) -> str:
+        return F"{type(self).__name__}({self._raw()[:80]!r})"
+
+class JsonObjectView(_ContainerView, Mapping[str, Any]):
+    '''
+    A read-only mapping over a JSON object in a response body.
+    Looking up a key scans the object only as far as that key, and its value is decoded
+    on first access. Objects and arrays within are views as well, so skipped parts
+    are never allocated. Pass as `returns` to get one from a request, or use `paginated(..., lazy=True)`.
+    '''
+    __slots__ = ('_found', '_values')
+
+    _found: dict[str, int] # the start of each value, for keys found so far
+    _values: dict[str, Any]
+
+    def __init__(self, data: bytes, start: int = 0, ends: dict[int, int] | None = None):
+        super().__init__(data, start, _CLOSE_OBJECT, ends)
+        self._found = {}
+        self._values = {}
+
+    @classmethod
+    def from_json_bytes(cls, data: bytes) -> 'JsonObjectView':
+        view = json_view(data)
+        if not isinstance(view, JsonObjectView):
+            raise ValueError("Expected a JSON object")
+        return view
+
+    def _find_next(self) -> str | None:
+        key_start = self._next_member()
+        if key_start is None:
+            return None
+        data = self._data
+        m = _STRING.match(data, key_start)
+        if m is None:
+            raise ValueError(F"Invalid JSON object key at {key_start}")
+        key = data[key_start + 1:m.end() - 1]
+        # most keys need no unescaping
+        key_text = json.loads(m.group()) if b'\\' in key else key.decode()
+        value_start = self._next_member()
+        if value_start is None:
+            raise ValueError("Truncated JSON object")
+        self._found[key_text] = value_start
+        return key_text
+
+    def _find_all(self) -> dict[str, int]:
+        while self._find_next() is not None:
+            pass
+        return self._found
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._values:
+            return self._values[key]
+        while key not in self._found:
+            if self._find_next() is None:
+                raise KeyError(key)
+        value = self._values[key] = _decode(self._data, self._found[key], self._ends)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        while key not in self._found:
+            if self._find_next() is None:
+                return False
+        return True
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._found)
+        while (key := self._find_next()) is not None:
+            yield key
+
+    def __len__(self) -> int:
+        return len(self._find_all())
+
+class JsonArrayView(_ContainerView, Sequence[Any]):
+    '''
+    A read-only sequence over a JSON array in a response body.
+    Like `JsonObjectView`, elements are found only as far as needed, and decoded on first access.
+    '''
+    __slots__ = ('_starts', '_values')
+
+    _starts: list[int] # of elements found so far
+    _values: dict[int, Any]
+
+    def __init__(self, data: bytes, start: int = 0, ends: dict[int, int] | None = None):
+        super().__init__(data, start, _CLOSE_ARRAY, ends)
+        self._starts = []
+        self._values = {}
+
+    @classmethod
+    def from_json_bytes(cls, data: bytes) -> 'JsonArrayView':
+        view = json_view(data)
+        if not isinstance(view, JsonArrayView):
+            raise ValueError("Expected a JSON array")
+        return view
+
+    def _find(self, index: int) -> bool:
+        while len(self._starts) <= index:
+            start = self._next_member()
+            if start is None:
+                return False
+            self._starts.append(start)
+        return True
+
+    def _element(self, index: int) -> Any:
+        if index not in self._values:
+            self._values[index] = _decode(self._data, self._starts[index], self._ends)
+        return self._values[index]
+
+    @overload
+    def __getitem__(self, index: int) -> Any: ...
+    @overload
+    def __getitem__(self, index: slice) -> list[Any]: ...
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [self._element(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if index < 0 or not self._find(index):
+            raise IndexError("JsonArrayView index out of range")
+        return self._element(index)
+
+    def __iter__(self) -> Iterator[Any]:
+        i = 0
+        while self._find(i):
+            yield self._element(i)
+            i += 1
+
+    def __len__(self) -> int:
+        while self._find(len(self._starts)):
+            pass
+        return len(self._starts)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, tuple, JsonArrayView)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other)) # type: ignore
+        return NotImplemented
+
+    __hash__ = None # type: ignore ## equal to lists, which are unhashable
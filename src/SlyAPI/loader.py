@@ -0,0 +1,114 @@
+'''
+Batching of single-key lookups into multi-key requests.
+'''
+import asyncio
+from typing import Awaitable, Callable, Generic, Hashable, Iterable, Mapping, TypeVar
+
+K = TypeVar('K', bound=Hashable)
+V = TypeVar('V')
+
+class BatchLoader(Generic[K, V]):
+    '''
+    Collects lookups of single keys made close together, and loads all of them
+    with one call. Each caller gets back only the value for its own key.
+
+    Loaded values are cached until `clear()`, so a loader usually lives for one
+    logical operation, such as handling one incoming request.
+    '''
+    load_batch: Callable[[list[K]], Awaitable[Mapping[K, V]]]
+    max_batch: int
+    delay: float
+    cache: bool
+
+    _loaded: dict[K, 'asyncio.Future[V]']
+    _queue: dict[K, 'asyncio.Future[V]']
+    _dispatch: asyncio.Handle | None
+    _loading: set['asyncio.Task[None]']
+
+    def __init__(self, load_batch: Callable[[list[K]], Awaitable[Mapping[K, V]]],
+            max_batch: int = 50, delay: float = 0.0, cache: bool = True):
+        '''
+        `load_batch` gets up to `max_batch` distinct keys, and returns a mapping
+        with the value of each key found.
+        Keys are collected for `delay` seconds, or until the event loop's next iteration if 0.
+        Without `cache`, values are only shared by lookups made while their key is loading.
+        '''
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.load_batch = load_batch
+        self.max_batch = max_batch
+        self.delay = delay
+        self.cache = cache
+        self._loaded = {}
+        self._queue = {}
+        self._dispatch = None
+        self._loading = set()
+
+    async def load(self, key: K) -> V:
+        'Value for one key. Raises KeyError if the batch did not include it.'
+        # shared with other callers, so cancelling one of them must not cancel it
+        return await asyncio.shield(self._future(key))
+
+    def _future(self, key: K) -> 'asyncio.Future[V]':
+        if (pending := self._loaded.get(key, self._queue.get(key))) is not None:
+            return pending
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[V] = loop.create_future()
+        self._queue[key] = future
+        self._loaded[key] = future
+        if len(self._queue) >= self.max_batch:
+            self._flush()
+        elif self._dispatch is None:
+            if self.delay > 0:
+                self._dispatch = loop.call_later(self.delay, self._flush)
+            else:
+                self._dispatch = loop.call_soon(self._flush)
+        return future
+
+    async def load_many(self, keys: Iterable[K]) -> list[V]:
+        'Values for several keys, in the same order.'
+        return list(await asyncio.gather(*(self.load(k) for k in keys)))
+
+    def clear(self, key: K | None = None):
+        'Forget a loaded value, or all of them, so they are loaded again next time.'
+        if key is None:
+            self._loaded.clear()
+        else:
+            self._loaded.pop(key, None)
+
+    def _flush(self):
+        if self._dispatch is not None:
+            self._dispatch.cancel()
+            self._dispatch = None
+        batch, self._queue = self._queue, {}
+        if batch:
+            task = asyncio.ensure_future(self._load(batch))
+            self._loading.add(task)
+            task.add_done_callback(self._loading.discard)
+
+    async def _load(self, batch: dict[K, 'asyncio.Future[V]']):
+        try:
+            await self._resolve(batch)
+        finally:
+            if not self.cache: # shared only while loading
+                for key, future in batch.items():
+                    if self._loaded.get(key) is future:
+                        del self._loaded[key]
+
+    async def _resolve(self, batch: dict[K, 'asyncio.Future[V]']):
+        try:
+            values = await self.load_batch(list(batch))
+        except Exception as e:
+            for key, future in batch.items():
+                self._loaded.pop(key, None) # try again next time
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in batch.items():
+            if future.done():
+                continue
+            if key in values:
+                future.set_result(values[key])
+            else:
+                self._loaded.pop(key, None)
+                future.set_exception(KeyError(key))
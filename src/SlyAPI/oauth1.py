@@ -2,7 +2,7 @@
 Implemenation of OAuth1.0a as the `Auth` interface
 https://datatracker.ietf.org/doc/html/rfc5849
 '''
-import base64, hmac, secrets
+import base64, functools, hmac, secrets
 import json
 from datetime import datetime
 from hashlib import sha1
@@ -17,22 +17,39 @@ from .auth import Auth
 from .web import Method, Request, serve_once
 
 # https://datatracker.ietf.org/doc/html/rfc5849#section-3.6
+_URLSAFE = b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-._~'
+# encoded form of every possible byte, so encoding is one lookup per byte
+_PERCENT_TABLE = tuple(
+    chr(c) if c in _URLSAFE else F'%{c:02X}' for c in range(256)
+)
+
 def percentEncode(s: str):
-    result = ''
-    URLSAFE = b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-._~'
-    for c in s.encode('utf8'):
-        result += chr(c) if c in URLSAFE else F'%{c:02X}'
-    return result
+    return ''.join(map(_PERCENT_TABLE.__getitem__, s.encode('utf8')))
+
+# parameter names, app keys, signature methods, etc. repeat for every request
+_percentEncodeStatic = functools.lru_cache(maxsize=1024)(percentEncode)
 
 # https://datatracker.ietf.org/doc/html/rfc5849#section-3.4.1.3.2
 def paramString(params: dict[str, Any]) -> str:
-    results: list[str] = []
-    encoded = {
-        percentEncode(k): percentEncode(v) for k, v in params.items()
-    }
-    for k, v in sorted(encoded.items()):
-        results.append(F'{k}={v}')
-    return '&'.join(results)
+    encoded = sorted(
+        (_percentEncodeStatic(k), percentEncode(v)) for k, v in params.items()
+    )
+    return '&'.join([F'{k}={v}' for k, v in encoded])
+
+@functools.lru_cache(maxsize=256)
+def _base_uri(method: str, url: str) -> str:
+    return F"{method.upper()}&{percentEncode(url.lower())}&"
+
+# https://datatracker.ietf.org/doc/html/rfc5849#section-3.4.2
+@functools.lru_cache(maxsize=64)
+def _signing_key(appSecret: str, userSecret: str|None) -> 'hmac.HMAC':
+    # NOTE:
+    #  2.  An "&" character (ASCII code 38), which MUST be included
+    #        even when either secret is empty.
+    signingKey = percentEncode(appSecret) + '&'
+    if userSecret is not None:
+        signingKey +=  percentEncode(userSecret)
+    return hmac.new(bytes(signingKey, 'ascii'), digestmod=sha1)
 
 # https://datatracker.ietf.org/doc/html/rfc5849#section-3.4.2
 def _hmac_sign(request: Request, signing_params: dict[str, Any], appSecret: str, userSecret: str|None = None) -> str:
@@ -44,16 +61,12 @@ def _hmac_sign(request: Request, signing_params: dict[str, Any], appSecret: str,
         else:
             all_params = {}
         all_params |= request.query_params | signing_params
-        base = F"{request.method.value.upper()}&{percentEncode(request.url.lower())}&{percentEncode(paramString(all_params))}"
-        # NOTE:
-        #  2.  An "&" character (ASCII code 38), which MUST be included
-        #        even when either secret is empty.
-        signingKey = percentEncode(appSecret) + '&'
-        if userSecret is not None:
-            signingKey +=  percentEncode(userSecret)
+        base = _base_uri(request.method.value, request.url) + percentEncode(paramString(all_params))
 
-        hashed = hmac.new( bytes(signingKey,'ascii'),bytes(base, 'ascii'), sha1).digest() #.rstrip(b'\n')
-        return base64.b64encode(hashed).decode('ascii')
+        # keyed state is computed once per (app, user), and copied for each request
+        mac = _signing_key(appSecret, userSecret).copy()
+        mac.update(bytes(base, 'ascii'))
+        return base64.b64encode(mac.digest()).decode('ascii')
 
 def _common_oauth_params(appKey: str):
     nonce = base64.b64encode(secrets.token_bytes(32)).strip(b'+/=').decode('ascii')
@@ -137,7 +150,7 @@ class OAuth1App:
         signature = _hmac_sign(request, signing_params, self.secret, user_secret)
 
         oauth_params = signing_params | { 'oauth_signature': signature }
-        oauth_params_str = ', '.join(F'{percentEncode(k)}="{percentEncode(v)}"' for k, v in sorted(oauth_params.items()))
+        oauth_params_str = ', '.join(F'{_percentEncodeStatic(k)}="{percentEncode(v)}"' for k, v in sorted(oauth_params.items()))
         oauth_headers =  {
             'Authorization': F"OAuth {oauth_params_str}",
         }
@@ -15,7 +15,7 @@ from typing import Any, Callable, ParamSpec, TypeVar, cast
 from warnings import warn
 
 from .auth import Auth
-from .web import ApiError, JsonMap, ParamsDict, Request, TomlMap, serve_once
+from .web import ApiError, JsonMap, ParamsDict, Request, TomlMap, current_timeouts, serve_once
 
 
 import aiohttp
@@ -168,7 +168,8 @@ class OAuth2App:
         }
         headers = {'Content-Type': 'application/x-www-form-urlencoded'}
 
-        async with client.post(self.token_uri, data=data, headers=headers) as resp:
+        async with client.post(self.token_uri, data=data, headers=headers,
+                timeout=current_timeouts().client_timeout()) as resp:
             if resp.status != 200:
                 raise await ApiError.from_resposnse(resp)
             result = await resp.json()
@@ -237,11 +238,10 @@ class OAuth2(Auth):
         self._refreshed = asyncio.Semaphore()
     
     async def sign(self, client: Client, request: Request) -> Request:
-        await self._refreshed.acquire()
-        if datetime.now(timezone.utc) > self.user.expires_at:
-            # TODO: log refresh
-            self.user = await self.app.refresh(client, self.user)
-        self._refreshed.release()
+        async with self._refreshed:
+            if datetime.now(timezone.utc) > self.user.expires_at:
+                # TODO: log refresh
+                self.user = await self.app.refresh(client, self.user)
         request.headers['Authorization'] = F"{self.user.token_type} {self.user.token}"
         return request
          
@@ -0,0 +1,159 @@
+'''
+Quota cost accounting for endpoints, and budgets to schedule requests within a quota.
+'''
+import asyncio
+import functools
+import inspect
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Callable, Coroutine, Mapping, ParamSpec, TypeVar, cast
+
+from .web import ApiError, Priority, _cost, current_cost as current_cost # type: ignore ## reportPrivateUsage
+
+F_Params = ParamSpec('F_Params')
+F_Return = TypeVar('F_Return')
+
+def quota_cost(units: int) -> Callable[[Callable[F_Params, F_Return]], Callable[F_Params, F_Return]]:
+    'Mark an endpoint as costing some quota units for each request it makes'
+    def wrap(func: Callable[F_Params, F_Return]) -> Callable[F_Params, F_Return]:
+        cost = (func.__qualname__, units)
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapped_async(*args: F_Params.args, **kwargs: F_Params.kwargs) -> Any:
+                token = _cost.set(cost)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _cost.reset(token)
+            wrapped = wrapped_async
+        else: # e.g. returns WebAPI.paginated(), which captures the cost itself
+            @functools.wraps(func)
+            def wrapped_sync(*args: F_Params.args, **kwargs: F_Params.kwargs) -> Any:
+                token = _cost.set(cost)
+                try:
+                    result = func(*args, **kwargs)
+                finally:
+                    _cost.reset(token)
+                # a coroutine only runs once awaited, outside of the context set here
+                if inspect.iscoroutine(result):
+                    return _await_with_cost(cost, result)
+                return result
+            wrapped = wrapped_sync
+        setattr(wrapped, 'quota_cost', units)
+        return wrapped # type: ignore ## same signature
+    return wrap
+
+async def _await_with_cost(cost: tuple[str, int], coroutine: Coroutine[Any, Any, Any]) -> Any:
+    token = _cost.set(cost)
+    try:
+        return await coroutine
+    finally:
+        _cost.reset(token)
+
+class QuotaExceeded(ApiError):
+    'A request was refused locally because it would exceed a `QuotaBudget`.'
+    def __init__(self, reason: str):
+        super().__init__(429, reason, None)
+
+@dataclass
+class QuotaUsage:
+    'Snapshot of quota spent in the current window of a `QuotaBudget`.'
+    units: int | None
+    spent: int
+    resets_at: datetime
+    by_priority: dict[Priority, int] = field(default_factory=dict)
+    by_endpoint: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def remaining(self) -> int | None:
+        return None if self.units is None else max(self.units - self.spent, 0)
+
+class QuotaBudget:
+    '''
+    Tracks quota units spent per window, such as a daily quota, and admits,
+    delays or rejects requests to stay within it.
+    Each priority may only spend up to its share of the budget, so that less
+    urgent requests leave some quota for more urgent ones.
+    '''
+    units: int | None
+    window: float
+    shares: dict[Priority, float]
+    max_delay: float
+    default_cost: int
+
+    _resets_at: float
+    _spent: int
+    _by_priority: dict[Priority, int]
+    _by_endpoint: dict[str, int]
+
+    def __init__(self, units: int | None, window: timedelta | float = timedelta(days=1),
+        shares: Mapping[Priority, float] | None = None,
+        max_delay: timedelta | float = 0.0,
+        resets_at: datetime | None = None,
+        default_cost: int = 1):
+        '''
+        Units of None only counts what is spent.
+        Requests which do not fit are delayed until the next window if it is
+        at most `max_delay` away, otherwise rejected with `QuotaExceeded`.
+        '''
+        self.units = units
+        self.window = window.total_seconds() if isinstance(window, timedelta) else window
+        self.shares = {
+            Priority.INTERACTIVE: 1.0,
+            Priority.NORMAL: 0.9,
+            Priority.BULK: 0.5,
+        } | dict(shares or {})
+        self.max_delay = max_delay.total_seconds() if isinstance(max_delay, timedelta) else max_delay
+        self.default_cost = default_cost
+        self._resets_at = resets_at.timestamp() if resets_at else time.time() + self.window
+        self._reset()
+
+    def _reset(self):
+        self._spent = 0
+        self._by_priority = {}
+        self._by_endpoint = {}
+
+    def _roll(self, now: float):
+        if now >= self._resets_at:
+            windows_passed = (now - self._resets_at) // self.window + 1
+            self._resets_at += windows_passed * self.window
+            self._reset()
+
+    def _fits(self, cost: int, priority: Priority) -> bool:
+        if self.units is None:
+            return True
+        return self._spent + cost <= self.units * self.shares.get(priority, 1.0)
+
+    async def acquire(self, cost: tuple[str, int] | None, priority: Priority):
+        'Spend quota for one request, waiting for the next window if allowed.'
+        endpoint, units = cost or ('', self.default_cost)
+        share = self.shares.get(priority, 1.0)
+        if self.units is not None and units > self.units * share:
+            # would not fit even in an empty window
+            raise QuotaExceeded(
+                F"{endpoint or 'Request'} costs {units} units, but {priority.name} requests "
+                F"may only spend {int(self.units * share)} per window")
+        while True:
+            now = time.time()
+            self._roll(now)
+            if self._fits(units, priority):
+                break
+            wait = self._resets_at - now
+            if wait > self.max_delay:
+                allowed = int(cast(int, self.units) * share)
+                raise QuotaExceeded(
+                    F"{endpoint or 'Request'} costs {units} units, but only "
+                    F"{max(allowed - self._spent, 0)} remain for {priority.name} requests "
+                    F"until {datetime.fromtimestamp(self._resets_at)}")
+            await asyncio.sleep(wait)
+        self._spent += units
+        self._by_priority[priority] = self._by_priority.get(priority, 0) + units
+        if endpoint:
+            self._by_endpoint[endpoint] = self._by_endpoint.get(endpoint, 0) + units
+
+    def usage(self) -> QuotaUsage:
+        'Quota spent so far in the current window.'
+        self._roll(time.time())
+        return QuotaUsage(self.units, self._spent, datetime.fromtimestamp(self._resets_at),
+            dict(self._by_priority), dict(self._by_endpoint))
@@ -0,0 +1,115 @@
+'''
+Scheduling of requests by priority, so that bulk work does not starve interactive requests.
+'''
+import asyncio
+import collections
+import time
+from dataclasses import dataclass
+
+from .web import Priority
+
+@dataclass
+class PriorityStats:
+    'Counts and queue wait of requests of one priority.'
+    sent: int = 0
+    queued: int = 0
+    in_flight: int = 0
+    total_wait: float = 0.0 # seconds
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.sent if self.sent else 0.0
+
+class PriorityScheduler:
+    '''
+    Admits up to `max_concurrency` requests at once. When requests are queued,
+    each priority gets turns in proportion to its weight (weighted fair queuing),
+    so bulk requests still make progress, but mostly yield to more urgent ones.
+    `caps` limits how many requests of a priority may be in flight at once.
+    '''
+    max_concurrency: int
+    weights: dict[Priority, float]
+    caps: dict[Priority, int]
+    in_flight: int
+
+    _queues: dict[Priority, collections.deque[tuple[float, float, 'asyncio.Future[None]']]]
+    _finish: dict[Priority, float]
+    _virtual_time: float
+    _stats: dict[Priority, PriorityStats]
+
+    def __init__(self, max_concurrency: int = 16,
+            weights: dict[Priority, float] | None = None,
+            caps: dict[Priority, int] | None = None):
+        self.max_concurrency = max_concurrency
+        self.weights = {
+            Priority.INTERACTIVE: 8.0,
+            Priority.NORMAL: 4.0,
+            Priority.BULK: 1.0,
+        } | (weights or {})
+        self.caps = caps or {}
+        self.in_flight = 0
+        self._queues = {p: collections.deque() for p in Priority}
+        self._finish = {p: 0.0 for p in Priority}
+        self._virtual_time = 0.0
+        self._stats = {p: PriorityStats() for p in Priority}
+
+    def stats(self) -> dict[Priority, PriorityStats]:
+        return {p: PriorityStats(**vars(s)) for p, s in self._stats.items()}
+
+    def _tag(self, priority: Priority) -> float:
+        # virtual time at which this request would finish if each priority got its weighted share
+        finish = max(self._virtual_time, self._finish[priority]) + 1.0 / self.weights[priority]
+        self._finish[priority] = finish
+        return finish
+
+    def _can_start(self, priority: Priority) -> bool:
+        cap = self.caps.get(priority)
+        return self.in_flight < self.max_concurrency \
+            and (cap is None or self._stats[priority].in_flight < cap)
+
+    def _start(self, priority: Priority, waited: float):
+        self.in_flight += 1
+        stats = self._stats[priority]
+        stats.in_flight += 1
+        stats.sent += 1
+        stats.total_wait += waited
+        stats.max_wait = max(stats.max_wait, waited)
+
+    async def acquire(self, priority: Priority):
+        'Wait for a turn to send a request.'
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (self._tag(priority), time.monotonic(), waiter)
+        queue = self._queues[priority]
+        queue.append(entry)
+        self._stats[priority].queued += 1
+        self._wake()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled(): # turn was already given
+                self.release(priority)
+            elif entry in queue:
+                queue.remove(entry)
+                self._stats[priority].queued -= 1
+            raise
+
+    def release(self, priority: Priority):
+        'A request admitted by `acquire` is done.'
+        self.in_flight -= 1
+        self._stats[priority].in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self.in_flight < self.max_concurrency:
+            eligible = [p for p, queue in self._queues.items() if queue and self._can_start(p)]
+            if not eligible:
+                return
+            priority = min(eligible, key=lambda p: self._queues[p][0][0])
+            finish, enqueued, waiter = self._queues[priority].popleft()
+            self._stats[priority].queued -= 1
+            if waiter.done(): # cancelled
+                continue
+            self._virtual_time = finish
+            self._start(priority, time.monotonic() - enqueued)
+            waiter.set_result(None)
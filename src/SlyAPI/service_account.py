@@ -5,9 +5,8 @@ import json
 
 from aiohttp import ClientSession as Client, formdata
 
-from .web import JsonMap, Request
+from .web import JsonMap, Request, current_timeouts
 from .auth import Auth
-import jwt
 
 @dataclass
 class ServiceGrant:
@@ -26,6 +25,7 @@ class ServiceAccount:
     token_uri: str
 
     async def grant(self, client: Client, scopes: list[str]) -> ServiceGrant:
+        import jwt # with cryptography, slow to import
         now_stamp = datetime.now().timestamp()
         token: str = jwt.encode({
             "iss": self.client_email,
@@ -38,7 +38,8 @@ class ServiceAccount:
             "grant_type": "urn:ietf:params:oauth:grant-type:jwt-bearer",
             "assertion": token
         })
-        async with client.request('POST', self.token_uri, data=data) as req:
+        async with client.request('POST', self.token_uri, data=data,
+                timeout=current_timeouts().client_timeout()) as req:
             obj = await req.json()
             return ServiceGrant(
                 obj["access_token"],
@@ -85,10 +86,9 @@ class OAuth2ServiceAccount(Auth):
         self._refreshed = asyncio.Semaphore()
 
     async def sign(self, client: Client, request: Request) -> Request:
-        await self._refreshed.acquire()
-        if self._grant is None or datetime.now(timezone.utc) > self._grant.expires_at:
-            self._grant = await self.account.grant(client, self.scopes)
-        self._refreshed.release()
+        async with self._refreshed:
+            if self._grant is None or datetime.now(timezone.utc) > self._grant.expires_at:
+                self._grant = await self.account.grant(client, self.scopes)
         request.headers['Authorization'] = \
             F"{self._grant.token_type} {self._grant.access_token}"
         return request
\ No newline at end of file
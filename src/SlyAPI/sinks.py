@@ -0,0 +1,158 @@
+'''
+Writing streams of items to files, such as every item of a paginated endpoint.
+'''
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+from dataclasses import dataclass
+from typing import IO, Any, AsyncIterable, Callable, Sequence
+
+@dataclass
+class SinkProgress:
+    'Counts of what has been written so far.'
+    items: int = 0
+    bytes: int = 0 # before compression
+    writes: int = 0
+
+class _BatchWriter:
+    '''
+    Collects encoded items in memory and writes them in batches from a worker thread.
+    Only one batch is written at a time, and the next one waits for it,
+    so that a slow disk slows down the producer instead of using more memory.
+    '''
+    file: IO[bytes]
+    batch_bytes: int
+    progress: SinkProgress
+    on_progress: Callable[[SinkProgress], None] | None
+
+    _batch: list[bytes]
+    _batch_size: int
+    _batch_items: int
+    _writing: 'asyncio.Future[int] | None'
+    _pending_items: int
+    _pending_size: int
+
+    def __init__(self, file: IO[bytes], batch_bytes: int, on_progress: Callable[[SinkProgress], None] | None):
+        self.file = file
+        self.batch_bytes = batch_bytes
+        self.progress = SinkProgress()
+        self.on_progress = on_progress
+        self._batch = []
+        self._batch_size = 0
+        self._batch_items = 0
+        self._writing = None
+        self._pending_items = 0
+        self._pending_size = 0
+
+    async def add(self, data: bytes, items: int = 1):
+        self._batch.append(data)
+        self._batch_size += len(data)
+        self._batch_items += items
+        if self._batch_size >= self.batch_bytes:
+            await self.flush()
+
+    async def flush(self):
+        if self._writing is not None:
+            await self._writing
+            self._report()
+        if self._batch:
+            data = b''.join(self._batch)
+            self._pending_items, self._pending_size = self._batch_items, self._batch_size
+            self._batch, self._batch_size, self._batch_items = [], 0, 0
+            self._writing = asyncio.ensure_future(asyncio.to_thread(self.file.write, data))
+        else:
+            self._writing = None
+
+    def _report(self):
+        self.progress.items += self._pending_items
+        self.progress.bytes += self._pending_size
+        self.progress.writes += 1
+        if self.on_progress is not None:
+            self.on_progress(self.progress)
+
+    async def close(self) -> SinkProgress:
+        await self.flush() # last batch
+        await self.flush() # wait for it
+        await asyncio.to_thread(self.file.close)
+        return self.progress
+
+    async def abort(self):
+        if self._writing is not None:
+            await asyncio.wait([self._writing])
+        await asyncio.to_thread(self.file.close)
+
+def _open(path: str | os.PathLike[str], compress: bool) -> IO[bytes]:
+    if compress:
+        return gzip.open(path, 'wb', compresslevel=6)
+    return open(path, 'wb')
+
+async def _write_all(items: AsyncIterable[Any], path: str | os.PathLike[str], compress: bool,
+        batch_bytes: int, on_progress: Callable[[SinkProgress], None] | None,
+        encode: Callable[[Any], bytes], header: bytes | None = None) -> SinkProgress:
+    file = await asyncio.to_thread(_open, path, compress)
+    writer = _BatchWriter(file, batch_bytes, on_progress)
+    try:
+        if header is not None:
+            await writer.add(header, items=0)
+        async for item in items:
+            await writer.add(encode(item))
+    except BaseException:
+        await writer.abort()
+        raise
+    finally:
+        # e.g. a generator of pages, which may hold an open response
+        if (aclose := getattr(items, 'aclose', None)) is not None:
+            await aclose()
+    return await writer.close()
+
+async def write_ndjson(items: AsyncIterable[Any], path: str | os.PathLike[str],
+        compress: bool = False,
+        batch_bytes: int = 1 << 20,
+        on_progress: Callable[[SinkProgress], None] | None = None,
+        default: Callable[[Any], Any] | None = None) -> SinkProgress:
+    '''
+    Write each item as one line of JSON, optionally gzip-compressed.
+    `default` converts items that are not JSON serializable, as in `json.dumps`.
+    '''
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), default=default)
+    def encode(item: Any) -> bytes:
+        return (encoder.encode(item) + '\n').encode('utf8')
+    return await _write_all(items, path, compress, batch_bytes, on_progress, encode)
+
+def _project(item: Any, column: str) -> Any:
+    for key in column.split('.'):
+        if not isinstance(item, dict):
+            return None
+        item = item.get(key) # type: ignore ## JSON object
+    return item
+
+async def write_csv(items: AsyncIterable[Any], path: str | os.PathLike[str],
+        columns: Sequence[str],
+        compress: bool = False,
+        batch_bytes: int = 1 << 20,
+        on_progress: Callable[[SinkProgress], None] | None = None) -> SinkProgress:
+    '''
+    Write some columns of each JSON object item as CSV rows, with a header row.
+    Columns may be dotted paths to nested values, like `snippet.title`.
+    Nested objects and lists are written as JSON, and missing values as empty.
+    '''
+    def cell(value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+        return '' if value is None else value
+
+    buffer = io.StringIO()
+    rows = csv.writer(buffer)
+    def encode_row(row: Sequence[Any]) -> bytes:
+        buffer.seek(0)
+        buffer.truncate()
+        rows.writerow(row)
+        return buffer.getvalue().encode('utf8')
+
+    def encode(item: Any) -> bytes:
+        return encode_row([cell(_project(item, c)) for c in columns])
+
+    return await _write_all(items, path, compress, batch_bytes, on_progress, encode, encode_row(columns))
@@ -0,0 +1,130 @@
+'''
+Long-lived streaming endpoints: Server-Sent Events and newline-delimited JSON.
+'''
+import asyncio
+import json
+import random
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncGenerator
+
+import aiohttp
+
+from .web import ApiError, DeadlineExceeded, Request, current_timeouts
+
+if TYPE_CHECKING:
+    from .webapi import WebAPI
+
+@dataclass
+class ServerEvent:
+    'One event of a Server-Sent Events stream.'
+    data: str
+    event: str = 'message'
+    id: str | None = None
+
+    def json(self) -> Any:
+        return json.loads(self.data)
+
+class _EventParser:
+    'Parses lines of an SSE stream, per https://html.spec.whatwg.org/multipage/server-sent-events.html'
+    last_id: str | None
+    retry: float | None # seconds
+
+    _data: list[str]
+    _event: str
+
+    def __init__(self, last_id: str | None = None):
+        self.last_id = last_id
+        self.retry = None
+        self._data = []
+        self._event = ''
+
+    def interrupted(self):
+        'Forget a partly received event when the connection is lost.'
+        self._data, self._event = [], ''
+
+    def feed(self, line: str) -> ServerEvent | None:
+        'Returns an event when a blank line ends one.'
+        if not line:
+            data, event = self._data, self._event
+            self._data, self._event = [], ''
+            if not data:
+                return None
+            return ServerEvent('\n'.join(data), event or 'message', self.last_id)
+        if line.startswith(':'): # comment, often used as a keep-alive
+            return None
+        field, _, value = line.partition(':')
+        value = value.removeprefix(' ')
+        match field:
+            case 'data':
+                self._data.append(value)
+            case 'event':
+                self._event = value
+            case 'id' if '\0' not in value:
+                self.last_id = value
+            case 'retry' if value.isdigit():
+                self.retry = int(value) / 1000
+            case _:
+                pass
+        return None
+
+async def _lines(resp: aiohttp.ClientResponse) -> AsyncGenerator[str, None]:
+    buffer = b''
+    async for data in resp.content.iter_any():
+        buffer += data
+        *lines, buffer = buffer.split(b'\n')
+        for line in lines:
+            yield line.removesuffix(b'\r').decode('utf8')
+    # an unterminated last line was cut off
+
+def _should_reconnect(error: Exception) -> bool:
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, ApiError):
+        return error.status >= 500 or error.status == 429
+    return True
+
+async def stream_events(api: 'WebAPI', request: Request, sse: bool,
+        heartbeat_timeout: float, max_reconnects: int | None,
+        initial_backoff: float, max_backoff: float) -> AsyncGenerator[Any, None]:
+    '''
+    Yield events of a stream, reconnecting when it fails, goes quiet for
+    `heartbeat_timeout` seconds, or is closed by the server.
+    Each connection is signed again, and SSE streams resume after the last event ID.
+    '''
+    parser = _EventParser()
+    failures = 0
+    while True:
+        attempt = Request(request.method, request.url, dict(request.query_params),
+            dict(request.headers), request.data, request.data_is_json)
+        attempt.headers['Accept'] = 'text/event-stream' if sse else 'application/x-ndjson'
+        attempt.headers['Cache-Control'] = 'no-cache'
+        if parser.last_id is not None:
+            attempt.headers['Last-Event-ID'] = parser.last_id
+        # no total limit for a stream, but a silent one is considered dead
+        timeouts = current_timeouts(api.timeouts)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeouts.connect, sock_read=heartbeat_timeout)
+        try:
+            signed = await api._sign(attempt) # type: ignore ## reportPrivateUsage
+            async with signed.send(api._client, timeout) as resp: # type: ignore ## reportPrivateUsage
+                if resp.status >= 400:
+                    raise await ApiError.from_resposnse(resp)
+                async for line in _lines(resp):
+                    if sse:
+                        event = parser.feed(line)
+                    elif line.strip():
+                        event = json.loads(line)
+                    else: # blank keep-alive
+                        event = None
+                    if event is not None:
+                        failures = 0
+                        yield event
+        except (aiohttp.ClientError, asyncio.TimeoutError, ApiError) as e:
+            if not _should_reconnect(e) or (max_reconnects is not None and failures >= max_reconnects):
+                raise
+        else:
+            if max_reconnects is not None and failures >= max_reconnects:
+                return
+        parser.interrupted()
+        failures += 1
+        backoff = parser.retry if parser.retry is not None else initial_backoff * 2 ** (failures - 1)
+        await asyncio.sleep(min(backoff, max_backoff) * random.uniform(0.5, 1.0))
@@ -0,0 +1,83 @@
+'''
+Stores for the tokens of incremental syncs, such as Google Calendar's `nextSyncToken`.
+'''
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+
+class SyncStore(ABC):
+    'Implement to keep sync tokens somewhere else, such as a database.'
+    @abstractmethod
+    async def get(self, key: str) -> str | None: pass
+
+    @abstractmethod
+    async def put(self, key: str, token: str): pass
+
+    @abstractmethod
+    async def delete(self, key: str): pass
+
+class MemorySyncStore(SyncStore):
+    'Sync tokens kept only for the life of the process.'
+    tokens: dict[str, str]
+
+    def __init__(self):
+        self.tokens = {}
+
+    async def get(self, key: str) -> str | None:
+        return self.tokens.get(key)
+
+    async def put(self, key: str, token: str):
+        self.tokens[key] = token
+
+    async def delete(self, key: str):
+        self.tokens.pop(key, None)
+
+class JsonFileSyncStore(SyncStore):
+    '''
+    Sync tokens kept in a JSON file, which is replaced atomically on each change.
+    Only one process should use the file at a time.
+    '''
+    path: str
+
+    _tokens: dict[str, str] | None
+    _lock: asyncio.Lock
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tokens = None
+        self._lock = asyncio.Lock()
+
+    def _read(self) -> dict[str, str]:
+        try:
+            with open(self.path, encoding='utf8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, tokens: dict[str, str]):
+        temp = self.path + '.tmp'
+        with open(temp, 'w', encoding='utf8') as f:
+            json.dump(tokens, f, indent=1)
+        os.replace(temp, self.path)
+
+    async def _loaded(self) -> dict[str, str]:
+        if self._tokens is None:
+            self._tokens = await asyncio.to_thread(self._read)
+        return self._tokens
+
+    async def get(self, key: str) -> str | None:
+        async with self._lock:
+            return (await self._loaded()).get(key)
+
+    async def put(self, key: str, token: str):
+        async with self._lock:
+            tokens = await self._loaded()
+            tokens[key] = token
+            await asyncio.to_thread(self._write, dict(tokens))
+
+    async def delete(self, key: str):
+        async with self._lock:
+            tokens = await self._loaded()
+            if tokens.pop(key, None) is not None:
+                await asyncio.to_thread(self._write, dict(tokens))
@@ -0,0 +1,244 @@
+'''
+Uploads of large request bodies, streamed from disk or resumable after interruptions.
+'''
+import asyncio
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import IO, TYPE_CHECKING, AsyncGenerator, AsyncIterable, Awaitable, Callable, TypeAlias
+
+import aiohttp
+
+from .web import ApiError, DeadlineExceeded, JsonMap, Method, Request
+
+if TYPE_CHECKING:
+    from .webapi import WebAPI
+
+UploadSource: TypeAlias = str | os.PathLike[str] | IO[bytes] | AsyncIterable[bytes]
+
+# Google requires chunks other than the last to be a multiple of this
+CHUNK_GRANULARITY = 256 << 10
+
+_RANGE = re.compile(r'bytes=0-(\d+)')
+
+def source_size(source: UploadSource) -> int | None:
+    'Bytes left to read from a path or seekable file, or None if unknown.'
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if not isinstance(source, AsyncIterable) and source.seekable():
+        position = source.tell()
+        end = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return end - position
+    return None
+
+async def iter_chunks(source: UploadSource, chunk_size: int, skip: int = 0) -> AsyncGenerator[bytes, None]:
+    '''
+    Read a source in chunks of `chunk_size` bytes (the last may be shorter),
+    without blocking the event loop. Starts after `skip` bytes.
+    '''
+    if isinstance(source, (str, os.PathLike)):
+        file = await asyncio.to_thread(open, source, 'rb')
+        try:
+            async for chunk in iter_chunks(file, chunk_size, skip):
+                yield chunk
+        finally:
+            await asyncio.to_thread(file.close)
+        return
+    if not isinstance(source, AsyncIterable):
+        if skip and source.seekable():
+            await asyncio.to_thread(source.seek, skip, os.SEEK_CUR)
+            skip = 0
+        while skip: # e.g. a pipe, which can only be read past
+            data = await asyncio.to_thread(source.read, min(skip, chunk_size))
+            if not data:
+                return
+            skip -= len(data)
+        while chunk := await asyncio.to_thread(source.read, chunk_size):
+            yield chunk
+        return
+    buffer = bytearray()
+    async for data in source:
+        if skip:
+            data, skip = data[skip:], max(0, skip - len(data))
+        buffer += data
+        while len(buffer) >= chunk_size:
+            yield bytes(buffer[:chunk_size])
+            del buffer[:chunk_size]
+    if buffer:
+        yield bytes(buffer)
+
+def _should_resume(error: Exception) -> bool:
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, ApiError):
+        return error.status >= 500 or error.status == 429
+    return True
+
+@dataclass
+class UploadProgress:
+    committed: int = 0 # bytes the server has stored
+    total: int | None = None
+    resumes: int = 0
+
+class ResumableUpload:
+    '''
+    An upload following the Google resumable upload protocol. The source is sent
+    in chunks to a session URI, and after a failed chunk, the upload resumes from
+    the last byte the server committed. Only one chunk is held in memory.
+
+    The session URI can be saved, and the upload resumed later, even by another
+    process, with the same source.
+    '''
+    api: 'WebAPI'
+    session_uri: str
+    source: UploadSource
+    chunk_size: int
+    max_resumes: int
+    progress: UploadProgress
+    on_progress: Callable[[UploadProgress], None] | None
+
+    _offset_known: bool
+    _origin: int | None # position of a seekable file source when the upload started
+    _consumed: bool # whether a source which can't be read again has been read
+
+    def __init__(self, api: 'WebAPI', session_uri: str, source: UploadSource,
+            size: int | None = None,
+            chunk_size: int = 32 * CHUNK_GRANULARITY,
+            max_resumes: int = 5,
+            on_progress: Callable[[UploadProgress], None] | None = None,
+            offset: int | None = None):
+        '''
+        `offset` is how many bytes were already committed, or None to ask the server.
+        `size` is found from paths and seekable files if not given.
+        '''
+        if chunk_size % CHUNK_GRANULARITY:
+            raise ValueError(F"chunk_size must be a multiple of {CHUNK_GRANULARITY}")
+        self.api = api
+        self.session_uri = session_uri
+        self.source = source
+        self.chunk_size = chunk_size
+        self.max_resumes = max_resumes
+        self.on_progress = on_progress
+        total = size if size is not None else source_size(source)
+        self.progress = UploadProgress(offset or 0, total)
+        self._offset_known = offset is not None
+        seekable = not isinstance(source, (str, os.PathLike, AsyncIterable)) and source.seekable()
+        self._origin = source.tell() if seekable else None
+        self._consumed = False
+
+    @classmethod
+    async def start(cls, api: 'WebAPI', url: str, source: UploadSource,
+            metadata: JsonMap | None = None,
+            params: dict[str, str | int] | None = None,
+            content_type: str = 'application/octet-stream',
+            size: int | None = None,
+            chunk_size: int = 32 * CHUNK_GRANULARITY,
+            max_resumes: int = 5,
+            on_progress: Callable[[UploadProgress], None] | None = None) -> 'ResumableUpload':
+        'Create an upload session. `url` is the upload endpoint, such as `.../upload/drive/v3/files`.'
+        if size is None:
+            size = source_size(source)
+        headers = {'X-Upload-Content-Type': content_type}
+        if size is not None:
+            headers['X-Upload-Content-Length'] = str(size)
+        if '://' not in url:
+            url = api.get_full_url(url)
+        request = Request(Method.POST, url, {'uploadType': 'resumable'} | (params or {}),
+            headers, metadata or {}, True)
+        async with api._send(request) as resp: # type: ignore ## reportPrivateUsage
+            session_uri = resp.headers.get('Location')
+        if session_uri is None:
+            raise ApiError(resp.status, "Upload session was not created: no Location header", None)
+        return cls(api, session_uri, source, size, chunk_size, max_resumes, on_progress, offset=0)
+
+    async def _put(self, data: bytes, content_range: str) -> int | JsonMap:
+        'Send part of the source, or nothing to ask for the status. Returns the bytes committed, or the result.'
+        request = Request(Method.PUT, self.session_uri, {}, {'Content-Range': content_range}, data)
+        async with self.api._send(request) as resp: # type: ignore ## reportPrivateUsage
+            if resp.status == 308: # resume incomplete
+                committed = _RANGE.fullmatch(resp.headers.get('Range', ''))
+                return int(committed.group(1)) + 1 if committed else 0
+            text = await resp.text()
+        return json.loads(text) if text else {}
+
+    async def status(self) -> int | JsonMap:
+        'Bytes committed so far, or the result if the upload is complete.'
+        total = '*' if self.progress.total is None else self.progress.total
+        return await self._put(b'', F"bytes */{total}")
+
+    def _committed(self, offset: int):
+        self.progress.committed = offset
+        if self.on_progress is not None:
+            self.on_progress(self.progress)
+
+    async def run(self) -> JsonMap:
+        'Upload the rest of the source, and return the created resource.'
+        try:
+            return await self._run()
+        except BaseException:
+            self._offset_known = False # the server may have stored more than was confirmed
+            raise
+
+    async def _run(self) -> JsonMap:
+        if not self._offset_known:
+            status = await self.status()
+            if not isinstance(status, int):
+                return status
+            self._committed(status)
+            self._offset_known = True
+
+        start = self.progress.committed
+        if self._origin is not None and not isinstance(self.source, (str, os.PathLike, AsyncIterable)):
+            await asyncio.to_thread(self.source.seek, self._origin + start, os.SEEK_SET)
+            chunks = iter_chunks(self.source, self.chunk_size)
+        elif isinstance(self.source, (str, os.PathLike)):
+            chunks = iter_chunks(self.source, self.chunk_size, skip=start)
+        else:
+            if self._consumed:
+                raise ValueError("The source can't be read again. Resume with a new ResumableUpload and a new source.")
+            self._consumed = True
+            chunks = iter_chunks(self.source, self.chunk_size, skip=start)
+        buffer = b''
+        eof = False
+        failures = 0
+        try:
+            while True:
+                while not eof and len(buffer) < self.chunk_size:
+                    try:
+                        buffer += await chunks.__anext__()
+                    except StopAsyncIteration:
+                        eof = True
+                piece = buffer[:self.chunk_size]
+                last = eof and len(buffer) <= self.chunk_size
+                total = start + len(buffer) if last else self.progress.total
+                if piece:
+                    content_range = F"bytes {start}-{start + len(piece) - 1}/{'*' if total is None else total}"
+                else:
+                    content_range = F"bytes */{total}"
+                send: Callable[[], Awaitable[int | JsonMap]] = lambda: self._put(piece, content_range)
+                while True:
+                    try:
+                        result = await send()
+                        break
+                    except (aiohttp.ClientError, asyncio.TimeoutError, ApiError) as e:
+                        if not _should_resume(e):
+                            raise
+                        failures += 1
+                        self.progress.resumes += 1
+                        if failures > self.max_resumes:
+                            raise
+                        await asyncio.sleep(min(2.0 ** failures / 4, 30.0))
+                        send = self.status # find out what the server got before sending more
+                if not isinstance(result, int):
+                    self._committed(start + len(buffer))
+                    return result
+                if not start <= result <= start + len(buffer):
+                    raise ApiError(308, F"Server committed {result} bytes, outside of the chunk sent from {start}", None)
+                if result > start:
+                    failures = 0
+                buffer, start = buffer[result - start:], result
+                self._committed(result)
+        finally:
+            await chunks.aclose()
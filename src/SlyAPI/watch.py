@@ -0,0 +1,208 @@
+'''
+Polling many resources for changes, from one scheduler.
+'''
+import asyncio
+import hashlib
+import heapq
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, AsyncGenerator
+
+from .asyncy import AsyncLazy
+from .web import ApiError, JsonMap, Method, ParamsDict, Request
+
+if TYPE_CHECKING:
+    from .webapi import WebAPI
+
+@dataclass
+class Change:
+    'A watched resource, after it changed.'
+    key: str
+    value: JsonMap | None # None if it was deleted
+
+@dataclass
+class WatchStats:
+    polls: int = 0
+    not_modified: int = 0 # polls answered with 304
+    changes: int = 0
+    errors: int = 0
+
+@dataclass
+class _Watched:
+    key: str
+    request: Request
+    interval: float
+    etag: str | None = None
+    digest: bytes | None = None # of the body, for servers which send no ETag
+    seen: bool = False
+    generation: int = 0 # bumped when unwatched, so scheduled polls are skipped
+
+@dataclass(order=True)
+class _Due:
+    at: float
+    seq: int
+    key: str = field(compare=False)
+    generation: int = field(compare=False)
+
+class Watcher:
+    '''
+    Polls many resources with conditional GETs, so unchanged ones cost a 304.
+    Polls are scheduled from one heap, not one sleeping task per resource.
+    Each resource's interval shrinks when it changes and grows while it does not,
+    between `min_interval` and `max_interval`, with `jitter` to spread polls out.
+    '''
+    api: 'WebAPI'
+    min_interval: float
+    max_interval: float
+    jitter: float
+    concurrency: int
+    stats: WatchStats
+
+    _watched: dict[str, _Watched]
+    _heap: list[_Due]
+    _seq: int
+    _wake: asyncio.Event | None
+
+    def __init__(self, api: 'WebAPI', min_interval: float = 30.0, max_interval: float = 3600.0,
+            jitter: float = 0.1, concurrency: int = 8):
+        self.api = api
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.stats = WatchStats()
+        self._watched = {}
+        self._heap = []
+        self._seq = 0
+        self._wake = None
+
+    def watch(self, path: str, params: ParamsDict | None = None, key: str | None = None,
+            interval: float | None = None) -> str:
+        '''
+        Start polling a resource. Its first poll is at a random time within its interval.
+        Returns the key that its changes are reported with, by default the path.
+        '''
+        key = key or path
+        self.unwatch(key)
+        request = self.api._create_request(Method.GET, path, params) # type: ignore ## reportPrivateUsage
+        request.url = self.api.get_full_url(request.url)
+        interval = min(self.max_interval, max(self.min_interval, interval or self.min_interval))
+        watched = self._watched[key] = _Watched(key, request, interval)
+        self._schedule(watched, random.uniform(0, interval))
+        return key
+
+    def unwatch(self, key: str):
+        if (watched := self._watched.pop(key, None)) is not None:
+            watched.generation += 1
+
+    def __len__(self) -> int:
+        return len(self._watched)
+
+    def _schedule(self, watched: _Watched, delay: float):
+        self._seq += 1
+        heapq.heappush(self._heap, _Due(time.monotonic() + delay, self._seq, watched.key, watched.generation))
+        if self._wake is not None:
+            self._wake.set()
+
+    def _jittered(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _poll(self, watched: _Watched) -> Change | None:
+        self.stats.polls += 1
+        request = Request(watched.request.method, watched.request.url,
+            dict(watched.request.query_params), dict(watched.request.headers))
+        request.headers['Cache-Control'] = 'no-cache' # ask the server, not WebAPI.cache
+        if watched.etag is not None:
+            request.headers['If-None-Match'] = watched.etag
+        try:
+            async with self.api._send(request) as resp: # type: ignore ## reportPrivateUsage
+                if resp.status == 304:
+                    self.stats.not_modified += 1
+                    return None
+                body = await resp.read()
+                etag = resp.headers.get('ETag')
+        except ApiError as e:
+            if e.status in (404, 410) and watched.seen:
+                self.unwatch(watched.key)
+                return Change(watched.key, None)
+            raise
+        digest = hashlib.sha256(body).digest()
+        changed = watched.seen and digest != watched.digest
+        watched.etag, watched.digest, watched.seen = etag, digest, True
+        if not changed:
+            return None
+        return Change(watched.key, json.loads(body))
+
+    async def _poll_and_reschedule(self, watched: _Watched, changes: 'asyncio.Queue[Change]'):
+        try:
+            change = await self._poll(watched)
+        except Exception:
+            self.stats.errors += 1
+            watched.interval = min(self.max_interval, watched.interval * 2)
+        else:
+            if change is not None:
+                self.stats.changes += 1
+                watched.interval = max(self.min_interval, watched.interval / 2)
+                await changes.put(change)
+            else:
+                watched.interval = min(self.max_interval, watched.interval * 1.25)
+        if self._watched.get(watched.key) is watched:
+            self._schedule(watched, self._jittered(watched.interval))
+
+    async def _run(self, changes: 'asyncio.Queue[Change]'):
+        self._wake = asyncio.Event()
+        slots = asyncio.Semaphore(self.concurrency)
+        polling: set[asyncio.Task[None]] = set()
+        try:
+            while True:
+                self._wake.clear()
+                now = time.monotonic()
+                while self._heap and self._heap[0].at <= now:
+                    due = heapq.heappop(self._heap)
+                    watched = self._watched.get(due.key)
+                    if watched is None or watched.generation != due.generation:
+                        continue
+                    await slots.acquire()
+                    task = asyncio.ensure_future(self._poll_and_reschedule(watched, changes))
+                    polling.add(task)
+                    task.add_done_callback(polling.discard)
+                    task.add_done_callback(lambda _: slots.release())
+                timeout = self._heap[0].at - time.monotonic() if self._heap else None
+                # not wait_for, which can swallow a cancellation when the event is set at the same time
+                woken = asyncio.ensure_future(self._wake.wait())
+                try:
+                    await asyncio.wait([woken], timeout=timeout)
+                finally:
+                    woken.cancel()
+        finally:
+            self._wake = None
+            for task in polling:
+                task.cancel()
+            if polling:
+                await asyncio.wait(polling)
+
+    def changes(self, buffer: int = 256) -> AsyncLazy[Change]:
+        '''
+        Poll while iterated, and yield each change.
+        Up to `buffer` changes are kept while the consumer is busy, after which polling waits.
+        '''
+        return AsyncLazy(self._changes(buffer))
+
+    async def _changes(self, buffer: int) -> AsyncGenerator[Change, None]:
+        queue: asyncio.Queue[Change] = asyncio.Queue(buffer)
+        runner = asyncio.ensure_future(self._run(queue))
+        get = None
+        try:
+            while True:
+                get = asyncio.ensure_future(queue.get())
+                await asyncio.wait([get, runner], return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    runner.result() # raise what stopped it
+                yield get.result()
+        finally:
+            if get is not None:
+                get.cancel()
+            runner.cancel()
+            await asyncio.wait([runner])
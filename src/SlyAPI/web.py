@@ -1,10 +1,13 @@
 import asyncio
-from dataclasses import dataclass, field
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
 import datetime
-from enum import Enum
+from enum import Enum, IntEnum
 import collections.abc
-from typing import TypeAlias
-from aiohttp import ClientSession as Client, ClientResponse as Response, FormData
+import time
+from typing import Awaitable, TypeAlias, TypeVar
+from aiohttp import ClientSession as Client, ClientResponse as Response, ClientTimeout, FormData
 
 ParamType = \
         int | str | Enum | None \
@@ -45,7 +48,7 @@ class ApiError(Exception):
         try:
             reason = await response.text()
         except Exception: pass
-        raise cls(response.status, reason, response)
+        return cls(response.status, reason, response)
 
     def __str__(self) -> str:
         return super().__str__() + F"\nStatus: {self.status}\nReason: {self.reason}"
@@ -56,6 +59,109 @@ class Method(Enum):
     PUT = 'PUT'
     DELETE = 'DELETE'
     PATCH = 'PATCH'
+    HEAD = 'HEAD'
+
+class Priority(IntEnum):
+    'How urgent a request is. Lower values are more urgent.'
+    INTERACTIVE = 0
+    NORMAL = 1
+    BULK = 2
+
+_priority: ContextVar[Priority] = ContextVar('priority', default=Priority.NORMAL)
+
+# (endpoint name, units) of the endpoint currently being called, see `quota.quota_cost`
+_cost: ContextVar[tuple[str, int] | None] = ContextVar('quota_cost', default=None)
+
+def current_cost() -> tuple[str, int] | None:
+    return _cost.get()
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+@contextmanager
+def with_priority(priority: Priority):
+    'Mark all requests made within the context as having a priority.'
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+class DeadlineExceeded(asyncio.TimeoutError): # TimeoutError, since Python 3.11
+    'A request could not finish before the deadline set with `with_deadline`.'
+
+@dataclass(frozen=True) # shared as the default of every WebAPI
+class Timeouts:
+    'Time limits for each request sent, in seconds, or None for no limit.'
+    connect: float | None = 10.0
+    first_byte: float | None = 60.0 # and between each read after
+    total: float | None = 300.0
+
+    def client_timeout(self) -> ClientTimeout:
+        'These limits, shortened to the current deadline.'
+        total = self.total
+        if (remaining := remaining_time()) is not None:
+            total = remaining if total is None else min(total, remaining)
+            total = max(total, 0.001) # 0 would be no limit
+        return ClientTimeout(total=total, sock_connect=self.connect, sock_read=self.first_byte)
+
+    def for_transfer(self) -> 'Timeouts':
+        'These limits without the total, for large uploads and downloads, which only fail when they stall.'
+        return replace(self, total=None)
+
+_deadline: ContextVar[float | None] = ContextVar('deadline', default=None) # time.monotonic()
+_timeouts: ContextVar[Timeouts | None] = ContextVar('timeouts', default=None)
+
+def remaining_time() -> float | None:
+    'Seconds until the current deadline, or None if there is none.'
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+def current_timeouts(default: Timeouts | None = None) -> Timeouts:
+    return _timeouts.get() or default or Timeouts()
+
+@contextmanager
+def with_deadline(seconds: float):
+    '''
+    All requests made within the context, including retries, token refreshes,
+    and later pages, must finish within some seconds, or raise DeadlineExceeded.
+    Nested deadlines can only shorten an outer one.
+    '''
+    deadline = time.monotonic() + seconds
+    if (outer := _deadline.get()) is not None:
+        deadline = min(deadline, outer)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+@contextmanager
+def with_timeouts(timeouts: Timeouts):
+    'Use other time limits for requests made within the context.'
+    token = _timeouts.set(timeouts)
+    try:
+        yield
+    finally:
+        _timeouts.reset(token)
+
+T = TypeVar('T')
+
+async def within_deadline(awaitable: Awaitable[T]) -> T:
+    'Wait for something, but raise DeadlineExceeded if the current deadline passes first.'
+    remaining = remaining_time()
+    if remaining is None:
+        return await awaitable
+    if remaining <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded()
+    try:
+        return await asyncio.wait_for(awaitable, remaining)
+    except asyncio.TimeoutError as e:
+        if (remaining := remaining_time()) is not None and remaining <= 0:
+            raise DeadlineExceeded() from e
+        raise
 
 @dataclass
 class Request:
@@ -63,10 +169,10 @@ class Request:
     url: str
     query_params: dict[str, str|int]= field(default_factory=dict)
     headers: dict[str, str] = field(default_factory=dict)
-    data: JsonMap|FormData = field(default_factory=dict)
+    data: JsonMap|FormData|bytes|collections.abc.AsyncIterable[bytes] = field(default_factory=dict)
     data_is_json: bool = False
 
-    def send(self, client: Client):
+    def send(self, client: Client, timeout: ClientTimeout | None = None):
         json = None
         data = None
         params = None
@@ -79,7 +185,9 @@ class Request:
             headers = self.headers
         if self.query_params:
             params = self.query_params
-        return client.request(self.method.value, self.url, json=json, data=data, params=params, headers=headers)
+        if timeout is None:
+            timeout = current_timeouts().client_timeout()
+        return client.request(self.method.value, self.url, json=json, data=data, params=params, headers=headers, timeout=timeout)
 
 async def serve_once(host: str, port: int, html_file: str) -> dict[str, str]:
     import aiohttp.web
@@ -3,20 +3,45 @@ Implementation for following classes:
 
 - WebAPI
 '''
+from contextlib import AsyncExitStack, aclosing, asynccontextmanager
+from contextvars import ContextVar
 from dataclasses import asdict
 from enum import Enum
+import asyncio
+import collections.abc
 import json
-from typing import TYPE_CHECKING, Any, AsyncGenerator, Sequence, cast, TypeVar, overload
+import os
+import time
+import urllib.parse
+from typing import TYPE_CHECKING, Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Literal, Sequence, cast, TypeVar, overload
 from typing_extensions import TypeIs
 if TYPE_CHECKING:
     from _typeshed import DataclassInstance
-
-from aiohttp import ClientSession as Client
-from .asyncy import AsyncLazy, unmanage_async_context
+    from .breaker import CircuitBreaker
+    from .cache import CachedResponse, DiskCache
+    from .concurrency import AdaptiveConcurrency
+    from .download import DownloadProgress
+    from .hedging import HedgePolicy
+    from .jsonview import JsonObjectView
+    from .loader import BatchLoader
+    from .quota import QuotaBudget
+    from .scheduler import PriorityScheduler
+    from .stream import ServerEvent
+    from .sync import SyncStore
+    from .upload import ResumableUpload, UploadProgress, UploadSource
+    from .watch import Watcher
+
+from aiohttp import ClientSession as Client, ClientResponse as Response
+from .asyncy import AsyncLazy
 from .auth import Auth
-from .web import Request, Method, JsonMap, ParamsDict, ApiError
+from .web import Request, Method, JsonMap, JsonMapCo, ParamsDict, ApiError, DeadlineExceeded, Timeouts, _cost, _priority, _deadline, _timeouts, current_cost, current_priority, current_timeouts, remaining_time, with_timeouts, within_deadline # type: ignore ## reportPrivateUsage
+# features are imported when first used, so that e.g. sqlite3 is only loaded with a cache
 
 T = TypeVar('T')
+T_API = TypeVar('T_API', bound='WebAPI')
+
+# settings of the caller which apply to its requests, kept for pages fetched later
+_CALLER_CONTEXT: list[ContextVar[Any]] = [_cost, _priority, _deadline, _timeouts]
 
 def is_dataclass_instance(obj: object) -> 'TypeIs[DataclassInstance]':
     return hasattr(type(obj), "__dataclass_fields__")
@@ -27,32 +52,89 @@ class WebAPI:
 
     _parameter_list_delimiter: str = ','
 
+    # most items allowed in each list parameter, e.g. {'id': 50}
+    # GET requests with longer lists are split into several, and their items merged
+    # if any of them has more pages, ValueError is raised, unless made by paginated()
+    _parameter_list_limits: dict[str, int] = {}
+    # GET requests with longer URLs are split over their longest list parameter
+    # leave some room for parameters added by auth
+    _max_url_length: int | None = None
+    # how many requests split from one call are sent at once
+    _split_concurrency: int = 8
+    # GET requests parsed into a dataclass or TypedDict ask only for its fields, with a Google-style `fields` parameter
+    # pass `fields` in the parameters to choose them yourself, or None for every field
+    _auto_fields: bool = False
+
     base_url: str
     auth: Auth
 
+    # quota units spent by requests, see `quota_cost`
+    quota: 'QuotaBudget | None' = None
+
+    # GET responses stored across runs
+    cache: 'DiskCache | None' = None
+
+    # requests in flight, adjusted to what the upstream can take
+    concurrency: 'AdaptiveConcurrency | None' = None
+
+    # fails requests immediately while an upstream is failing
+    breaker: 'CircuitBreaker | None' = None
+
+    # duplicates slow GETs
+    hedging: 'HedgePolicy | None' = None
+
+    # shares requests in flight between priorities, see `with_priority`
+    scheduler: 'PriorityScheduler | None' = None
+
+    # time limits for each request, unless overridden by `with_timeouts`
+    timeouts: Timeouts = Timeouts()
+
     _maybe_client: Client | None
+    _owns_client: bool
     @property
     def _client(self) -> Client:
         if self._maybe_client is None:
             self._maybe_client = Client()
-            # Client.__aenter__ returns Client
-            (_, self._client_close_context) = unmanage_async_context(self._maybe_client)
+            self._owns_client = True
         return self._maybe_client
 
-    def __init__(self, auth: Auth, use_form_data: bool = False) -> None:
-        self._maybe_client = None
+    def __init__(self, auth: Auth, use_form_data: bool = False, session: Client | None = None) -> None:
+        '''
+        A client session is created when the first request is made, unless one is given.
+        Given sessions are borrowed and are not closed with this API.
+        '''
+        self._maybe_client = session
+        self._owns_client = False
         self.auth = auth
         self._use_form_data = use_form_data
 
+    def use_session(self, session: Client):
+        'Borrow a client session, such as one shared by many APIs. It is not closed with this API.'
+        if self._maybe_client is not None and self._maybe_client is not session:
+            raise RuntimeError("This API already has a client session")
+        self._maybe_client = session
+        self._owns_client = False
+
+    async def aclose(self):
+        '''
+        Close the client session if this API created it.
+        Another session is created if more requests are made afterwards.
+        '''
+        client, self._maybe_client = self._maybe_client, None
+        if client is not None and self._owns_client:
+            await client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_: Any):
+        await self.aclose()
+
     def __del__(self):
-        # free up the client session if its been created
-        if hasattr(self, '_client_close_context'):
-            try:
-                self._client_close_context.set()
-            except RuntimeError: # event loop was closed
-                if self._client._connector is not None: # type: ignore
-                    self._client._connector._close() # type: ignore
-                    self._client._connector = None # type: ignore
+        # last resort for sessions that were never closed: free the sockets without the event loop
+        client = getattr(self, '_maybe_client', None)
+        if client is not None and getattr(self, '_owns_client', False) and client.connector is not None:
+            client.connector._close() # type: ignore ## reportPrivateUsage
 
     # delimit lists and sets, convert enums to their values, and exclude None values
     def _convert_parameters(self, params: ParamsDict) -> dict[str, str|int]:
@@ -83,18 +165,203 @@ class WebAPI:
                 case _: pass # exclude None values
         return converted
 
+    def _url_length(self, path: str, params: ParamsDict) -> int:
+        query = urllib.parse.urlencode(self._convert_parameters(params))
+        return len(self.get_full_url(path)) + 1 + len(query)
+
+    def _split_parameters(self, path: str, params: ParamsDict) -> list[ParamsDict]:
+        '''
+        Split a list parameter over several sets of parameters, if it has more items
+        than its limit or makes the URL too long. Only one parameter is split.
+        '''
+        lists = {
+            k: list(cast(collections.abc.Iterable[Any], v)) for k, v in params.items()
+            if isinstance(v, (collections.abc.Set, collections.abc.Sequence)) and not isinstance(v, str)
+        }
+        too_long = self._max_url_length is not None and self._url_length(path, params) > self._max_url_length
+        split_key = next((k for k, v in lists.items()
+            if len(v) > self._parameter_list_limits.get(k, len(v))), None)
+        if split_key is None and too_long and lists:
+            split_key = max(lists, key=lambda k: len(lists[k]))
+        if split_key is None:
+            return [params]
+
+        items = lists[split_key]
+        size = min(self._parameter_list_limits.get(split_key, len(items)), len(items))
+        while True:
+            splits = [dict(params) | {split_key: items[i:i+size]} for i in range(0, len(items), size)]
+            if size == 1 or self._max_url_length is None or \
+                all(self._url_length(path, p) <= self._max_url_length for p in splits):
+                return splits
+            size = max(size // 2, 1)
+
     def get_full_url(self, path: str) -> str:
         '''Convert a relative path to an absolute url for this API'''
         return self.base_url + path
 
+    # sign and send a request, raising ApiError for error statuses
+    # auth may ask for the request to be signed and sent again, e.g. with another key
+    # fresh cached responses are used before signing, so they need no token refresh
+    # callers which stream the body from `resp.content` must not use the cache
+    @asynccontextmanager
+    async def _send(self, request: Request, use_cache: bool = True) -> 'AsyncIterator[Response | CachedResponse]':
+        cache = self.cache if use_cache and _cacheable(request) else None
+        cached = None
+        if cache is not None:
+            cache_key = cache.key(request)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                if cached.fresh:
+                    yield cached.response()
+                    return
+                request.headers |= cached.validators()
+        if self.quota is not None:
+            await within_deadline(self.quota.acquire(current_cost(), current_priority()))
+        attempts = 0
+        while True:
+            attempts += 1
+            signed = await self._sign(request)
+            async with self._send_hedged(signed) as resp:
+                if cache is not None and cached is not None and resp.status == 304:
+                    await cache.revalidated(cache_key, resp.headers)
+                    yield cached.response()
+                    return
+                if resp.status < 400:
+                    if cache is not None and resp.status == 200:
+                        await cache.put_response(cache_key, resp)
+                    yield resp
+                    return
+                error = await ApiError.from_resposnse(resp)
+            # a streamed body was used up by the first attempt
+            if isinstance(request.data, collections.abc.AsyncIterable) or not self.auth.should_retry(signed, error) \
+                    or attempts >= self.auth.max_attempts():
+                raise error
+
+    # token refreshes while signing are limited by the timeouts of this API, like its requests
+    async def _sign(self, request: Request) -> Request:
+        with with_timeouts(current_timeouts(self.timeouts)):
+            return await within_deadline(self.auth.sign(self._client, request))
+
+    # send a signed request, and for GETs with a hedging policy, a duplicate if the first is slow
+    @asynccontextmanager
+    async def _send_hedged(self, request: Request) -> AsyncIterator[Response]:
+        policy = self.hedging
+        delay = policy.delay(request) if policy is not None and request.method == Method.GET else None
+        if policy is None or delay is None:
+            async with self._send_once(request) as resp:
+                yield resp
+            return
+        primary = asyncio.ensure_future(self._open_attempt(request))
+        attempts = [primary]
+        winner = None
+        try:
+            pending = {primary}
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done and policy.try_hedge():
+                attempts.append(asyncio.ensure_future(self._open_attempt(request)))
+                pending.add(attempts[-1])
+            while winner is None and pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in attempts:
+                    if attempt in done and attempt.exception() is None and attempt.result()[1].status < 400:
+                        winner = attempt
+                        break
+            if winner is None: # all failed, so fail as if not hedged
+                winner = primary
+            elif winner is not primary:
+                policy.stats.hedge_wins += 1
+            stack, resp = await winner
+            async with stack:
+                yield resp
+        finally:
+            losers = [attempt for attempt in attempts if attempt is not winner]
+            for attempt in losers:
+                attempt.cancel()
+            if losers:
+                await asyncio.wait(losers)
+            for attempt in losers:
+                if not attempt.cancelled() and attempt.exception() is None:
+                    await attempt.result()[0].aclose()
+
+    async def _open_attempt(self, request: Request) -> tuple[AsyncExitStack, Response]:
+        stack = AsyncExitStack()
+        return stack, await stack.enter_async_context(self._send_once(request))
+
+    # one attempt at sending a signed request, after its turn in the scheduler,
+    # and within the circuit breaker and concurrency limit of its group
+    @asynccontextmanager
+    async def _send_once(self, request: Request) -> AsyncIterator[Response]:
+        group = self._endpoint_group(request)
+        circuit, probe = None, None
+        if self.breaker is not None:
+            circuit = self.breaker.circuit(group)
+            probe = circuit.before_call()
+        priority = current_priority()
+        scheduler, limit = None, None
+        try:
+            if self.scheduler is not None:
+                await within_deadline(self.scheduler.acquire(priority))
+                scheduler = self.scheduler
+            if self.concurrency is not None:
+                group_limit = self.concurrency.limit(group)
+                await within_deadline(group_limit.acquire())
+                limit = group_limit
+        except BaseException:
+            if scheduler is not None:
+                scheduler.release(priority)
+            if circuit is not None:
+                circuit.cancel(probe)
+            raise
+        start = time.monotonic()
+        latency, status = None, None
+        cancelled = False
+        try:
+            if (remaining := remaining_time()) is not None and remaining <= 0:
+                raise DeadlineExceeded()
+            timeout = current_timeouts(self.timeouts).client_timeout()
+            async with request.send(self._client, timeout) as resp:
+                latency = time.monotonic() - start
+                status = resp.status
+                if self.hedging is not None:
+                    self.hedging.observe(request, latency)
+                yield resp
+        except asyncio.CancelledError:
+            cancelled = status is None
+            raise
+        except asyncio.TimeoutError as e:
+            if not isinstance(e, DeadlineExceeded) and ((remaining := remaining_time()) is None or remaining > 0):
+                raise
+            # the caller ran out of time, which says nothing about the upstream
+            cancelled = status is None
+            if isinstance(e, DeadlineExceeded):
+                raise
+            raise DeadlineExceeded() from e
+        finally:
+            if scheduler is not None:
+                scheduler.release(priority)
+            if limit is not None:
+                if cancelled:
+                    limit.cancel()
+                else:
+                    limit.release(latency, status in (429, 503))
+            if circuit is not None:
+                if cancelled:
+                    circuit.cancel(probe)
+                else:
+                    circuit.record(latency, status is None or status >= 500, probe)
+
+    def _endpoint_group(self, request: Request) -> str:
+        '''
+        Requests in the same group share concurrency limits and other per-upstream state.
+        By default, this is the host. Override to group by endpoint instead.
+        '''
+        return urllib.parse.urlsplit(request.url).netloc
+
     # authenticate and use the base URL to make a request
     async def _base_request(self, request: Request) -> str|None:
         request.url = self.get_full_url(request.url)
-        signed = await self.auth.sign(self._client, request)
-        async with signed.send(self._client) as resp:
-            if resp.status >= 400:
-                raise await ApiError.from_resposnse(resp)
-            elif resp.status == 204:
+        async with self._send(request) as resp:
+            if resp.status == 204:
                 return None
             else:
                 return await resp.text()
@@ -108,6 +375,14 @@ class WebAPI:
     async def _json_request(self, req: Request) -> JsonMap:
         return json.loads(await self._text_request(req))
 
+    async def _json_view_request(self, req: Request) -> 'JsonObjectView':
+        from .jsonview import JsonObjectView
+        req.url = self.get_full_url(req.url)
+        async with self._send(req) as resp:
+            if resp.status == 204:
+                raise ApiError(204, 'HTTP No Content returned, but some content was expected', None)
+            return JsonObjectView.from_json_bytes(await resp.read())
+
     async def _empty_request(self, req: Request) -> None:
         await self._base_request(req)
 
@@ -143,29 +418,46 @@ class WebAPI:
             data = data.json()
         elif data and is_dataclass_instance(data):
             data = asdict(data)
-        req = await self.auth.sign(self._client,
+        return self._send(
             Request( method, self.get_full_url(path), 
                 self._convert_parameters(params) if params else {},
                 headers or {},
                 data, not self._use_form_data
             ))
-        return req.send(self._client)
 
     async def _request(self, method: Method, returns: type[T]|None, path: str, params: ParamsDict|None=None, data: Any = None, headers: dict[str, str]|None=None) -> T|None:
+        if self._auto_fields and method == Method.GET and not (params and 'fields' in params):
+            from .fields import fields_mask
+            if (mask := fields_mask(returns)) is not None:
+                params = dict(params or {}) | {'fields': mask}
+        if method == Method.GET and params and returns not in (None, str):
+            split = self._split_parameters(path, params)
+            if len(split) > 1:
+                pages = await self._gather_split(split,
+                    lambda p: self._request(method, dict, path, p, data, headers))
+                return self._from_json(cast(type[T], returns), _merge_pages(pages))
         ctx = await self._request_context(method, path, params, data, headers)
         async with ctx as resp:
-            if resp.status >= 400:
-                raise await ApiError.from_resposnse(resp)
             if returns is None:
                 return None
             elif returns == str:
                 return await resp.text() # type: ignore ## T is str
+            elif hasattr(returns, 'from_json_bytes'):
+                # e.g. JsonObjectView, which decodes only what is used
+                return getattr(returns, 'from_json_bytes')(await resp.read())
             else:
-                obj = await resp.json()
-                if hasattr(returns, 'from_json'):
-                    return getattr(returns, 'from_json')(obj)
-                else:
-                    return returns(obj) # type: ignore
+                return self._from_json(returns, await resp.json())
+
+    def _from_json(self, returns: type[T], obj: Any) -> T:
+        if hasattr(returns, 'from_json'):
+            return getattr(returns, 'from_json')(obj)
+        elif hasattr(returns, 'from_json_bytes'): # merged from split requests
+            return getattr(returns, 'from_json_bytes')(json.dumps(obj).encode())
+        else:
+            return returns(obj) # type: ignore
+
+    async def _gather_split(self, split: list[ParamsDict], request: Callable[[ParamsDict], Awaitable[Any]]) -> list[JsonMap]:
+        return await AsyncLazy.from_iterable(split).map_async(request, self._split_concurrency)
     
     @overload
     async def _get(self, returns: None, path: str, params: ParamsDict|None=None, data: Any = None, headers: dict[str, str]|None=None) -> None: ...
@@ -221,6 +513,11 @@ class WebAPI:
     async def get_json(self, path: str, params: ParamsDict|None=None,
         json: JsonMap|None=None, headers: dict[str, str]|None=None
         ) -> JsonMap:
+        if params:
+            split = self._split_parameters(path, params)
+            if len(split) > 1:
+                return _merge_pages(await self._gather_split(split,
+                    lambda p: self.get_json(path, p, json, headers)))
         return await self._json_request(self._create_request(
             Method.GET, path, params, json, headers
         ))
@@ -282,37 +579,324 @@ class WebAPI:
             Method.GET, path, params, json, headers
         ))
     
+    async def upload(self, path: str, source: 'UploadSource', params: ParamsDict|None=None,
+            method: Method = Method.POST,
+            content_type: str = 'application/octet-stream',
+            headers: dict[str, str]|None=None,
+            chunk_size: int = 1 << 16) -> JsonMap:
+        '''
+        Send a file path, file object or async iterable of bytes as the request body,
+        without reading it all into memory. `path` may also be a full URL.
+        A streamed body can only be sent once, so the request is not retried.
+        There is no total time limit, but the upload fails if the server stops responding.
+        '''
+        from .upload import iter_chunks
+        url = path if '://' in path else self.get_full_url(path)
+        request = Request(method, url, self._convert_parameters(params) if params else {},
+            {'Content-Type': content_type} | (headers or {}),
+            iter_chunks(source, chunk_size))
+        with with_timeouts(current_timeouts(self.timeouts).for_transfer()):
+            async with self._send(request) as resp:
+                text = await resp.text()
+        return json.loads(text) if text else {}
+
+    async def resumable_upload(self, path: str, source: 'UploadSource',
+            metadata: JsonMap|None=None,
+            params: dict[str, str|int]|None=None,
+            content_type: str = 'application/octet-stream',
+            size: int|None=None,
+            chunk_size: int = 32 * (256 << 10), # upload.CHUNK_GRANULARITY
+            on_progress: 'Callable[[UploadProgress], None]|None'=None) -> 'ResumableUpload':
+        '''
+        Start a Google-style resumable upload to an upload endpoint, such as
+        `https://www.googleapis.com/upload/youtube/v3/videos`.
+        Call `run()` on the result to send the source, and keep its `session_uri`
+        to resume with `ResumableUpload(api, session_uri, source).run()` if the process stops.
+        '''
+        from .upload import ResumableUpload
+        return await ResumableUpload.start(self, path, source, metadata, params, content_type, size,
+            chunk_size, on_progress=on_progress)
+
+    async def download(self, path: str, dest: str | os.PathLike[str], params: ParamsDict|None=None,
+            part_size: int = 8 << 20,
+            concurrency: int = 4,
+            on_progress: 'Callable[[DownloadProgress], None]|None'=None) -> 'DownloadProgress':
+        '''
+        Download a resource to a file, without holding it in memory.
+        If the server accepts byte ranges, parts are fetched concurrently and
+        retried individually. `path` may also be a full URL.
+        '''
+        from .download import RangedDownload
+        url = path if '://' in path else self.get_full_url(path)
+        download = RangedDownload(self, url, self._convert_parameters(params) if params else None,
+            part_size, concurrency, on_progress=on_progress)
+        return await download.run(dest)
+
+    def event_stream(self, path: str, params: ParamsDict|None=None,
+            method: Method = Method.GET, json: JsonMap|None=None,
+            heartbeat_timeout: float = 90.0,
+            buffer: int = 256,
+            max_reconnects: int|None = None,
+            initial_backoff: float = 1.0,
+            max_backoff: float = 60.0) -> 'AsyncLazy[ServerEvent]':
+        '''
+        Events of a Server-Sent Events endpoint, for as long as it is iterated.
+        Reconnects with backoff when the stream fails, is closed, or sends nothing
+        (not even a comment) for `heartbeat_timeout` seconds, and resumes after
+        the last event ID. Up to `buffer` events are read ahead of the consumer.
+        '''
+        return self._stream(path, params, method, json, True, heartbeat_timeout, buffer,
+            max_reconnects, initial_backoff, max_backoff)
+
+    def ndjson_stream(self, path: str, params: ParamsDict|None=None,
+            method: Method = Method.GET, json: JsonMap|None=None,
+            heartbeat_timeout: float = 90.0,
+            buffer: int = 256,
+            max_reconnects: int|None = None,
+            initial_backoff: float = 1.0,
+            max_backoff: float = 60.0) -> AsyncLazy[Any]:
+        '''
+        Objects of a newline-delimited JSON stream, such as the Twitter filtered stream.
+        Blank lines are keep-alives. Reconnects like `event_stream`.
+        '''
+        return self._stream(path, params, method, json, False, heartbeat_timeout, buffer,
+            max_reconnects, initial_backoff, max_backoff)
+
+    # streams are long-lived, so they are not counted by the scheduler or concurrency limits
+    def _stream(self, path: str, params: ParamsDict|None, method: Method, json: JsonMap|None,
+            sse: bool, heartbeat_timeout: float, buffer: int,
+            max_reconnects: int|None, initial_backoff: float, max_backoff: float) -> AsyncLazy[Any]:
+        from .stream import stream_events
+        url = path if '://' in path else self.get_full_url(path)
+        request = Request(method, url, self._convert_parameters(params) if params else {}, {},
+            json or {}, json is not None)
+        events = AsyncLazy(stream_events(self, request, sse, heartbeat_timeout, max_reconnects,
+            initial_backoff, max_backoff))
+        return events.buffer(buffer) if buffer > 0 else events
+
+    def watcher(self, min_interval: float = 30.0, max_interval: float = 3600.0,
+            jitter: float = 0.1, concurrency: int = 8) -> 'Watcher':
+        '''
+        Poll many resources for changes. Add resources with `watch()`,
+        and iterate `changes()` to poll them and receive their new values.
+        '''
+        from .watch import Watcher
+        return Watcher(self, min_interval, max_interval, jitter, concurrency)
+
+    def batch_loader(self, path: str, key_param: str = 'id', key_field: str = 'id',
+            params: ParamsDict | None = None,
+            max_batch: int | None = None, delay: float = 0.0,
+            cache: bool = False) -> 'BatchLoader[str, JsonMap]':
+        '''
+        Load single items from an endpoint which accepts a list of keys, such as IDs,
+        with one request per batch of lookups made close together.
+        Each item is matched to its lookup by its `key_field`.
+        The batch size defaults to the list limit of `key_param`, or 50.
+        If `cache`, loaded items are kept until `clear()` is called on the loader,
+        so only cache with a loader made for one operation, not one kept on the API.
+        '''
+        async def load_batch(keys: list[str]) -> dict[str, JsonMap]:
+            items = await self.paginated(path, dict(params or {}) | {key_param: keys}, None)
+            return {cast(str, item[key_field]): item for item in items}
+        if max_batch is None:
+            max_batch = self._parameter_list_limits.get(key_param, 50)
+        from .loader import BatchLoader
+        return BatchLoader(load_batch, max_batch, delay, cache)
+
+    @overload
+    def paginated(self, path: str, params: ParamsDict, limit: int | None,
+                        lazy: Literal[False] = False) -> AsyncLazy[JsonMap]: ...
+    @overload
+    def paginated(self, path: str, params: ParamsDict, limit: int | None,
+                        lazy: Literal[True]) -> AsyncLazy[JsonMapCo]: ...
     def paginated(self,
                         path: str,
                         params: ParamsDict,
-                        limit: int | None) -> AsyncLazy[JsonMap]:
+                        limit: int | None,
+                        lazy: bool = False) -> AsyncLazy[JsonMap] | AsyncLazy[JsonMapCo]:
         '''
         Return an awaitable and async iterable over google or twitter-style paginated items.
         You can also await the return value to get the entire list.
+        If `lazy`, items are `JsonObjectView`s, which decode only the fields that are used.
         '''
-        return AsyncLazy(self._paginated(path, params, limit))
+        # pages are fetched later, outside of any `quota_cost`, `with_priority` or `with_deadline` of the caller
+        context = {var: var.get() for var in _CALLER_CONTEXT}
+        split = self._split_parameters(path, params) if params else [params]
+        if len(split) == 1:
+            return AsyncLazy(self._paginated(path, params, limit, context, lazy))
+        return AsyncLazy(self._paginated_split(path, split, limit, context, lazy))
+
+    # the pages of each split in turn, so that no more are fetched than are used
+    async def _paginated_split(self,
+                        path: str,
+                        split: list[ParamsDict],
+                        limit: int | None,
+                        context: dict[ContextVar[Any], Any],
+                        lazy: bool) -> AsyncGenerator[JsonMap, None]:
+        result_count = 0
+        for params in split:
+            remaining = None if limit is None else limit - result_count
+            async with aclosing(self._paginated(path, params, remaining, context, lazy)) as items:
+                async for item in items:
+                    result_count += 1
+                    yield item
+            if limit is not None and result_count >= limit:
+                return
 
     async def _paginated(self,
                         path: str,
                         params: ParamsDict,
-                        limit: int | None) -> AsyncGenerator[JsonMap, None]:
+                        limit: int | None,
+                        context: dict[ContextVar[Any], Any] | None = None,
+                        lazy: bool = False) -> AsyncGenerator[JsonMap, None]:
         result_count = 0
 
-        params = dict(params or {})
-
-        while True:
-            page = await self.get_json(path, params)
-
-            items = page.get('items', page.get('data'))
+        async for page in self._pages(path, params, context, lazy):
+            items = _page_items(page)
 
             if not items: break
 
-            for item in cast(list[JsonMap], items):
+            for item in items:
                 result_count += 1
                 yield item
                 if limit is not None and result_count >= limit:
                     return
 
+    async def _pages(self,
+                        path: str,
+                        params: ParamsDict,
+                        context: dict[ContextVar[Any], Any] | None = None,
+                        lazy: bool = False) -> AsyncGenerator[JsonMapCo, None]:
+        params = dict(params or {})
+
+        while True:
+            tokens = [(var, var.set(value)) for var, value in (context or {}).items()]
+            try:
+                # already split by paginated(), if needed
+                request = self._create_request(Method.GET, path, params)
+                page = await (self._json_view_request(request) if lazy else self._json_request(request))
+            finally:
+                for var, token in reversed(tokens):
+                    var.reset(token)
+
+            yield page
+
             page_token = cast(str, page.get('nextPageToken'))
             if not page_token: break
-            params['pageToken'] = page_token
\ No newline at end of file
+            params['pageToken'] = page_token
+
+    def synced(self,
+                        path: str,
+                        params: ParamsDict,
+                        store: 'SyncStore',
+                        key: str | None = None,
+                        on_full_sync: Callable[[], Awaitable[None]] | None = None,
+                        token_param: str = 'syncToken',
+                        token_field: str = 'nextSyncToken') -> AsyncLazy[JsonMap]:
+        '''
+        Return an async iterable over the items of a google-style paginated endpoint
+        which supports incremental sync, such as Google Calendar events.
+        The first sync lists every item. Later syncs send the token from the last page
+        of the previous one, and list only what changed since, including deleted items.
+        If the server rejects the token with 410 Gone, every item is listed again,
+        after awaiting `on_full_sync` so that local copies can be cleared.
+        The token is saved in `store` under `key` only once every page has been iterated.
+        '''
+        # pages are fetched later, outside of any `quota_cost`, `with_priority` or `with_deadline` of the caller
+        context = {var: var.get() for var in _CALLER_CONTEXT}
+        if key is None:
+            key = F"{self.get_full_url(path)}?{urllib.parse.urlencode(sorted(params.items()), doseq=True)}"
+        return AsyncLazy(self._synced(path, params, store, key, on_full_sync, token_param, token_field, context))
+
+    async def _synced(self,
+                        path: str,
+                        params: ParamsDict,
+                        store: 'SyncStore',
+                        key: str,
+                        on_full_sync: Callable[[], Awaitable[None]] | None,
+                        token_param: str,
+                        token_field: str,
+                        context: dict[ContextVar[Any], Any]) -> AsyncGenerator[JsonMap, None]:
+        sync_token = await store.get(key)
+        while True:
+            if sync_token is None and on_full_sync is not None:
+                await on_full_sync()
+            sync_params = dict(params) if sync_token is None else dict(params) | {token_param: sync_token}
+            next_token: str | None = None
+            try:
+                # unlike paginated(), an empty page may still lead to more pages or end with a token
+                async for page in self._pages(path, sync_params, context):
+                    for item in _page_items(page) or []:
+                        yield item
+                    next_token = cast(str | None, page.get(token_field, next_token))
+            except ApiError as e:
+                if sync_token is None or e.status != 410:
+                    raise
+                # the token expired or was invalidated
+                await store.delete(key)
+                sync_token = None
+                continue
+            if next_token is not None:
+                await store.put(key, next_token)
+            return
+
+class WebAPIGroup:
+    '''
+    Closes many `WebAPI`s concurrently, such as at shutdown.
+    Can also share one client session between them.
+    '''
+    apis: list[WebAPI]
+    session: Client | None
+
+    def __init__(self, session: Client | None = None):
+        '''
+        If a session is given, it is lent to every added API that does not have one yet,
+        and closed along with the group.
+        '''
+        self.apis = []
+        self.session = session
+
+    def add(self, api: T_API) -> T_API:
+        'Close this API with the group.'
+        if self.session is not None and api._maybe_client is None: # type: ignore ## reportPrivateUsage
+            api.use_session(self.session)
+        self.apis.append(api)
+        return api
+
+    async def aclose(self):
+        'Close every API, and then the shared session.'
+        apis, self.apis = self.apis, []
+        await asyncio.gather(*(api.aclose() for api in apis))
+        if self.session is not None:
+            await self.session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_: Any):
+        await self.aclose()
+
+def _cacheable(request: Request) -> bool:
+    if request.method != Method.GET:
+        return False
+    # the cache stores whole responses, so it cannot answer for byte ranges
+    if 'Range' in request.headers:
+        return False
+    # e.g. polls for changes, which must ask the server
+    cache_control = request.headers.get('Cache-Control', '')
+    return 'no-cache' not in cache_control and 'no-store' not in cache_control
+
+def _page_items(page: JsonMapCo) -> list[JsonMap] | None:
+    # not page.get('items', page.get('data')), so that a lazy page is only searched for 'data' when needed
+    return cast(list[JsonMap] | None, page['items'] if 'items' in page else page.get('data'))
+
+# combine the items of several responses, as if from one request
+def _merge_pages(pages: list[JsonMap]) -> JsonMap:
+    if any(page.get('nextPageToken') for page in pages):
+        # there is no one token to continue from
+        raise ValueError("A request split over several had more than one page of results, use paginated() to get them all")
+    merged = dict(pages[0])
+    for key in ('items', 'data'):
+        if isinstance(merged.get(key), list):
+            merged[key] = [item for page in pages for item in cast(list[Any], page.get(key) or [])]
+    return merged
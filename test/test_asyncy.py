@@ -0,0 +1,135 @@
+import asyncio
+
+from SlyAPI.asyncy import AsyncLazy
+
+async def numbers(n: int, log: list[str] | None = None):
+    try:
+        for i in range(n):
+            if log is not None: log.append(F'produce {i}')
+            yield i
+            await asyncio.sleep(0)
+    finally:
+        if log is not None: log.append('closed')
+
+async def test_operators():
+    assert await AsyncLazy(numbers(10)).filter(lambda x: x % 2 == 0) == [0, 2, 4, 6, 8]
+    assert await AsyncLazy(numbers(10)).chunked(4) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+    assert await AsyncLazy(numbers(3)).flat_map(lambda x: [x] * x) == [1, 2, 2]
+    assert await AsyncLazy(numbers(3)).flat_map(lambda x: numbers(x)) == [0, 0, 1]
+    assert await AsyncLazy(numbers(100)).buffer(8) == list(range(100))
+
+async def test_take_closes_upstream():
+    log: list[str] = []
+    assert await AsyncLazy(numbers(100, log)).map(str).take(2) == ['0', '1']
+    assert log == ['produce 0', 'produce 1', 'closed']
+    log.clear()
+    assert await AsyncLazy(numbers(100, log)).filter(lambda _: True).take(2) == [0, 1]
+    assert log == ['produce 0', 'produce 1', 'closed']
+
+async def test_map_async():
+    running = 0
+    most_running = 0
+
+    async def slow_square(x: int):
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        await asyncio.sleep(0.01 * (5 - x % 5))
+        running -= 1
+        return x * x
+
+    assert await AsyncLazy(numbers(20)).map_async(slow_square, 4) == [x * x for x in range(20)]
+    assert most_running == 4
+
+    unordered = await AsyncLazy(numbers(20)).map_async(slow_square, 4, ordered=False)
+    assert sorted(unordered) == [x * x for x in range(20)]
+    assert unordered != [x * x for x in range(20)]
+
+async def test_map_async_error_cancels():
+    started: list[int] = []
+    cancelled: list[int] = []
+
+    async def work(x: int):
+        started.append(x)
+        try:
+            if x == 1:
+                raise ValueError(x)
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(x)
+            raise
+        return x
+
+    try:
+        # does not wait for other calls to finish
+        await asyncio.wait_for(AsyncLazy(numbers(10)).map_async(work, 3)._items(), 0.5)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    # never more than 3 at once, and all others are cancelled
+    assert 1 in started and len(started) <= 3
+    assert sorted(cancelled) == [x for x in started if x != 1]
+
+async def test_buffer_reads_ahead():
+    log: list[str] = []
+    buffered = AsyncLazy(numbers(100, log)).buffer(5)
+    it = aiter(buffered)
+    assert await anext(it) == 0
+    await asyncio.sleep(0.05)
+    # one consumed, five queued, one waiting to be queued
+    assert len(log) == 7
+    await it.aclose()
+    await asyncio.sleep(0)
+    assert log[-1] == 'closed'
+
+async def test_tee():
+    log: list[str] = []
+    largest_buffer = 0
+
+    a, b, c = AsyncLazy(numbers(50, log)).tee(3, buffer=4)
+
+    async def consume(lazy: AsyncLazy[int], delay: float, progress: list[int]):
+        async for x in lazy:
+            progress.append(x)
+            await asyncio.sleep(delay)
+        return progress
+
+    fast: list[int] = []
+    slow: list[int] = []
+
+    async def watch():
+        nonlocal largest_buffer
+        while len(slow) < 50:
+            largest_buffer = max(largest_buffer, len(fast) - len(slow))
+            await asyncio.sleep(0.001)
+
+    results = await asyncio.gather(
+        consume(a, 0, fast),
+        consume(b, 0.001, []),
+        consume(c, 0.005, slow),
+        watch())
+
+    assert results[0] == results[1] == results[2] == list(range(50))
+    # each item read once, and the fast consumer was held back by the slow one
+    assert log.count('produce 0') == 1 and len(log) == 51
+    assert largest_buffer <= 5
+
+async def test_tee_close_and_error():
+    log: list[str] = []
+    a, b = AsyncLazy(numbers(50, log)).tee(2, buffer=2)
+    # closing one lets the other run ahead
+    await a.gen.aclose()
+    assert await b == list(range(50))
+    assert log[-1] == 'closed'
+
+    async def failing():
+        yield 1
+        raise ValueError()
+
+    a, b = AsyncLazy(failing()).tee(2)
+    for lazy in (a, b):
+        try:
+            await lazy
+            assert False, "expected ValueError"
+        except ValueError:
+            pass
@@ -1,8 +1,8 @@
-import os
+import asyncio, os
 from datetime import datetime, timedelta, timezone
 from dataclasses import asdict
 
-from SlyAPI.web import JsonMap
+from SlyAPI.web import ApiError, JsonMap
 from SlyAPI import *
 
 test_dir = os.path.dirname(__file__)
@@ -125,3 +125,73 @@ def test_oauth2_serialize():
 
     assert app1 == app2
 
+
+
+async def test_api_key_pool():
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    spent = {'key_a'}
+    seen: list[str] = []
+
+    async def handler(request: web.Request):
+        key = request.query['key']
+        seen.append(key)
+        if key in spent:
+            return web.Response(status=403, text='{"error": {"errors": [{"reason": "quotaExceeded"}]}}')
+        return web.json_response({'key': key})
+
+    app = web.Application()
+    app.router.add_get('/videos', handler)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+
+        pool = ApiKeyPool.url('key', ['key_a', 'key_b', 'key_c'])
+        api = Stub(pool)
+
+        results = [(await api.get_json('/videos'))['key'] for _ in range(4)]
+
+        # key_a was benched after its first rejection, and that request retried with key_b
+        assert seen[:2] == ['key_a', 'key_b']
+        assert results == ['key_b', 'key_c', 'key_b', 'key_c']
+        assert [k.uses for k in pool.keys] == [1, 2, 2]
+        assert pool.keys[0].rejections == 1
+        assert pool.keys[0].benched and not pool.keys[1].benched
+
+        spent.update(['key_b', 'key_c'])
+        try:
+            await api.get_json('/videos')
+            assert False, "expected ApiError"
+        except ApiError as e:
+            assert e.status == 403
+        assert pool.available() == []
+
+async def test_api_key_pool_retry_after_zero():
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    seen: list[str] = []
+
+    async def handler(request: web.Request):
+        seen.append(request.query['key'])
+        return web.Response(status=429, headers={'Retry-After': '0'})
+
+    app = web.Application()
+    app.router.add_get('/videos', handler)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+
+        pool = ApiKeyPool.url('key', ['key_a', 'key_b', 'key_c'])
+        async with Stub(pool) as api:
+            try:
+                await asyncio.wait_for(api.get_json('/videos'), 5)
+                assert False, "expected ApiError"
+            except ApiError as e:
+                assert e.status == 429
+        # once with each key, which stay benched for a moment
+        assert seen == ['key_a', 'key_b', 'key_c']
+        assert pool.available() == []
@@ -0,0 +1,34 @@
+import json, os, tempfile
+
+from SlyAPI.bench import LoadOptions, StubOptions, bench_command, percentile, run_bench, stub_app
+
+from aiohttp.test_utils import TestServer
+
+def test_percentile():
+    values = [float(i) for i in range(1, 1001)]
+    assert [percentile(values, q) for q in (0.5, 0.9, 0.99, 0.999)] == [500, 900, 990, 999]
+    assert percentile([], 0.5) == 0.0
+
+async def test_run_bench():
+    stub = StubOptions(latency=0.001, pages=3, statuses={503: 0.2}, seed=1)
+    load = LoadOptions(concurrency=4, duration=0.3, warmup=0, paginate=True, features=['breaker', 'lazy'])
+    async with TestServer(stub_app(stub)) as server:
+        result = await run_bench(str(server.make_url('')).rstrip('/'), stub, load)
+
+    assert result.operations > 10
+    # each listing is three requests, unless one failed
+    assert result.responses['200'] > result.operations
+    assert result.errors['503'] == result.responses['503'] > 0
+    assert result.latency_ms['p50'] <= result.latency_ms['p99'] <= result.latency_ms['max']
+    assert sum(count for _, count in result.histogram_ms) == result.operations
+    assert json.loads(json.dumps(result.to_dict()))['load']['features'] == ['breaker', 'lazy']
+
+async def test_bench_command():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.json')
+        await bench_command(['--duration', '0.2', '--warmup', '0', '--rate', '100', '--latency', '1', '--json', path])
+        with open(path) as f:
+            result = json.load(f)
+    assert result['load']['rate'] == 100 and 15 <= result['operations'] <= 21
+    assert set(result['latency_ms']) == {'p50', 'p90', 'p99', 'p999', 'mean', 'max'}
+    assert result['cpu_ms_per_operation'] > 0
@@ -0,0 +1,32 @@
+import importlib.util, os
+
+spec = importlib.util.spec_from_file_location('suite', os.path.join(os.path.dirname(__file__), '..', 'bench', 'suite.py'))
+suite = importlib.util.module_from_spec(spec) # type: ignore
+spec.loader.exec_module(suite) # type: ignore
+
+def test_compare():
+    results = {'benchmarks': {name: {'min_us': us, 'median_us': us * 2, 'threshold': 0.25}
+        for name, us in [('same', 100.0), ('slower', 130.0), ('faster', 70.0), ('added', 5.0)]}}
+    baseline = {'benchmarks': {name: {'min_us': 100.0, 'median_us': 100.0} for name in ['same', 'slower', 'faster', 'removed']}}
+
+    statuses = {c.name: c.status for c in suite.compare(results, baseline)}
+    assert statuses == {'same': 'ok', 'slower': 'regression', 'faster': 'improvement', 'added': 'new'}
+    assert {c.name: c.status for c in suite.compare(results, baseline, 0.5)}['slower'] == 'ok'
+
+def test_compare_calibrated():
+    # the whole machine runs 1.5x slower now, and so does the calibration loop
+    results = {'benchmarks': {name: {'min_us': us, 'threshold': 0.25, 'calibration_us': 15.0}
+        for name, us in [('same', 150.0), ('slower', 200.0)]}}
+    baseline = {'benchmarks': {name: {'min_us': 100.0, 'calibration_us': 10.0} for name in ['same', 'slower']}}
+
+    comparisons = suite.compare(results, baseline)
+    assert {c.name: c.status for c in comparisons} == {'same': 'ok', 'slower': 'regression'}
+    assert comparisons[0].speed == 1.5 and comparisons[0].ratio == 1.0
+
+async def test_run():
+    results = await suite.run(['convert', 'oauth2'], rounds=2, round_seconds=0.01)
+    assert set(results['benchmarks']) == {'convert_parameters', 'oauth2_sign_contention'}
+    for result in results['benchmarks'].values():
+        assert 0 < result['min_us'] <= result['median_us'] <= result['max_us']
+        assert result['calibration_us'] > 0
+    assert results['benchmarks']['oauth2_sign_contention']['threshold'] == suite.NETWORK_THRESHOLD
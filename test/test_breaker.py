@@ -0,0 +1,97 @@
+import asyncio
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.breaker import CircuitBreaker, CircuitOpen, CircuitState
+from SlyAPI.web import ApiError, JsonMap
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+async def test_circuit_breaker():
+    failing = True
+    received = 0
+
+    async def handler(_request: web.Request):
+        nonlocal received
+        received += 1
+        if failing:
+            return web.json_response({'error': 'down'}, status=500)
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_get('/status', handler)
+    async with TestServer(app) as server:
+        transitions: list[tuple[CircuitState, CircuitState]] = []
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+            breaker = CircuitBreaker(window=4, min_calls=4, open_seconds=0.1, half_open_probes=2,
+                on_transition=lambda _group, old, new: transitions.append((old, new)))
+
+            def __init__(self):
+                super().__init__(Auth.none())
+
+            async def status(self) -> JsonMap:
+                return await self.get_json('/status')
+
+        async with Stub() as api:
+            for _ in range(4):
+                try:
+                    await api.status()
+                    assert False, "expected ApiError"
+                except ApiError as e:
+                    assert not isinstance(e, CircuitOpen)
+            assert transitions == [(CircuitState.CLOSED, CircuitState.OPEN)]
+
+            # open: fails without sending
+            try:
+                await api.status()
+                assert False, "expected CircuitOpen"
+            except CircuitOpen as e:
+                assert 0 < e.retry_after <= 0.1
+            assert received == 4
+
+            # half-open: a failed probe opens it again
+            await asyncio.sleep(0.1)
+            try:
+                await api.status()
+            except CircuitOpen:
+                assert False, "probe should be sent"
+            except ApiError:
+                pass
+            assert transitions[-2:] == [
+                (CircuitState.OPEN, CircuitState.HALF_OPEN), (CircuitState.HALF_OPEN, CircuitState.OPEN)]
+
+            # half-open: only two probes at once, and both succeeding closes it
+            failing = False
+            await asyncio.sleep(0.1)
+            results = await asyncio.gather(*(api.status() for _ in range(3)), return_exceptions=True)
+            assert [type(r) for r in results] == [dict, dict, CircuitOpen]
+            assert transitions[-1] == (CircuitState.HALF_OPEN, CircuitState.CLOSED)
+            assert await api.status() == {'ok': True}
+            assert Stub.breaker.state() == {F'{server.host}:{server.port}': CircuitState.CLOSED}
+
+def test_stale_probes():
+    breaker = CircuitBreaker(window=1, min_calls=1, open_seconds=0.0, half_open_probes=2)
+    circuit = breaker.circuit('example.com')
+    circuit.record(0.0, True, None)
+    assert circuit.state == CircuitState.OPEN
+
+    first, straggler = circuit.before_call(), circuit.before_call()
+    circuit.record(0.0, True, first) # opens again, while the other probe is in flight
+    probes = [circuit.before_call(), circuit.before_call()]
+    assert circuit.state == CircuitState.HALF_OPEN
+
+    # the earlier probe finishing does not make room for another
+    circuit.record(0.0, False, straggler)
+    circuit.cancel(straggler)
+    try:
+        circuit.before_call()
+        assert False, "only two probes at once"
+    except CircuitOpen:
+        pass
+
+    for probe in probes:
+        circuit.record(0.0, False, probe)
+    assert circuit.state == CircuitState.CLOSED
@@ -0,0 +1,90 @@
+import os
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.cache import DiskCache
+from SlyAPI.web import Method, Request
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+class CountingAuth(Auth):
+    signed = 0
+    async def sign(self, client: ClientSession, request: Request) -> Request:
+        self.signed += 1
+        return request
+
+async def test_disk_cache(tmp_path: str):
+    requests: list[str] = []
+
+    async def fresh(request: web.Request):
+        requests.append('fresh')
+        return web.json_response({'n': request.query['n']}, headers={'Cache-Control': 'max-age=60'})
+
+    async def stale(request: web.Request):
+        requests.append('stale')
+        if request.headers.get('If-None-Match') == '"v1"':
+            return web.Response(status=304, headers={'ETag': '"v1"', 'Cache-Control': 'no-cache'})
+        return web.json_response({'version': 1}, headers={'ETag': '"v1"', 'Cache-Control': 'no-cache'})
+
+    async def never(_request: web.Request):
+        requests.append('never')
+        return web.json_response({}, headers={'Cache-Control': 'no-store'})
+
+    app = web.Application()
+    app.router.add_get('/fresh', fresh)
+    app.router.add_get('/stale', stale)
+    app.router.add_get('/never', never)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+
+        path = os.path.join(tmp_path, 'cache.sqlite')
+        auth = CountingAuth()
+
+        async with Stub(auth) as api:
+            api.cache = DiskCache(path)
+            assert await api.get_json('/fresh', {'n': 1}) == {'n': '1'}
+            assert await api.get_json('/fresh', {'n': 2}) == {'n': '2'}
+            assert await api._get(dict, '/fresh', {'n': 1}) == {'n': '1'}
+            assert await api.get_json('/stale') == {'version': 1}
+            assert await api.get_json('/stale') == {'version': 1}
+            await api.get_json('/never')
+            await api.get_json('/never')
+            # bodies which cannot be stored are not read ahead of the caller
+            async with api._send(Request(Method.GET, api.get_full_url('/never'))) as resp:
+                assert await resp.content.read() == b'{}'
+            stats = api.cache.stats
+            assert (stats.hits, stats.revalidated, stats.misses, stats.stores) == (1, 1, 6, 3)
+            api.cache.close()
+
+        assert requests == ['fresh', 'fresh', 'stale', 'stale', 'never', 'never', 'never']
+        assert auth.signed == 7
+
+        # another run, sharing the same file
+        async with Stub(auth) as api:
+            api.cache = DiskCache(path)
+            assert await api.get_json('/fresh', {'n': 2}) == {'n': '2'}
+            assert api.cache.stats.hits == 1
+            assert auth.signed == 7 # fresh hits are not signed
+            api.cache.close()
+
+async def test_disk_cache_eviction(tmp_path: str):
+    cache = DiskCache(os.path.join(tmp_path, 'cache.sqlite'), max_bytes=3000)
+    for i in range(10):
+        key = F'GET /{i}'
+        await cache.put(key, 200, {}, os.urandom(1000)) # incompressible
+        await cache.get('GET /0') # keep the first one recently used
+    assert len(cache) == 2
+    assert cache.stats.evictions == 8
+    assert await cache.get('GET /0') is not None
+    assert await cache.get('GET /9') is not None
+    cache.close()
+
+    # replacing a response frees its size, including for other processes sharing the file
+    cache = DiskCache(os.path.join(tmp_path, 'cache.sqlite'), max_bytes=3000)
+    for _ in range(5):
+        await cache.put('GET /0', 200, {}, os.urandom(1000))
+    assert len(cache) == 2 and cache.stats.evictions == 0
+    cache.close()
@@ -0,0 +1,71 @@
+import asyncio
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.concurrency import AdaptiveConcurrency, AdaptiveLimit
+from SlyAPI.web import ApiError
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+async def test_adaptive_limit():
+    limit = AdaptiveLimit(initial=2, max_limit=4)
+
+    await limit.acquire()
+    await limit.acquire()
+    third = asyncio.ensure_future(limit.acquire())
+    await asyncio.sleep(0)
+    assert limit.state().queued == 1 and not third.done()
+
+    # steady latency grows the limit and lets the queued request through
+    limit.release(0.01)
+    await third
+    for _ in range(20):
+        limit.release(0.01)
+        await limit.acquire()
+    assert limit.state().limit == 4
+
+    # throttling cuts it
+    limit.release(0.01, throttled=True)
+    assert limit.state().limit == 2
+    assert limit.state().in_flight == 1
+
+async def test_adaptive_concurrency():
+    capacity = 5
+    in_flight = 0
+
+    async def handler(_request: web.Request):
+        nonlocal in_flight
+        if in_flight >= capacity:
+            return web.json_response({'error': 'busy'}, status=503)
+        in_flight += 1
+        await asyncio.sleep(0.005)
+        in_flight -= 1
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_get('/work', handler)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+            concurrency = AdaptiveConcurrency(initial=20)
+
+            def __init__(self):
+                super().__init__(Auth.none())
+
+            async def work(self) -> bool:
+                try:
+                    await self.get_json('/work')
+                    return True
+                except ApiError:
+                    return False
+
+        async with Stub() as api:
+            results = await asyncio.gather(*(api.work() for _ in range(200)))
+
+        state = Stub.concurrency.state()[F'{server.host}:{server.port}']
+        assert state.in_flight == 0 and state.queued == 0
+        assert state.limit < 20
+        # after backing off, most requests fit within the server's capacity
+        assert sum(results[100:]) > 80
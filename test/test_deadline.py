@@ -0,0 +1,131 @@
+import asyncio, time
+from datetime import datetime, timedelta, timezone
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.breaker import CircuitBreaker, CircuitState
+from SlyAPI.concurrency import AdaptiveConcurrency
+from SlyAPI.oauth2 import OAuth2, OAuth2App, OAuth2User
+from SlyAPI.web import JsonMap
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+async def test_deadlines():
+    async def slow(_request: web.Request):
+        await asyncio.sleep(1.0)
+        return web.json_response({})
+
+    async def page(request: web.Request):
+        await asyncio.sleep(0.05)
+        n = int(request.query.get('pageToken', 0))
+        return web.json_response({'items': [n], 'nextPageToken': str(n + 1)})
+
+    async def token(_request: web.Request):
+        await asyncio.sleep(1.0)
+        return web.json_response({'access_token': 'a', 'expires_in': 3600, 'token_type': 'Bearer'})
+
+    app = web.Application()
+    app.router.add_get('/slow', slow)
+    app.router.add_get('/pages', page)
+    app.router.add_post('/token', token)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+
+            async def slow(self) -> JsonMap:
+                return await self.get_json('/slow')
+
+            def pages(self) -> AsyncLazy[JsonMap]:
+                return self.paginated('/pages', {}, None)
+
+        async with Stub(Auth.none()) as api:
+            start = time.monotonic()
+            try:
+                with with_deadline(0.1):
+                    await api.slow()
+                assert False, "expected DeadlineExceeded"
+            except DeadlineExceeded as e:
+                assert isinstance(e, asyncio.TimeoutError)
+            assert time.monotonic() - start < 0.5
+
+            # per-request timeouts are not the caller's deadline
+            try:
+                with with_timeouts(Timeouts(first_byte=0.1)):
+                    await api.slow()
+                assert False, "expected a timeout"
+            except asyncio.TimeoutError as e:
+                assert not isinstance(e, DeadlineExceeded)
+
+            # pages fetched later keep the deadline
+            with with_deadline(0.3):
+                pages = api.pages()
+            items: list[JsonMap] = []
+            try:
+                async for item in pages:
+                    items.append(item)
+                assert False, "expected DeadlineExceeded"
+            except DeadlineExceeded:
+                pass
+            assert 2 <= len(items) <= 6
+
+        # and so do token refreshes
+        expired = OAuth2User('old', 'refresh', datetime.now(timezone.utc) - timedelta(hours=1))
+        oauth = OAuth2(OAuth2App('id', 'secret', '', str(server.make_url('/token'))), expired)
+        async with Stub(oauth) as api:
+            start = time.monotonic()
+            try:
+                with with_deadline(0.1):
+                    await api.slow()
+                assert False, "expected DeadlineExceeded"
+            except DeadlineExceeded:
+                pass
+            assert time.monotonic() - start < 0.5
+            assert not oauth._refreshed.locked() # type: ignore ## reportPrivateUsage
+
+        # the API's own timeouts apply to token refreshes too
+        oauth = OAuth2(OAuth2App('id', 'secret', '', str(server.make_url('/token'))), expired)
+        async with Stub(oauth) as api:
+            api.timeouts = Timeouts(first_byte=0.1)
+            start = time.monotonic()
+            try:
+                await api.slow()
+                assert False, "expected a timeout"
+            except asyncio.TimeoutError as e:
+                assert not isinstance(e, DeadlineExceeded)
+            assert time.monotonic() - start < 0.5
+
+def test_timeouts_are_not_shared():
+    first, second = WebAPI(Auth.none()), WebAPI(Auth.none())
+    try:
+        first.timeouts.total = 1.0 # type: ignore ## frozen
+        assert False, "expected FrozenInstanceError"
+    except AttributeError: # FrozenInstanceError
+        pass
+    first.timeouts = Timeouts(total=1.0)
+    assert second.timeouts.total == 300.0
+
+async def test_expired_deadlines_are_not_failures():
+    async def slow(_request: web.Request):
+        await asyncio.sleep(0.2)
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get('/slow', slow)
+    async with TestServer(app) as server:
+        async with WebAPI(Auth.none()) as api:
+            api.base_url = str(server.make_url(''))
+            api.breaker = CircuitBreaker(window=4, min_calls=4)
+            api.concurrency = AdaptiveConcurrency(initial=8)
+            for seconds in [0.05] * 6 + [0.0] * 2: # timed out in flight, or before sending
+                try:
+                    with with_deadline(seconds):
+                        await api.get_json('/slow')
+                    assert False, "expected DeadlineExceeded"
+                except DeadlineExceeded:
+                    pass
+            assert set(api.breaker.state().values()) == {CircuitState.CLOSED}
+            state, = api.concurrency.state().values()
+            assert state.limit == 8 and state.in_flight == 0
+            assert await api.get_json('/slow') == {}
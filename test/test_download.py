@@ -0,0 +1,143 @@
+import asyncio, gzip, os, re, tempfile
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.cache import DiskCache
+from SlyAPI.web import Request
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+DATA = os.urandom(300_000)
+
+class CountingAuth(Auth):
+    signed: int = 0
+
+    async def sign(self, client: ClientSession, request: Request) -> Request:
+        self.signed += 1
+        request.headers['Authorization'] = 'Bearer test'
+        return request
+
+def stub_file_server(ranges: bool) -> tuple[web.Application, list[str]]:
+    requested: list[str] = []
+    failed: set[str] = set()
+
+    async def head(request: web.Request):
+        assert request.headers['Authorization'] == 'Bearer test'
+        headers = {'Content-Length': str(len(DATA)), 'ETag': '"v1"'}
+        if ranges:
+            headers['Accept-Ranges'] = 'bytes'
+        return web.Response(headers=headers)
+
+    async def get(request: web.Request):
+        assert request.headers['Authorization'] == 'Bearer test'
+        range_header = request.headers.get('Range')
+        requested.append(range_header or '')
+        if not ranges or range_header is None:
+            # slowly, and storable by a cache
+            response = web.StreamResponse(headers={'Cache-Control': 'max-age=60', 'Content-Length': str(len(DATA))})
+            await response.prepare(request)
+            for i in range(0, len(DATA), 100_000):
+                await asyncio.sleep(0.05)
+                await response.write(DATA[i:i + 100_000])
+            await response.write_eof()
+            return response
+        assert request.headers['If-Range'] == '"v1"'
+        match = re.fullmatch(r'bytes=(\d+)-(\d+)', range_header)
+        assert match
+        start, end = int(match.group(1)), int(match.group(2))
+        if start == 100_000 and 'fail' not in failed: # fails outright once
+            failed.add('fail')
+            return web.Response(status=503)
+        if start == 200_000 and 'short' not in failed: # stops halfway once
+            failed.add('short')
+            end = start + 49_999
+        headers = {'Content-Range': F'bytes {start}-{end}/{len(DATA)}'}
+        response = web.StreamResponse(status=206, headers=headers)
+        await response.prepare(request)
+        await response.write(DATA[start:end + 1])
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_route('HEAD', '/file', head)
+    app.router.add_get('/file', get, allow_head=False)
+    return app, requested
+
+async def test_ranged_download():
+    app, requested = stub_file_server(ranges=True)
+    async with TestServer(app) as server:
+        auth = CountingAuth()
+        async with WebAPI(auth) as api:
+            api.base_url = str(server.make_url(''))
+            with tempfile.TemporaryDirectory() as tmp:
+                dest = os.path.join(tmp, 'export.bin')
+                progress = await api.download('/file', dest, part_size=100_000, concurrency=3)
+                with open(dest, 'rb') as f:
+                    assert f.read() == DATA
+                assert os.listdir(tmp) == ['export.bin']
+
+    assert progress.total == progress.received == len(DATA)
+    assert progress.ranges == 3 and progress.retries == 2
+    # the part that stopped halfway resumed from where it stopped
+    assert 'bytes=250000-299999' in requested
+    assert auth.signed == 1 + len(requested)
+
+async def test_whole_download():
+    app, requested = stub_file_server(ranges=False)
+    async with TestServer(app) as server:
+        async with WebAPI(CountingAuth()) as api:
+            api.base_url = str(server.make_url(''))
+            with tempfile.TemporaryDirectory() as tmp:
+                dest = os.path.join(tmp, 'export.bin')
+                progress = await api.download('/file', dest, part_size=100_000)
+                with open(dest, 'rb') as f:
+                    assert f.read() == DATA
+    assert progress.ranges == 0 and requested == ['']
+
+async def test_download_with_cache():
+    app, requested = stub_file_server(ranges=False)
+    async with TestServer(app) as server:
+        async with WebAPI(CountingAuth()) as api:
+            api.base_url = str(server.make_url(''))
+            # downloads skip the cache, and may take longer than the total limit if they never stall
+            api.timeouts = Timeouts(total=0.1, first_byte=1.0)
+            with tempfile.TemporaryDirectory() as tmp:
+                api.cache = DiskCache(os.path.join(tmp, 'cache.sqlite'))
+                dest = os.path.join(tmp, 'export.bin')
+                for _ in range(2):
+                    await api.download('/file', dest)
+                    with open(dest, 'rb') as f:
+                        assert f.read() == DATA
+                assert len(api.cache) == 0
+                api.cache.close()
+    assert requested == ['', '']
+
+async def test_download_from_compressing_server():
+    compressed = gzip.compress(DATA)
+    encodings: list[str] = []
+
+    async def file(request: web.Request):
+        encodings.append(request.headers.get('Accept-Encoding', ''))
+        if 'gzip' in encodings[-1]:
+            body, headers = compressed, {'Content-Encoding': 'gzip'}
+        else:
+            body, headers = DATA, {}
+        headers['Content-Length'] = str(len(body))
+        if request.method == 'HEAD':
+            return web.Response(headers=headers)
+        return web.Response(body=body, headers=headers)
+
+    app = web.Application()
+    app.router.add_route('HEAD', '/file', file)
+    app.router.add_get('/file', file, allow_head=False)
+    async with TestServer(app) as server:
+        async with WebAPI(CountingAuth()) as api:
+            api.base_url = str(server.make_url(''))
+            with tempfile.TemporaryDirectory() as tmp:
+                dest = os.path.join(tmp, 'export.bin')
+                progress = await api.download('/file', dest)
+                with open(dest, 'rb') as f:
+                    assert f.read() == DATA
+    assert progress.total == progress.received == len(DATA)
+    assert encodings == ['identity', 'identity']
@@ -0,0 +1,108 @@
+import json
+from dataclasses import dataclass
+from typing import Any, NotRequired, TypedDict
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.fields import fields_mask
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+class Statistics(TypedDict):
+    viewCount: str
+
+class Snippet(TypedDict):
+    title: str
+    tags: NotRequired[list[str]]
+    thumbnails: dict[str, Any]
+
+class Video(TypedDict):
+    id: str
+    snippet: Snippet
+    statistics: Statistics | None
+
+class VideoList(TypedDict):
+    items: list[Video]
+
+@dataclass
+class Comment:
+    id: str
+    replies: list['Comment']
+    author: Snippet | None = None
+
+    @classmethod
+    def from_json(cls, obj: dict[str, Any]) -> 'Comment':
+        return cls(obj['id'], [cls.from_json(r) for r in obj.get('replies', [])])
+
+def test_fields_mask():
+    assert fields_mask(VideoList) == 'items(id,snippet(title,tags,thumbnails),statistics(viewCount))'
+    # a type which contains itself is requested whole from there
+    assert fields_mask(Comment) == 'id,replies,author(title,tags,thumbnails)'
+    assert fields_mask(dict) is None and fields_mask(str) is None
+    hits = fields_mask.cache_info().hits
+    fields_mask(VideoList)
+    assert fields_mask.cache_info().hits == hits + 1
+
+def project(obj: Any, mask: str) -> Any:
+    'Apply a fields mask, as a Google API would.'
+    selected: dict[str, str | None] = {}
+    depth, name, start = 0, '', 0
+    for i, c in enumerate(mask + ','):
+        if c == '(':
+            if depth == 0:
+                name, start = mask[start:i], i + 1
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                selected[name], start = mask[start:i], i + 2
+        elif c == ',' and depth == 0 and start <= i:
+            selected[mask[start:i]], start = None, i + 1
+    if isinstance(obj, list):
+        return [project(o, mask) for o in obj] # type: ignore
+    return {k: obj[k] if sub is None else project(obj[k], sub) for k, sub in selected.items() if k in obj}
+
+def video(i: int) -> dict[str, Any]:
+    return {
+        'kind': 'youtube#video', 'etag': F'etag{i}' * 4, 'id': F'video{i}',
+        'snippet': {
+            'title': F'Video {i}', 'description': 'lorem ipsum dolor sit amet ' * 40,
+            'tags': ['a', 'b'], 'thumbnails': {'default': {'url': F'https://i.ytimg.com/vi/{i}/default.jpg'}},
+            'localized': {'title': F'Video {i}', 'description': 'lorem ipsum dolor sit amet ' * 40},
+        },
+        'statistics': {'viewCount': str(i * 1000), 'likeCount': str(i), 'commentCount': str(i)},
+        'contentDetails': {'duration': 'PT4M13S', 'dimension': '2d', 'definition': 'hd', 'regionRestriction': {'blocked': ['XX'] * 30}},
+    }
+
+async def test_fields_projection():
+    response = {'kind': 'youtube#videoListResponse', 'items': [video(i) for i in range(50)]}
+    sent: list[tuple[str | None, int]] = []
+
+    async def videos(request: web.Request):
+        mask = request.query.get('fields')
+        body = json.dumps(response if mask is None else project(response, mask)).encode()
+        sent.append((mask, len(body)))
+        return web.Response(body=body, content_type='application/json')
+
+    app = web.Application()
+    app.router.add_get('/videos', videos)
+    async with TestServer(app) as server:
+
+        class YouTube(WebAPI):
+            base_url = str(server.make_url(''))
+            _auto_fields = True
+
+        async with YouTube(Auth.none()) as api:
+            for params in [{'fields': None}, {}]:
+                for _ in range(20):
+                    result = await api._get(VideoList, '/videos', {'part': 'snippet'} | params)
+                assert [v['id'] for v in result['items']] == [F'video{i}' for i in range(50)]
+
+            # types without declared fields are unchanged
+            assert 'contentDetails' in (await api._get(dict, '/videos'))['items'][0]
+
+    full, projected = sent[0][1], sent[20][1]
+    assert sent[0][0] is None and sent[20][0] == fields_mask(VideoList)
+    assert sent[-1][0] is None
+    assert projected < full * 0.2
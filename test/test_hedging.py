@@ -0,0 +1,54 @@
+import asyncio, time
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.hedging import HedgePolicy, LatencyTracker
+from SlyAPI.web import JsonMap
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+def test_latency_tracker():
+    tracker = LatencyTracker(window=100)
+    for i in range(200):
+        tracker.record('GET /a', i / 1000)
+    assert tracker.percentile('GET /a', 0.5) == 0.15
+    assert tracker.percentile('GET /a', 0.99) == 0.199
+    assert tracker.percentile('GET /b', 0.5) is None
+    assert tracker.percentile('GET /a', 0.5, min_samples=101) is None
+
+async def test_hedged_requests():
+    received = 0
+
+    async def handler(request: web.Request):
+        nonlocal received
+        received += 1
+        # every 10th request is stuck
+        await asyncio.sleep(1.0 if received % 10 == 0 else 0.005)
+        return web.json_response({'n': request.query['n']})
+
+    app = web.Application()
+    app.router.add_get('/item', handler)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+            hedging = HedgePolicy(percentile=0.8, budget=0.5, min_samples=5)
+
+            def __init__(self):
+                super().__init__(Auth.none())
+
+            async def item(self, n: int) -> JsonMap:
+                return await self.get_json('/item', {'n': n})
+
+        async with Stub() as api:
+            start = time.monotonic()
+            for n in range(40):
+                assert await api.item(n) == {'n': str(n)}
+            elapsed = time.monotonic() - start
+
+        stats = Stub.hedging.stats
+        assert stats.requests == 40
+        assert 0 < stats.hedge_wins <= stats.hedges <= 20
+        # without hedging, the stuck requests after the first few would take 3 seconds
+        assert elapsed < 1.5
@@ -0,0 +1,43 @@
+import subprocess, sys
+
+# total self-time of modules imported to use `UrlApiKey`, beyond a bare interpreter
+# includes aiohttp, which is needed to make any request
+IMPORT_BUDGET_MS = 500
+
+HEAVY_MODULES = ['jwt', 'cryptography', 'pick', 'termcolor', 'sqlite3']
+
+# optional features of WebAPI, imported when first used
+FEATURE_MODULES = ['cache', 'breaker', 'concurrency', 'download', 'fields', 'hedging', 'jsonview',
+    'loader', 'scheduler', 'stream', 'sync', 'upload', 'watch']
+
+def import_times(code: str) -> dict[str, int]:
+    'Self import time in microseconds of each module imported by some code'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, check=True)
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _cumulative, name = line.removeprefix('import time:').split('|')
+        times[name.strip()] = int(self_us)
+    return times
+
+def test_import_time():
+    startup = import_times('pass')
+    times = import_times('import SlyAPI; SlyAPI.UrlApiKey; SlyAPI.WebAPI')
+
+    added = {name: us for name, us in times.items() if name not in startup}
+    total_ms = sum(added.values()) / 1000
+
+    for name in added:
+        assert name.split('.')[0] not in HEAVY_MODULES, F"{name} should only be imported when used"
+    for feature in FEATURE_MODULES:
+        assert F'SlyAPI.{feature}' not in added, F"SlyAPI.{feature} should only be imported when used"
+
+    assert total_ms < IMPORT_BUDGET_MS
+
+def test_lazy_names():
+    import SlyAPI
+    for name in SlyAPI.__all__:
+        assert getattr(SlyAPI, name) is not None
+    assert 'OAuth2ServiceAccount' in dir(SlyAPI)
@@ -0,0 +1,61 @@
+import json, tracemalloc
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.jsonview import JsonArrayView, JsonObjectView, json_view
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+def test_json_view():
+    doc = {
+        'kind': 'list', 'escaped "key"': 'back\\slash\\',
+        'items': [{'id': 1, 'tags': ['a', ']', '"}']}, {'id': 2, 'tags': []}],
+        'page': {'next': None, 'size': -1.5e3, 'flags': [True, False]},
+        'text': 'é中\n',
+    }
+    view = json_view(json.dumps(doc, indent=1, ensure_ascii=False).encode())
+    assert isinstance(view, JsonObjectView) and isinstance(view['items'], JsonArrayView)
+    assert view['items'][1]['id'] == 2 and view['items'][-2]['tags'][2] == '"}'
+    assert view['escaped "key"'] == 'back\\slash\\' and view['text'] == 'é中\n'
+    assert 'missing' not in view and view.get('missing') is None
+    assert list(view) == list(doc) and len(view['items']) == 2
+    assert view == doc and view['items'] == doc['items']
+    assert view.to_python() == doc and view['page'].to_python() == doc['page']
+    # values are decoded once
+    assert view['page'] is view['page']
+
+def test_json_view_allocates_what_is_used():
+    items = [{'id': i, 'description': 'lorem ipsum ' * 50, 'tags': list('abcdefgh'), 'meta': {'n': i}} for i in range(2000)]
+    data = json.dumps({'nextPageToken': 'next', 'items': items}).encode()
+
+    tracemalloc.start()
+    assert json.loads(data)['nextPageToken'] == 'next'
+    _, full = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    assert json_view(data)['nextPageToken'] == 'next'
+    _, lazy = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert lazy < full / 100
+
+async def test_lazy_requests():
+    async def videos(request: web.Request):
+        page = int(request.query.get('pageToken', 0))
+        return web.json_response({
+            'nextPageToken': str(page + 1) if page < 2 else None,
+            'items': [{'id': F'{page}-{i}', 'snippet': {'title': str(i)}} for i in range(3)],
+        })
+
+    app = web.Application()
+    app.router.add_get('/videos', videos)
+    async with TestServer(app) as server:
+        async with WebAPI(Auth.none()) as api:
+            api.base_url = str(server.make_url(''))
+
+            page = await api._get(JsonObjectView, '/videos')
+            assert isinstance(page, JsonObjectView) and page['items'][2]['snippet']['title'] == '2'
+
+            ids = [item['id'] async for item in api.paginated('/videos', {}, None, lazy=True)]
+            assert ids == [F'{p}-{i}' for p in range(3) for i in range(3)]
+            items = await api.paginated('/videos', {}, 4, lazy=True)
+            assert all(isinstance(item, JsonObjectView) for item in items) and len(items) == 4
@@ -0,0 +1,54 @@
+import asyncio
+
+from SlyAPI import *
+from SlyAPI.asyncy import unmanaged_tasks
+from SlyAPI.auth import Auth
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+async def test_webapi_lifecycle():
+    async def handler(_request: web.Request):
+        return web.json_response({'ok': True})
+
+    app = web.Application()
+    app.router.add_get('/', handler)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+
+        # owned session, closed on exit
+        async with Stub(Auth.none()) as api:
+            assert await api.get_json('/') == {'ok': True}
+            # no background task per instance
+            assert not unmanaged_tasks
+            owned = api._client
+        assert owned.closed
+
+        # borrowed session, left open
+        async with ClientSession() as session:
+            async with Stub(Auth.none(), session=session) as api:
+                await api.get_json('/')
+            assert not session.closed
+
+            apis = [Stub(Auth.none()) for _ in range(5)]
+            for api in apis:
+                api.use_session(session)
+                await api.get_json('/')
+            for api in apis:
+                await api.aclose()
+            assert not session.closed
+
+        # groups close every API, and the shared session
+        shared = ClientSession()
+        async with WebAPIGroup(shared) as group:
+            borrowing = [group.add(Stub(Auth.none())) for _ in range(5)]
+            owning = Stub(Auth.none())
+            await owning.get_json('/')
+            own_session = owning._client
+            group.add(owning)
+            await asyncio.gather(*(api.get_json('/') for api in borrowing))
+            assert all(api._client is shared for api in borrowing)
+        assert shared.closed
+        assert own_session.closed
@@ -0,0 +1,79 @@
+import asyncio
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.loader import BatchLoader
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+async def test_batch_loader():
+    batches: list[list[int]] = []
+
+    async def load_squares(keys: list[int]):
+        batches.append(keys)
+        await asyncio.sleep(0.01)
+        return {k: k * k for k in keys if k >= 0}
+
+    loader = BatchLoader(load_squares, max_batch=4)
+
+    results = await asyncio.gather(*(loader.load(k) for k in [1, 2, 3, 2, 1, 5, 6]))
+    assert results == [1, 4, 9, 4, 1, 25, 36]
+    assert batches == [[1, 2, 3, 5], [6]]
+
+    # cached
+    assert await loader.load_many([6, 5]) == [36, 25]
+    assert len(batches) == 2
+
+    try:
+        await loader.load(-1)
+        assert False, "expected KeyError"
+    except KeyError:
+        pass
+
+    # cancelling one caller does not affect others waiting for the same key
+    first = asyncio.ensure_future(loader.load(7))
+    second = asyncio.ensure_future(loader.load(7))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == 49
+
+async def test_webapi_batch_loader():
+    requests: list[str] = []
+
+    async def videos(request: web.Request):
+        requests.append(request.query['id'])
+        return web.json_response({'items': [
+            {'id': i, 'title': F'Video {i}', 'part': request.query['part']}
+            for i in request.query['id'].split(',') if i != 'missing'
+        ]})
+
+    app = web.Application()
+    app.router.add_get('/videos', videos)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+            _parameter_list_limits = {'id': 3}
+
+            def __init__(self):
+                super().__init__(Auth.none())
+                self._videos = self.batch_loader('/videos', params={'part': 'snippet'})
+
+            async def video(self, id: str) -> str:
+                return (await self._videos.load(id))['title'] # type: ignore
+
+        async with Stub() as api:
+            titles = await asyncio.gather(*(api.video(F'v{i % 5}') for i in range(10)))
+            assert titles == [F'Video v{i % 5}' for i in range(10)]
+            assert requests == ['v0,v1,v2', 'v3,v4']
+
+            # a loader kept on the API does not cache, so later lookups are current
+            await api.video('v0')
+            assert requests[-1] == 'v0'
+
+            # one made for an operation may
+            loader = api.batch_loader('/videos', params={'part': 'snippet'}, cache=True)
+            await loader.load_many(['v1', 'v2'])
+            await loader.load('v1')
+            assert requests[-1] == 'v1,v2'
@@ -0,0 +1,75 @@
+import base64, hmac
+from hashlib import sha1
+from typing import Any
+
+from SlyAPI.oauth1 import percentEncode, paramString, _hmac_sign, OAuth1App, OAuth1User
+from SlyAPI.web import Method, Request
+
+# original RFC 5849 implementation, kept to check that the fast path is byte-for-byte identical
+
+def reference_percent_encode(s: str):
+    result = ''
+    URLSAFE = b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-._~'
+    for c in s.encode('utf8'):
+        result += chr(c) if c in URLSAFE else F'%{c:02X}'
+    return result
+
+def reference_param_string(params: dict[str, Any]) -> str:
+    encoded = {
+        reference_percent_encode(k): reference_percent_encode(v) for k, v in params.items()
+    }
+    return '&'.join(F'{k}={v}' for k, v in sorted(encoded.items()))
+
+def reference_hmac_sign(request: Request, signing_params: dict[str, Any], appSecret: str, userSecret: str|None = None) -> str:
+    all_params = dict(request.query_params) | signing_params
+    base = F"{request.method.value.upper()}&{reference_percent_encode(request.url.lower())}&{reference_percent_encode(reference_param_string(all_params))}"
+    signingKey = reference_percent_encode(appSecret) + '&'
+    if userSecret is not None:
+        signingKey += reference_percent_encode(userSecret)
+    hashed = hmac.new(bytes(signingKey, 'ascii'), bytes(base, 'ascii'), sha1).digest()
+    return base64.b64encode(hashed).decode('ascii')
+
+SAMPLES = [
+    '', 'abc', 'Hello World!', 'a+b=c&d', 'Ladies + Gentlemen', '☃ snow',
+    '~-._', 'ünïcödé/?#[]@', 'x' * 2000, '\x00\x7f\xff',
+]
+
+SIGNING_PARAMS = {
+    'oauth_consumer_key': '9djdj82h48djs9d2',
+    'oauth_nonce': '7d8f3e4a',
+    'oauth_signature_method': 'HMAC-SHA1',
+    'oauth_timestamp': '137131201',
+    'oauth_token': 'kkk9d7dh3k39sjv7',
+    'oauth_version': '1.0'
+}
+
+def test_percent_encode_compatible():
+    for s in SAMPLES:
+        assert percentEncode(s) == reference_percent_encode(s)
+
+def test_param_string_compatible():
+    params = {F'k{i} {s[:8]}': s for i, s in enumerate(SAMPLES)}
+    assert paramString(params) == reference_param_string(params)
+
+def test_hmac_sign_compatible():
+    for user_secret in [None, '', 'j49sk3j29djd', 'ünï&cödé']:
+        request = Request(Method.POST, 'https://API.Example.com/1.1/Statuses/update.json',
+            {'status': 'Hello Ladies + Gentlemen, a signed OAuth request!', 'include_entities': 'true'})
+        expected = reference_hmac_sign(request, SIGNING_PARAMS, 'kd94hf93k423kf44', user_secret)
+        # twice, to also check the cached signing key
+        assert _hmac_sign(request, SIGNING_PARAMS, 'kd94hf93k423kf44', user_secret) == expected
+        assert _hmac_sign(request, SIGNING_PARAMS, 'kd94hf93k423kf44', user_secret) == expected
+
+def test_sign_many():
+    app = OAuth1App('example_key', 'example_secret', '', '', '')
+    user = OAuth1User('example_token', 'example_token_secret')
+
+    # signing twice in the same second must not reuse a nonce
+    nonces: set[str] = set()
+    for i in range(2000):
+        request = Request(Method.GET, 'https://api.example.com/1.1/search/tweets.json',
+            {'q': F'search terms #{i}', 'count': '100', 'result_type': 'recent'})
+        app.sign(request, user)
+        nonces.add(request.headers['Authorization'].split('oauth_nonce="')[1].split('"')[0])
+    assert len(nonces) == 2000
+    assert request.headers['Authorization'].startswith('OAuth ')
@@ -0,0 +1,89 @@
+import asyncio, time
+from typing import Awaitable
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.quota import QuotaExceeded
+from SlyAPI.web import JsonMap
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+async def test_quota_budget():
+    async def handler(request: web.Request):
+        page = int(request.query.get('pageToken', 0))
+        return web.json_response({
+            'items': [{'n': page}],
+            'nextPageToken': str(page + 1) if page < 2 else None
+        })
+
+    app = web.Application()
+    app.router.add_get('/search', handler)
+    app.router.add_get('/videos', handler)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+
+            @quota_cost(100)
+            def search(self) -> AsyncLazy[JsonMap]:
+                return self.paginated('/search', {}, None)
+
+            @quota_cost(1000)
+            def search_all(self) -> AsyncLazy[JsonMap]:
+                return self.paginated('/search', {}, None)
+
+            @quota_cost(1)
+            async def video(self) -> JsonMap:
+                return await self.get_json('/videos')
+
+            @quota_cost(5)
+            def video_later(self) -> Awaitable[JsonMap]:
+                return self.get_json('/videos')
+
+        api = Stub(Auth.none())
+        api.quota = QuotaBudget(400)
+
+        assert len(await api.search()) == 3
+        await api.video()
+
+        usage = api.quota.usage()
+        assert usage.spent == 301
+        assert usage.remaining == 99
+        by_endpoint = {k.split('<locals>.')[-1]: v for k, v in usage.by_endpoint.items()}
+        assert by_endpoint == {'Stub.search': 300, 'Stub.video': 1}
+        assert usage.by_priority == {Priority.NORMAL: 301}
+
+        # bulk requests may only spend half the budget
+        with with_priority(Priority.BULK):
+            try:
+                await api.video()
+                assert False, "expected QuotaExceeded"
+            except QuotaExceeded as e:
+                assert e.status == 429
+
+        # but interactive ones can spend all of it
+        with with_priority(Priority.INTERACTIVE):
+            await api.video()
+        assert api.quota.usage().by_priority[Priority.INTERACTIVE] == 1
+
+        # the cost of a coroutine returned by a sync endpoint is spent when it runs
+        api.quota = QuotaBudget(400)
+        await api.video_later()
+        assert {k.split('<locals>.')[-1]: v for k, v in api.quota.usage().by_endpoint.items()} == {'Stub.video_later': 5}
+
+        # priority 0 is kept for later pages, rather than taken as unset
+        api.quota = QuotaBudget(400)
+        with with_priority(Priority.INTERACTIVE):
+            assert len(await api.search()) == 3
+        assert api.quota.usage().by_priority == {Priority.INTERACTIVE: 300}
+
+        # more than a whole window could ever allow is refused without waiting for it
+        api.quota = QuotaBudget(400, window=0.5, max_delay=10)
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(api.search_all(), 5)
+            assert False, "expected QuotaExceeded"
+        except QuotaExceeded as e:
+            assert 'may only spend 360' in str(e.reason)
+        assert time.monotonic() - start < 0.5
@@ -0,0 +1,80 @@
+import asyncio
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.scheduler import PriorityScheduler
+from SlyAPI.web import JsonMap
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+async def test_weighted_fair_queuing():
+    scheduler = PriorityScheduler(max_concurrency=1, weights={Priority.NORMAL: 2.0}, caps={Priority.BULK: 1})
+    order: list[str] = []
+
+    async def request(priority: Priority, name: str):
+        await scheduler.acquire(priority)
+        order.append(name)
+        await asyncio.sleep(0)
+        scheduler.release(priority)
+
+    await scheduler.acquire(Priority.NORMAL) # hold the only slot while the queue fills
+    tasks = [asyncio.ensure_future(request(Priority.BULK, F'b{i}')) for i in range(4)]
+    tasks += [asyncio.ensure_future(request(Priority.NORMAL, F'n{i}')) for i in range(4)]
+    tasks += [asyncio.ensure_future(request(Priority.INTERACTIVE, F'i{i}')) for i in range(2)]
+    await asyncio.sleep(0)
+    assert scheduler.stats()[Priority.BULK].queued == 4
+    scheduler.release(Priority.NORMAL)
+    await asyncio.gather(*tasks)
+
+    # interactive first, then normal gets twice the turns of bulk, and bulk is not starved
+    assert order == ['i0', 'i1', 'n0', 'n1', 'b0', 'n2', 'n3', 'b1', 'b2', 'b3']
+    stats = scheduler.stats()
+    assert stats[Priority.BULK].sent == 4 and stats[Priority.BULK].queued == 0
+    assert stats[Priority.INTERACTIVE].mean_wait < stats[Priority.BULK].mean_wait
+
+async def test_cancelled_waiter():
+    scheduler = PriorityScheduler(max_concurrency=1)
+    await scheduler.acquire(Priority.NORMAL)
+    waiting = asyncio.ensure_future(scheduler.acquire(Priority.BULK))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    scheduler.release(Priority.NORMAL)
+    await asyncio.wait([waiting])
+    assert scheduler.in_flight == 0
+    await scheduler.acquire(Priority.INTERACTIVE)
+    assert scheduler.in_flight == 1
+
+async def test_webapi_scheduler():
+    async def handler(_request: web.Request):
+        await asyncio.sleep(0.01)
+        return web.json_response({})
+
+    app = web.Application()
+    app.router.add_get('/work', handler)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+            scheduler = PriorityScheduler(max_concurrency=2)
+
+            def __init__(self):
+                super().__init__(Auth.none())
+
+            async def work(self) -> JsonMap:
+                return await self.get_json('/work')
+
+        async with Stub() as api:
+            async def backfill():
+                with with_priority(Priority.BULK):
+                    await asyncio.gather(*(api.work() for _ in range(20)))
+            bulk = asyncio.ensure_future(backfill())
+            await asyncio.sleep(0.02)
+            with with_priority(Priority.INTERACTIVE):
+                await api.work()
+            assert not bulk.done()
+            await bulk
+
+        stats = Stub.scheduler.stats()
+        assert stats[Priority.BULK].sent == 20 and stats[Priority.INTERACTIVE].sent == 1
+        assert stats[Priority.INTERACTIVE].max_wait < stats[Priority.BULK].max_wait
@@ -0,0 +1,57 @@
+import csv, gzip, json, os
+
+from SlyAPI.asyncy import AsyncLazy
+from SlyAPI.sinks import SinkProgress, write_ndjson
+
+async def videos(n: int):
+    for i in range(n):
+        yield {'id': F'v{i}', 'snippet': {'title': F'Video "{i}", ☃', 'tags': ['a', 'b']}}
+
+async def test_ndjson(tmp_path: str):
+    path = os.path.join(tmp_path, 'out.ndjson')
+    reports: list[int] = []
+    progress = await write_ndjson(videos(1000), path, batch_bytes=4096,
+        on_progress=lambda p: reports.append(p.items))
+
+    with open(path, 'rb') as f:
+        lines = f.read().decode('utf8').splitlines()
+    assert [json.loads(line) for line in lines] == [v async for v in videos(1000)]
+    assert progress.items == 1000
+    assert progress.bytes == os.path.getsize(path)
+    assert progress.writes == len(reports) > 1
+    assert reports == sorted(reports) and reports[-1] == 1000
+
+async def test_ndjson_gzip(tmp_path: str):
+    path = os.path.join(tmp_path, 'out.ndjson.gz')
+    progress = await AsyncLazy(videos(100)).to_ndjson(path, compress=True)
+    with gzip.open(path, 'rt', encoding='utf8') as f:
+        assert [json.loads(line) for line in f] == [v async for v in videos(100)]
+    assert progress == SinkProgress(100, progress.bytes, 1)
+    assert os.path.getsize(path) < progress.bytes
+
+async def test_csv(tmp_path: str):
+    path = os.path.join(tmp_path, 'out.csv')
+    await AsyncLazy(videos(3)).to_csv(path, ['id', 'snippet.title', 'snippet.tags', 'missing.value'])
+    with open(path, newline='', encoding='utf8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['id', 'snippet.title', 'snippet.tags', 'missing.value']
+    assert rows[1] == ['v0', 'Video "0", ☃', '["a","b"]', '']
+    assert len(rows) == 4
+
+async def test_failed_write_closes_source(tmp_path: str):
+    closed = False
+    async def items():
+        nonlocal closed
+        try:
+            yield {'id': 1}
+            yield {'id': object()} # not serializable
+            yield {'id': 3}
+        finally:
+            closed = True
+
+    try:
+        await AsyncLazy(items()).to_ndjson(os.path.join(tmp_path, 'out.ndjson'))
+        assert False, "expected TypeError"
+    except TypeError:
+        pass
+    assert closed
@@ -0,0 +1,73 @@
+from enum import Enum
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+class Part(Enum):
+    SNIPPET = 'snippet'
+    STATS = 'statistics'
+
+async def test_split_list_parameters():
+    sizes: list[int] = []
+
+    async def videos(request: web.Request):
+        ids = request.query['id'].split(',')
+        sizes.append(len(ids))
+        assert request.query['part'] == 'snippet,statistics'
+        page = int(request.query.get('pageToken', 0))
+        if 'single' in request.query:
+            return web.json_response({'kind': 'videoListResponse', 'items': [{'id': i} for i in ids]})
+        # two pages per request
+        half = len(ids) // 2
+        return web.json_response({
+            'kind': 'videoListResponse',
+            'items': [{'id': i} for i in (ids[:half] if page == 0 else ids[half:])],
+            'nextPageToken': '1' if page == 0 else None,
+        })
+
+    app = web.Application()
+    app.router.add_get('/videos', videos)
+    async with TestServer(app) as server:
+
+        class Stub(WebAPI):
+            base_url = str(server.make_url(''))
+            _parameter_list_limits = {'id': 50}
+
+        ids = [F'video{i}' for i in range(420)]
+        params = {'id': ids, 'part': [Part.SNIPPET, Part.STATS]}
+
+        async with Stub(Auth.none()) as api:
+            page = await api.get_json('/videos', params | {'single': 1})
+            assert [item['id'] for item in page['items']] == ids
+            assert page['kind'] == 'videoListResponse'
+            assert sizes == [50] * 8 + [20]
+
+            sizes.clear()
+            typed = await api._get(dict, '/videos', params | {'single': 1})
+            assert typed == page
+
+            # the pages after the first of each request would be lost
+            try:
+                await api.get_json('/videos', params)
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+
+            sizes.clear()
+            items = await api.paginated('/videos', params, None)
+            assert [item['id'] for item in items] == ids
+            assert sizes == [50] * 16 + [20] * 2
+
+            # only as many pages as needed
+            sizes.clear()
+            assert [item['id'] for item in await api.paginated('/videos', params, 60)] == ids[:60]
+            assert sizes == [50] * 3
+
+            # URL length limit also applies, halving the chunks until they fit
+            sizes.clear()
+            api._max_url_length = 200
+            await api.get_json('/videos', {'id': ids[:100], 'part': [Part.SNIPPET, Part.STATS], 'single': 1})
+            assert sum(sizes) == 100 and max(sizes) < 50
@@ -0,0 +1,87 @@
+import asyncio
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.stream import ServerEvent
+from SlyAPI.web import ApiError, Request
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+class CountingAuth(Auth):
+    signed: int = 0
+
+    async def sign(self, client: ClientSession, request: Request) -> Request:
+        self.signed += 1
+        request.headers['Authorization'] = F'Bearer {self.signed}'
+        return request
+
+async def test_event_stream():
+    connections: list[tuple[str, str | None]] = []
+
+    async def events(request: web.Request):
+        connections.append((request.headers['Authorization'], request.headers.get('Last-Event-ID')))
+        assert request.headers['Accept'] == 'text/event-stream'
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        match len(connections):
+            case 1: # two events, then closed by the server
+                await response.write(b'id: 1\ndata: {"n": 1}\n\nid: 2\nevent: update\ndata: {"n": 2}\n\n')
+            case 2: # a keep-alive and an event, then silent
+                await response.write(b': keep-alive\n\nid: 3\ndata: {"n"')
+                await response.write(b': 3}\n\n')
+                await asyncio.sleep(1.0)
+            case _:
+                await response.write(b'retry: 10\nid: 4\ndata: line one\ndata: line two\n\n')
+                await asyncio.sleep(1.0)
+        return response
+
+    app = web.Application()
+    app.router.add_get('/events', events)
+    async with TestServer(app) as server:
+        auth = CountingAuth()
+        async with WebAPI(auth) as api:
+            api.base_url = str(server.make_url(''))
+            received: list[ServerEvent] = []
+            async for event in api.event_stream('/events', heartbeat_timeout=0.2, initial_backoff=0.01):
+                received.append(event)
+                if len(received) == 4:
+                    break
+
+    assert [e.id for e in received] == ['1', '2', '3', '4']
+    assert received[1].event == 'update' and received[2].json() == {'n': 3}
+    assert received[3].data == 'line one\nline two'
+    # signed again for each connection, and resumed after the last event
+    assert connections == [('Bearer 1', None), ('Bearer 2', '2'), ('Bearer 3', '3')]
+
+async def test_ndjson_stream():
+    connections = 0
+
+    async def stream(request: web.Request):
+        nonlocal connections
+        connections += 1
+        if connections > 2:
+            return web.json_response({'error': 'unauthorized'}, status=401)
+        if connections == 2:
+            return web.json_response({'error': 'busy'}, status=503)
+        response = web.StreamResponse()
+        await response.prepare(request)
+        await response.write(b'{"id": 1}\r\n\r\n{"id"')
+        await response.write(b': 2}\n\n{"id": 3')
+        return response
+
+    app = web.Application()
+    app.router.add_get('/stream', stream)
+    async with TestServer(app) as server:
+        async with WebAPI(Auth.none()) as api:
+            api.base_url = str(server.make_url(''))
+            items: list[object] = []
+            try:
+                async for item in api.ndjson_stream('/stream', initial_backoff=0.01, buffer=1):
+                    items.append(item)
+                assert False, "expected ApiError"
+            except ApiError as e:
+                assert e.status == 401
+    # the cut off line was dropped
+    assert items == [{'id': 1}, {'id': 2}]
+    assert connections == 3
@@ -0,0 +1,63 @@
+import json, os, tempfile
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.sync import JsonFileSyncStore, MemorySyncStore
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+async def test_incremental_sync():
+    requests: list[dict[str, str]] = []
+
+    async def events(request: web.Request):
+        query = dict(request.query)
+        requests.append(query)
+        match query.get('syncToken'), query.get('pageToken'):
+            case None, None:
+                return web.json_response({'items': [{'id': 1}, {'id': 2}], 'nextPageToken': 'p2'})
+            case None, 'p2': # the token is only on the last page
+                return web.json_response({'items': [{'id': 3}], 'nextSyncToken': F's{len(requests)}'})
+            case 's2', None: # nothing changed yet, but there are more pages
+                return web.json_response({'items': [], 'nextPageToken': 'p2'})
+            case 's2', 'p2':
+                return web.json_response({'items': [{'id': 2, 'status': 'cancelled'}], 'nextSyncToken': 's5'})
+            case _: # expired
+                return web.json_response({'error': 'gone'}, status=410)
+
+    app = web.Application()
+    app.router.add_get('/events', events)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'sync.json')
+        full_syncs = 0
+        async def on_full_sync():
+            nonlocal full_syncs
+            full_syncs += 1
+
+        async with TestServer(app) as server:
+            async with WebAPI(Auth.none()) as api:
+                api.base_url = str(server.make_url(''))
+                params = {'calendarId': 'primary'}
+
+                first = await api.synced('/events', params, JsonFileSyncStore(path), on_full_sync=on_full_sync)
+                assert [e['id'] for e in first] == [1, 2, 3]
+
+                # the token is kept across runs
+                second = await api.synced('/events', params, JsonFileSyncStore(path), on_full_sync=on_full_sync)
+                assert second == [{'id': 2, 'status': 'cancelled'}]
+
+                third = await api.synced('/events', params, JsonFileSyncStore(path), on_full_sync=on_full_sync)
+                assert [e['id'] for e in third] == [1, 2, 3]
+
+                # a sync which is not iterated to the end keeps the old token
+                store = MemorySyncStore()
+                async for _ in api.synced('/events', params, store, key='events'):
+                    break
+                assert store.tokens == {}
+
+        assert full_syncs == 2
+        assert [q.get('syncToken') for q in requests] == [None, None, 's2', 's2', 's5', None, None, None]
+        assert requests[2]['calendarId'] == 'primary'
+        with open(path) as f:
+            assert list(json.load(f).values()) == ['s7']
+        assert os.listdir(tmp) == ['sync.json']
@@ -0,0 +1,156 @@
+import asyncio, hashlib, io, os, re, tempfile
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.upload import CHUNK_GRANULARITY, ResumableUpload, UploadProgress
+from SlyAPI.web import ApiError
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+DATA = os.urandom(5 * CHUNK_GRANULARITY + 1234)
+
+def stub_upload_server(fail_puts: set[int]) -> web.Application:
+    '''
+    Google-style resumable uploads. The PUTs numbered in `fail_puts` only
+    commit part of their chunk before failing with 503.
+    '''
+    stored = bytearray()
+    puts = 0
+
+    async def initiate(request: web.Request):
+        assert request.query['uploadType'] == 'resumable'
+        assert int(request.headers['X-Upload-Content-Length']) == len(DATA)
+        assert (await request.json()) == {'title': 'test'}
+        return web.Response(headers={'Location': str(request.url.with_path('/session/1').with_query({}))})
+
+    def incomplete():
+        headers = {'Range': F'bytes=0-{len(stored) - 1}'} if stored else {}
+        return web.Response(status=308, headers=headers)
+
+    async def put(request: web.Request):
+        nonlocal puts
+        puts += 1
+        content_range = request.headers['Content-Range']
+        body = await request.read()
+        if status := re.fullmatch(r'bytes \*/(\d+|\*)', content_range):
+            if status.group(1) != '*' and len(stored) == int(status.group(1)):
+                return web.json_response({'id': 'done', 'sha256': hashlib.sha256(stored).hexdigest()})
+            return incomplete()
+        match = re.fullmatch(r'bytes (\d+)-(\d+)/(\d+|\*)', content_range)
+        assert match, content_range
+        start, end, total = int(match.group(1)), int(match.group(2)), match.group(3)
+        assert start == len(stored) and end - start + 1 == len(body)
+        if puts in fail_puts:
+            stored.extend(body[:CHUNK_GRANULARITY])
+            return web.Response(status=503)
+        stored.extend(body)
+        if total != '*' and len(stored) == int(total):
+            return web.json_response({'id': 'done', 'sha256': hashlib.sha256(stored).hexdigest()})
+        return incomplete()
+
+    async def stream(request: web.Request):
+        body = await request.read()
+        return web.json_response({'size': len(body), 'sha256': hashlib.sha256(body).hexdigest(),
+            'type': request.headers['Content-Type']})
+
+    app = web.Application(client_max_size=16 << 20)
+    app.router.add_post('/upload', initiate)
+    app.router.add_put('/session/1', put)
+    app.router.add_post('/stream', stream)
+    return app
+
+async def test_resumable_upload():
+    async with TestServer(stub_upload_server(fail_puts={2})) as server:
+        async with WebAPI(Auth.none()) as api:
+            api.base_url = str(server.make_url(''))
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'video.bin')
+                with open(path, 'wb') as f:
+                    f.write(DATA)
+
+                reports: list[int] = []
+                upload = await api.resumable_upload('/upload', path, {'title': 'test'},
+                    chunk_size=2 * CHUNK_GRANULARITY, on_progress=lambda p: reports.append(p.committed))
+                assert upload.session_uri.endswith('/session/1')
+                result = await upload.run()
+
+        assert result == {'id': 'done', 'sha256': hashlib.sha256(DATA).hexdigest()}
+        assert upload.progress == UploadProgress(len(DATA), len(DATA), 1)
+        # second chunk was half committed, then resumed from there
+        assert reports[:3] == [2 * CHUNK_GRANULARITY, 3 * CHUNK_GRANULARITY, 5 * CHUNK_GRANULARITY]
+
+async def test_resume_in_new_upload():
+    async def data():
+        for i in range(0, len(DATA), 100_000):
+            yield DATA[i:i + 100_000]
+
+    async with TestServer(stub_upload_server(fail_puts={1})) as server:
+        async with WebAPI(Auth.none()) as api:
+            api.base_url = str(server.make_url(''))
+            upload = await api.resumable_upload('/upload', data(), {'title': 'test'}, size=len(DATA),
+                chunk_size=2 * CHUNK_GRANULARITY)
+            upload.max_resumes = 0
+            try:
+                await upload.run()
+                assert False, "expected ApiError"
+            except ApiError as e:
+                assert e.status == 503
+
+            # the generator can't be read again from the start
+            try:
+                await upload.run()
+                assert False, "expected ValueError"
+            except ValueError:
+                pass
+
+            # e.g. after a restart: ask the server where to continue from, and skip what it has
+            resumed = ResumableUpload(api, upload.session_uri, data(), len(DATA), 2 * CHUNK_GRANULARITY)
+            result = await resumed.run()
+        assert result['sha256'] == hashlib.sha256(DATA).hexdigest()
+
+async def test_run_again_after_failure():
+    source = io.BytesIO(b'junk' + DATA)
+    source.read(4) # the upload starts from here
+
+    async with TestServer(stub_upload_server(fail_puts={2})) as server:
+        async with WebAPI(Auth.none()) as api:
+            api.base_url = str(server.make_url(''))
+            upload = await api.resumable_upload('/upload', source, {'title': 'test'},
+                chunk_size=2 * CHUNK_GRANULARITY)
+            upload.max_resumes = 0
+            try:
+                await upload.run()
+                assert False, "expected ApiError"
+            except ApiError as e:
+                assert e.status == 503
+            # the server stored part of the failed chunk, which the upload hasn't heard about
+            assert upload.progress.committed == 2 * CHUNK_GRANULARITY
+
+            result = await upload.run()
+        assert result['sha256'] == hashlib.sha256(DATA).hexdigest()
+
+async def test_streaming_upload():
+    async def data():
+        for i in range(0, len(DATA), 100_000):
+            yield DATA[i:i + 100_000]
+
+    async with TestServer(stub_upload_server(set())) as server:
+        async with WebAPI(Auth.none()) as api:
+            api.base_url = str(server.make_url(''))
+            result = await api.upload('/stream', data(), content_type='video/mp4')
+            assert result == {'size': len(DATA), 'sha256': hashlib.sha256(DATA).hexdigest(), 'type': 'video/mp4'}
+
+async def test_slow_streaming_upload():
+    async def data():
+        for i in range(0, len(DATA), 300_000):
+            await asyncio.sleep(0.05)
+            yield DATA[i:i + 300_000]
+
+    async with TestServer(stub_upload_server(set())) as server:
+        async with WebAPI(Auth.none()) as api:
+            api.base_url = str(server.make_url(''))
+            # longer than the total limit, but never stalled
+            api.timeouts = Timeouts(total=0.1, first_byte=1.0)
+            result = await api.upload('/stream', data())
+            assert result['sha256'] == hashlib.sha256(DATA).hexdigest()
@@ -0,0 +1,53 @@
+import asyncio
+
+from SlyAPI import *
+from SlyAPI.auth import Auth
+from SlyAPI.watch import Change
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+async def test_watcher():
+    polls = {'a': 0, 'b': 0, 'c': 0}
+
+    async def resource(request: web.Request):
+        name = request.match_info['name']
+        polls[name] += 1
+        match name:
+            case 'a': # changes every time
+                version = polls[name]
+            case 'b': # never changes
+                version = 1
+            case _: # changes once, and sends no ETag
+                return web.json_response({'version': 1 if polls[name] < 3 else 2})
+        etag = F'"{version}"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.json_response({'version': version}, headers={'ETag': etag})
+
+    app = web.Application()
+    app.router.add_get('/items/{name}', resource)
+    async with TestServer(app) as server:
+        async with WebAPI(Auth.none()) as api:
+            api.base_url = str(server.make_url(''))
+            watcher = api.watcher(min_interval=0.01, max_interval=0.1, concurrency=2)
+            for name in polls:
+                watcher.watch(F'/items/{name}', key=name)
+
+            changes: list[Change] = []
+            async def collect():
+                async for change in watcher.changes():
+                    changes.append(change)
+            collecting = asyncio.ensure_future(collect())
+            await asyncio.sleep(0.5)
+            collecting.cancel()
+            await asyncio.wait([collecting])
+
+    keys = [c.key for c in changes]
+    assert 'b' not in keys
+    assert keys.count('c') == 1 and Change('c', {'version': 2}) in changes
+    assert keys.count('a') >= 5
+    # unchanged resources are polled less often, and cost a 304
+    assert polls['a'] > polls['b']
+    assert watcher.stats.not_modified >= polls['b'] - 1
+    assert watcher.stats.errors == 0